@@ -0,0 +1,361 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import queue
+import random
+import threading
+import numpy
+
+import distances
+
+
+# score added to attacks which join player's largest region with other one
+JOIN_BONUS = 2
+# score taken from attacks on hexes next to strongest enemy stacks
+THREAT_PENALTY = 1
+
+
+class Strategy:
+    '''
+    Strategy object. Chooses attacks of ai player, every strategy derives
+    from it
+    '''
+
+    def get_attacks(self, board, player_index, rng):
+        '''Yields attacks player makes in its turn, board shows result of
+               previous attack when generator is resumed
+
+        Arguments:
+            board {board.Board}
+            player_index {int}
+            rng {random.Random} -- turn's random numbers generator, fights
+                are rolled with it too
+
+        Yields:
+            tuple(tuple(int, int), tuple(int, int)) -- attacking and
+                defending coords
+        '''
+
+        raise NotImplementedError
+
+
+class GreedyStrategy(Strategy):
+    '''
+    GreedyStrategy object. Every hex able to attack at turn's start attacks
+    once one of its weakest enemy neighbours, if it isn't stronger than
+    attacking hex
+    '''
+
+    def get_attacks(self, board, player_index, rng):
+        for coords in get_attacking_hexes_coords(board, player_index):
+            targets = self.__select_best_targets(
+                board, board.dice_map[coords],
+                board.get_enemy_neighbours_coords(coords, player_index))
+
+            if targets:
+                yield coords, targets[rng.randrange(len(targets))]
+
+    def __select_best_targets(self, board, dice_number, neighbours):
+        '''Returns easiest targets to attack
+
+        Arguments:
+            board {board.Board}
+            dice_number {int} -- attacking hex dice number
+            neighbours {list(tuple(int, int))} -- coords of enemy neighbours
+
+        Returns:
+            list(tuple(int, int)) -- coords of targets
+        '''
+
+        if not neighbours:
+            return []
+
+        min_dice_number = min(board.dice_map[coords] for coords in neighbours)
+        if min_dice_number > dice_number:
+            return []
+
+        return [coords for coords in neighbours
+                if board.dice_map[coords] == min_dice_number]
+
+
+class CautiousStrategy(Strategy):
+    '''
+    CautiousStrategy object. Attacks only weaker enemies, always where dice
+    advantage is the biggest, until there is no such attack left. Hexes
+    conquered in this turn may attack too
+    '''
+
+    def get_attacks(self, board, player_index, rng):
+        while True:
+            attacks = []
+            best_advantage = 0
+
+            for coords in get_attacking_hexes_coords(board, player_index):
+                for target in board.get_enemy_neighbours_coords(
+                        coords, player_index):
+                    advantage = board.dice_map[coords] - \
+                        board.dice_map[target]
+
+                    if advantage > best_advantage:
+                        attacks = [(coords, target)]
+                        best_advantage = advantage
+                    elif advantage == best_advantage and attacks:
+                        attacks.append((coords, target))
+
+            if not attacks:
+                return
+
+            yield attacks[rng.randrange(len(attacks))]
+
+
+class StrategicStrategy(Strategy):
+    '''
+    StrategicStrategy object. Attacks weaker enemies, or equal ones when
+    attack joins its regions, which increases dice income. Attacks are
+    scored by dice advantage, preferring joining ones and avoiding hexes
+    next to strongest enemy stacks. Distance fields are computed once per
+    turn, every decision scores all attacks at once
+    '''
+
+    def get_attacks(self, board, player_index, rng):
+        fields = distances.DistanceFields(board, player_index)
+
+        joining = fields.joining.ravel()
+        bonus = (JOIN_BONUS * fields.joining -
+                 THREAT_PENALTY * (fields.strong_enemies == 1)).ravel()
+
+        owner_list = board.owner_map.ravel()
+        dice_list = board.dice_map.ravel()
+
+        while True:
+            attackers = numpy.flatnonzero((owner_list == player_index) &
+                                          (dice_list > 1))
+            targets = fields.neighbours_indices[attackers]
+
+            advantage = dice_list[attackers][:, None] - dice_list[targets]
+            legal = (owner_list[targets] >= 0) & \
+                (owner_list[targets] != player_index) & \
+                ((advantage > 0) | (advantage == 0) & joining[targets])
+
+            if not legal.any():
+                return
+
+            scores = numpy.where(legal, advantage + bonus[targets],
+                                 numpy.iinfo(numpy.int32).min)
+            best_attacks = numpy.flatnonzero(scores == scores.max())
+            attacker, direction = divmod(
+                int(best_attacks[rng.randrange(len(best_attacks))]), 6)
+
+            yield (divmod(int(attackers[attacker]), board.size[1]),
+                   divmod(int(targets[attacker, direction]), board.size[1]))
+
+
+class RandomStrategy(Strategy):
+    '''
+    RandomStrategy object. Every hex able to attack at turn's start attacks
+    random enemy neighbour, it's baseline for other strategies
+    '''
+
+    def get_attacks(self, board, player_index, rng):
+        for coords in get_attacking_hexes_coords(board, player_index):
+            targets = board.get_enemy_neighbours_coords(coords, player_index)
+
+            if targets:
+                yield coords, targets[rng.randrange(len(targets))]
+
+
+STRATEGIES = {
+    'greedy': GreedyStrategy,
+    'cautious': CautiousStrategy,
+    'strategic': StrategicStrategy,
+    'random': RandomStrategy,
+}
+
+
+def get_attacking_hexes_coords(board, player_index):
+    '''Returns coords of all player's hexes able to attack
+
+    Arguments:
+        board {board.Board}
+        player_index {int}
+
+    Returns:
+        list(tuple(int, int))
+    '''
+
+    return [tuple(coords) for coords in numpy.argwhere(
+        (board.owner_map == player_index) & (board.dice_map > 1)).tolist()]
+
+
+class AIWorker(threading.Thread):
+    '''
+    AIWorker object. Plays enemies turns on its own copy of the board and
+    posts chosen attacks and added dice back through results queue, so main
+    loop only applies and animates them
+    '''
+
+    def __init__(self, strategies=None):
+        super().__init__(daemon=True)
+
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+
+        # player's index -> strategy, greedy one plays the rest
+        self.strategies = strategies or {}
+        self.default_strategy = GreedyStrategy()
+
+    def request_turn(self, generation, board, additional_dice_list,
+                     die_sides_number, max_dice_on_single_hex, seed,
+                     first_player_index=0):
+        '''Posts snapshot of the board for which enemies turns are played
+
+        Arguments:
+            generation {int} -- map's generation, it's sent back with
+                every result
+            board {board.Board} -- board snapshot, it mustn't be used by
+                caller anymore
+            additional_dice_list {list(int)} -- additional dice per player
+            die_sides_number {int}
+            max_dice_on_single_hex {int}
+            seed {int} -- seed of turn's random numbers generator
+            first_player_index {int} -- player whose turn is played first,
+                0 means human's dice adding and then all enemies turns
+        '''
+
+        self.requests.put((generation, board, list(additional_dice_list),
+                           die_sides_number, max_dice_on_single_hex, seed,
+                           first_player_index))
+
+    def get_result(self):
+        '''Returns next result or None if there is no result ready
+
+        Returns:
+            tuple(int, tuple) or None -- generation and event
+        '''
+
+        try:
+            return self.results.get_nowait()
+        except queue.Empty:
+            return None
+
+    def stop(self):
+        '''Finishes worker's loop, current turn is abandoned'''
+        self.requests.put(None)
+
+    def run(self):
+        '''Worker's loop'''
+        while True:
+            request = self.requests.get()
+            if request is None:
+                return
+
+            for event in self.play_turn(*request[1:]):
+                self.results.put((request[0], event))
+
+                if not self.requests.empty():
+                    break
+
+    def play_turn(self, board, additional_dice_list, die_sides_number,
+                  max_dice_on_single_hex, seed, first_player_index=0):
+        '''Plays human's dice adding and enemies turns, yields events:
+               ('attack', attacking_coords, defending_coords,
+                attacking_hex_power, defending_hex_power) and
+               ('dice', player_index, added_dice_coords, additional_dice)
+
+        Arguments:
+            board {board.Board}
+            additional_dice_list {list(int)} -- additional dice per player
+            die_sides_number {int}
+            max_dice_on_single_hex {int}
+            seed {int} -- seed of turn's random numbers generator
+            first_player_index {int}
+        '''
+
+        rng = random.Random(seed)
+
+        if first_player_index == 0:
+            yield self.__add_dice(board, 0, additional_dice_list,
+                                  max_dice_on_single_hex, rng)
+
+        for player_index in range(max(first_player_index, 1),
+                                  len(additional_dice_list)):
+            yield from self.play_player_turn(
+                board, player_index, additional_dice_list, die_sides_number,
+                max_dice_on_single_hex, rng)
+
+    def play_player_turn(self, board, player_index, additional_dice_list,
+                         die_sides_number, max_dice_on_single_hex, rng):
+        '''Plays attacks chosen by player's strategy and adds dice, yields
+               the same events as play_turn
+
+        Arguments:
+            board {board.Board}
+            player_index {int}
+            additional_dice_list {list(int)} -- additional dice per player
+            die_sides_number {int}
+            max_dice_on_single_hex {int}
+            rng {random.Random}
+        '''
+
+        for coords, defending_coords in self.get_strategy(
+                player_index).get_attacks(board, player_index, rng):
+            attacking_hex_power = board.roll_dice(coords, die_sides_number,
+                                                  rng)
+            defending_hex_power = board.roll_dice(defending_coords,
+                                                  die_sides_number, rng)
+
+            board.resolve_fight(coords, defending_coords,
+                                attacking_hex_power, defending_hex_power)
+
+            yield ('attack', coords, defending_coords, attacking_hex_power,
+                   defending_hex_power)
+
+        yield self.__add_dice(board, player_index, additional_dice_list,
+                              max_dice_on_single_hex, rng)
+
+    def get_strategy(self, player_index):
+        '''Returns strategy playing given player
+
+        Arguments:
+            player_index {int}
+
+        Returns:
+            Strategy
+        '''
+
+        return self.strategies.get(player_index, self.default_strategy)
+
+    def __add_dice(self, board, player_index, additional_dice_list,
+                   max_dice_on_single_hex, rng):
+        '''Adds dice to player's hexes and returns event describing it
+
+        Arguments:
+            board {board.Board}
+            player_index {int}
+            additional_dice_list {list(int)} -- additional dice per player
+            max_dice_on_single_hex {int}
+            rng {random.Random}
+
+        Returns:
+            tuple -- dice event
+        '''
+
+        added_dice_coords, additional_dice_list[player_index] = \
+            board.add_dice(player_index, additional_dice_list[player_index],
+                           max_dice_on_single_hex, rng)
+
+        return ('dice', player_index, added_dice_coords,
+                additional_dice_list[player_index])
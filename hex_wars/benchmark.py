@@ -0,0 +1,333 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import json
+import platform
+import random
+import statistics
+import subprocess
+import time
+import tracemalloc
+
+import ai
+import game
+import map
+import rasterizer
+
+
+VIEW_SIZE = (1024, 768)
+RIGHT_BAR_WIDTH = 256
+HEX_PERCENTAGE = 60
+DICE_PER_HEX = 4
+DIE_SIDES_NUMBER = 6
+MAX_DICE_ON_SINGLE_HEX = 8
+PICKED_POINTS_NUMBER = 1000
+
+
+class BenchmarkCase:
+    '''
+    BenchmarkCase object. Map and board generated from fixed seed for one
+    map size and players number, shared by all benchmarks of the case
+    '''
+
+    def __init__(self, size, players_number, seed):
+        self.size = size
+        self.players_number = players_number
+        self.seed = seed
+
+        rng = random.Random(seed)
+        players = [game.Player((rng.randrange(256), rng.randrange(256),
+                                rng.randrange(256)))
+                   for player in range(players_number)]
+
+        self.map_ = map.Map(
+            (size, size), max(players_number, size * size *
+                              HEX_PERCENTAGE // 100),
+            players, DICE_PER_HEX, 32, VIEW_SIZE, None, seed)
+        self.board = self.map_.generate_board(seed)
+        self.map_.create_map(self.board.copy())
+
+        self.board_rasterizer = rasterizer.BoardRasterizer(
+            self.map_, (VIEW_SIZE[0] - RIGHT_BAR_WIDTH, VIEW_SIZE[1]))
+
+        self.points = [(rng.randrange(VIEW_SIZE[0] - RIGHT_BAR_WIDTH),
+                        rng.randrange(VIEW_SIZE[1]))
+                       for point in range(PICKED_POINTS_NUMBER)]
+
+
+# benchmarks, every one prepares its data and returns function to time
+def benchmark_generate_board(case):
+    '''Hexes and dice distribution from seed'''
+    return lambda: case.map_.generate_board(case.seed)
+
+
+def benchmark_distribute_dice(case):
+    '''Dice distribution with fairness check'''
+    board_ = case.board.copy()
+    board_.dice_map[:] = 0
+    rng = random.Random(case.seed)
+
+    return lambda: case.map_.distribute_dice(board_, rng)
+
+
+def benchmark_create_map(case):
+    '''Hex objects creation for generated board'''
+    board_ = case.board.copy()
+
+    return lambda: case.map_.create_map(board_)
+
+
+def benchmark_add_dice(case):
+    '''Adding dice to first player's hexes'''
+    board_ = case.board.copy()
+    rng = random.Random(case.seed)
+
+    return lambda: board_.add_dice(0, 0, MAX_DICE_ON_SINGLE_HEX, rng)
+
+
+def benchmark_count_connected_hexes(case):
+    '''Biggest connected region of first player'''
+    return lambda: case.board.count_connected_hexes(0)
+
+
+def benchmark_ai_turn(case):
+    '''Whole turn of all players played by ai'''
+    board_ = case.board.copy()
+    ai_worker = ai.AIWorker()
+
+    return lambda: list(ai_worker.play_turn(
+        board_, [0] * case.players_number, DIE_SIDES_NUMBER,
+        MAX_DICE_ON_SINGLE_HEX, case.seed))
+
+
+def benchmark_get_visibile_hex_list(case):
+    '''List of hexes in visibility range'''
+    right_bar_rect = (VIEW_SIZE[0] - RIGHT_BAR_WIDTH, 0, RIGHT_BAR_WIDTH,
+                      VIEW_SIZE[1])
+
+    return lambda: case.map_.get_visibile_hex_list(right_bar_rect)
+
+
+def benchmark_move_polygons(case):
+    '''Moving map by one pixel'''
+    return lambda: case.map_.move_polygons([1, 1])
+
+
+def benchmark_picking(case):
+    '''Finding hexes under random points'''
+    # first pick builds lookups, they are reused by all next picks
+    case.board_rasterizer.get_hex_coords(case.points[0])
+
+    def pick():
+        for point in case.points:
+            case.board_rasterizer.get_hex_coords(point)
+
+    return pick
+
+
+BENCHMARKS = {
+    'generate_board': benchmark_generate_board,
+    'distribute_dice': benchmark_distribute_dice,
+    'create_map': benchmark_create_map,
+    'add_dice': benchmark_add_dice,
+    'count_connected_hexes': benchmark_count_connected_hexes,
+    'ai_turn': benchmark_ai_turn,
+    'get_visibile_hex_list': benchmark_get_visibile_hex_list,
+    'move_polygons': benchmark_move_polygons,
+    'picking': benchmark_picking,
+}
+
+
+# running
+def run_benchmark(case, name, repeat, max_time):
+    '''Times benchmark at least once, then until it was repeated given number
+           of times or max time passed. Data is prepared again before every
+           run, so runs don't affect each other
+
+    Arguments:
+        case {BenchmarkCase}
+        name {str} -- key of BENCHMARKS
+        repeat {int}
+        max_time {float} -- seconds
+
+    Returns:
+        dict -- benchmark's result
+    '''
+
+    times = []
+    while len(times) < repeat and sum(times) < max_time or not times:
+        function = BENCHMARKS[name](case)
+
+        start_time = time.perf_counter()
+        function()
+        times.append(time.perf_counter() - start_time)
+
+    return {
+        'benchmark': name,
+        'size': case.size,
+        'players_number': case.players_number,
+        'seed': case.seed,
+        'times': times,
+        'min': min(times),
+        'median': statistics.median(times),
+    }
+
+
+def measure_hex_memory(case):
+    '''Measures memory allocated by create_map with tracemalloc
+
+    Arguments:
+        case {BenchmarkCase}
+
+    Returns:
+        dict -- bytes per hex kept after create_map and at its peak
+    '''
+
+    board_ = case.board.copy()
+    case.map_.create_map(case.board.copy())
+
+    tracemalloc.start()
+    case.map_.create_map(board_)
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'size': case.size,
+        'players_number': case.players_number,
+        'bytes_per_hex': current / case.map_.hex_number,
+        'peak_bytes_per_hex': peak / case.map_.hex_number,
+    }
+
+
+def get_commit():
+    '''Returns current git commit or None if it's unknown
+
+    Returns:
+        str or None
+    '''
+
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+            check=True, cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, players_numbers, names, seed, repeat, max_time, memory):
+    '''Runs benchmarks for every map size and players number
+
+    Arguments:
+        sizes {list(int)} -- maps are square
+        players_numbers {list(int)}
+        names {list(str)} -- keys of BENCHMARKS
+        seed {int}
+        repeat {int}
+        max_time {float} -- seconds
+        memory {bool} -- if True, memory used by hexes is measured too
+
+    Returns:
+        dict -- results with information about machine and commit
+    '''
+
+    results = []
+    memory_results = []
+    for size in sizes:
+        for players_number in players_numbers:
+            case = BenchmarkCase(size, players_number, seed)
+
+            if memory:
+                memory_result = measure_hex_memory(case)
+                memory_results.append(memory_result)
+
+                print('{:<24}{:>6}x{:<6}{:>4} players {:>9.1f} B/hex'.format(
+                    'hex_memory', size, size, players_number,
+                    memory_result['bytes_per_hex']))
+
+            for name in names:
+                result = run_benchmark(case, name, repeat, max_time)
+                results.append(result)
+
+                print('{:<24}{:>6}x{:<6}{:>4} players {:>12.3f} ms'.format(
+                    name, size, size, players_number,
+                    result['median'] * 1000))
+
+    return {
+        'commit': get_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+        'memory': memory_results,
+    }
+
+
+def compare(old_results, new_results):
+    '''Prints median time ratio of every benchmark present in both results
+
+    Arguments:
+        old_results {dict}
+        new_results {dict}
+    '''
+
+    def key(result):
+        return (result['benchmark'], result['size'],
+                result['players_number'])
+
+    old_medians = {key(result): result['median']
+                   for result in old_results['results']}
+
+    print('compared with {}'.format(old_results.get('commit')))
+    for result in new_results['results']:
+        if key(result) in old_medians:
+            name, size, players_number = key(result)
+            print('{:<24}{:>6}x{:<6}{:>4} players {:>8.2f}x'.format(
+                name, size, size, players_number,
+                result['median'] / old_medians[key(result)]))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Times engine hot paths and saves results as JSON')
+    parser.add_argument('--sizes', type=int, nargs='+',
+                        default=[10, 100, 1000])
+    parser.add_argument('--players', type=int, nargs='+', default=[2, 6, 20])
+    parser.add_argument('--benchmarks', nargs='+', choices=list(BENCHMARKS),
+                        default=list(BENCHMARKS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--max-time', type=float, default=2.0,
+                        help='seconds after which benchmark isn\'t repeated')
+    parser.add_argument('--memory', action='store_true',
+                        help='measures bytes per hex with tracemalloc')
+    parser.add_argument('--output', default='benchmark.json')
+    parser.add_argument('--compare', metavar='PATH',
+                        help='results of earlier run to compare with')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.players, args.benchmarks, args.seed,
+                  args.repeat, args.max_time, args.memory)
+
+    with open(args.output, 'w') as file_:
+        json.dump(results, file_, indent=4)
+
+    if args.compare:
+        with open(args.compare) as file_:
+            compare(json.load(file_), results)
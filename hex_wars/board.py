@@ -0,0 +1,258 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import collections
+import functools
+import numpy
+
+
+# shifts of 2d array index leading to hex's neighbours
+NEIGHBOUR_SHIFTS = ((-1, 0), (-1, 1), (1, 0), (1, -1), (0, -1), (0, 1))
+
+
+class Board:
+    '''
+    Board object. Array representation of map's state: owner (player's
+    index, -1 where there is no hex) and dice number of every hex
+    '''
+
+    def __init__(self, size, owner_map=None, dice_map=None):
+        self.size = tuple(size)
+
+        if owner_map is None:
+            owner_map = numpy.full(self.size, -1, dtype=numpy.int16)
+        if dice_map is None:
+            dice_map = numpy.zeros(self.size, dtype=numpy.int16)
+
+        self.owner_map = owner_map
+        self.dice_map = dice_map
+
+        # seed board was generated with, None if it's unknown
+        self.seed = None
+
+    def copy(self):
+        '''Returns independent copy of board
+
+        Returns:
+            Board
+        '''
+
+        board = Board(self.size)
+        board.owner_map[:] = self.owner_map
+        board.dice_map[:] = self.dice_map
+
+        return board
+
+    # neighbourhood
+    def is_point_on_board(self, point):
+        '''Returns True if point is in board's boundaries else False
+
+        Arguments:
+            point {list(int, int)} -- point (index on 2d array board)
+
+        Returns:
+            bool
+        '''
+
+        return 0 <= point[0] < self.size[0] and 0 <= point[1] < self.size[1]
+
+    def get_neighbours_coords(self, coords):
+        '''Returns coords of all hexes next to given coords
+
+        Arguments:
+            coords {list(int, int)} -- hex's coords given as 2d array index
+
+        Returns:
+            list(tuple(int, int)) -- neighbours coords
+        '''
+
+        neighbours = []
+
+        for shift in NEIGHBOUR_SHIFTS:
+            point = (coords[0] + shift[0], coords[1] + shift[1])
+            if self.is_point_on_board(point) and self.owner_map[point] >= 0:
+                neighbours.append(point)
+
+        return neighbours
+
+    def get_enemy_neighbours_coords(self, coords, player_index):
+        '''Returns coords of hexes next to given coords owned by other players
+
+        Arguments:
+            coords {list(int, int)} -- hex's coords given as 2d array index
+            player_index {int}
+
+        Returns:
+            list(tuple(int, int)) -- enemy neighbours coords
+        '''
+
+        return [point for point in self.get_neighbours_coords(coords)
+                if self.owner_map[point] != player_index]
+
+    # dice
+    def count_connected_hexes(self, player_index):
+        '''Returns size of player's biggest group of connected hexes
+
+        Arguments:
+            player_index {int}
+
+        Returns:
+            int -- number of connected hexes
+        '''
+
+        visited = self.owner_map != player_index
+        max_ = 0
+
+        for start in numpy.argwhere(~visited).tolist():
+            start = tuple(start)
+            if visited[start]:
+                continue
+
+            visited[start] = True
+            queue = collections.deque([start])
+            count_ = 0
+
+            while queue:
+                coords = queue.popleft()
+                count_ += 1
+
+                for shift in NEIGHBOUR_SHIFTS:
+                    point = (coords[0] + shift[0], coords[1] + shift[1])
+                    if self.is_point_on_board(point) and not visited[point]:
+                        visited[point] = True
+                        queue.append(point)
+
+            if max_ < count_:
+                max_ = count_
+
+        return max_
+
+    def add_dice(self, player_index, additional_dice, max_dice_on_single_hex,
+                 rng):
+        '''Adds dice to player's hexes
+
+        Arguments:
+            player_index {int}
+            additional_dice {int} -- dice player couldn't place before
+            max_dice_on_single_hex {int}
+            rng {random.Random}
+
+        Returns:
+            tuple(list(tuple(int, int)), int) -- coords of hex for every
+                added die and dice which didn't fit on player's hexes
+        '''
+
+        hex_coords_list = [tuple(coords) for coords in numpy.argwhere(
+            self.owner_map == player_index).tolist()]
+
+        dice_to_add = self.count_connected_hexes(player_index) + \
+            additional_dice
+
+        max_dice_on_single_hex_to_add = int(
+            len(hex_coords_list) * max_dice_on_single_hex -
+            self.dice_map[self.owner_map == player_index].sum())
+
+        additional_dice = dice_to_add - max_dice_on_single_hex_to_add
+        if additional_dice < 0:
+            additional_dice = 0
+        elif additional_dice > 4 * max_dice_on_single_hex:
+            additional_dice = 4 * max_dice_on_single_hex
+
+        if dice_to_add > max_dice_on_single_hex_to_add:
+            dice_to_add = max_dice_on_single_hex_to_add
+
+        added_dice_coords = []
+        for die in range(dice_to_add):
+            while True:
+                coords = hex_coords_list[rng.randrange(
+                    len(hex_coords_list))]
+                if self.dice_map[coords] < max_dice_on_single_hex:
+                    self.dice_map[coords] += 1
+                    added_dice_coords.append(coords)
+                    break
+
+        return added_dice_coords, additional_dice
+
+    # fight
+    def roll_dice(self, coords, die_sides_number, rng):
+        '''Rolls all dice placed on hex and returns sum of rolls
+
+        Arguments:
+            coords {list(int, int)} -- hex's coords given as 2d array index
+            die_sides_number {int}
+            rng {random.Random}
+
+        Returns:
+            int -- hex's power
+        '''
+
+        power = 0
+        for die in range(self.dice_map[coords]):
+            power += rng.randrange(1, die_sides_number + 1)
+
+        return power
+
+    def resolve_fight(self, attacking_coords, defending_coords,
+                      attacking_hex_power, defending_hex_power):
+        '''Moves dice and ownership according to fight result
+
+        Arguments:
+            attacking_coords {tuple(int, int)}
+            defending_coords {tuple(int, int)}
+            attacking_hex_power {int}
+            defending_hex_power {int}
+        '''
+
+        if attacking_hex_power > defending_hex_power:
+            self.owner_map[defending_coords] = \
+                self.owner_map[attacking_coords]
+            self.dice_map[defending_coords] = \
+                self.dice_map[attacking_coords] - 1
+
+        self.dice_map[attacking_coords] = 1
+
+
+@functools.lru_cache(maxsize=8)
+def get_neighbours_indices(size):
+    '''Returns adjacency table of board's flattened arrays: flat indices of
+           every hex's neighbours in NEIGHBOUR_SHIFTS order. Neighbour
+           outside of board is given as hex's own index, so table can be
+           used for gathering without bounds checks
+
+    Arguments:
+        size {tuple(int, int)}
+
+    Returns:
+        numpy.ndarray -- read-only (hexes, 6) array
+    '''
+
+    rows, columns = numpy.indices(size)
+    neighbours_indices = numpy.empty(tuple(size) + (6,), numpy.intp)
+
+    for direction, shift in enumerate(NEIGHBOUR_SHIFTS):
+        neighbour_rows = rows + shift[0]
+        neighbour_columns = columns + shift[1]
+        on_board = (neighbour_rows >= 0) & (neighbour_rows < size[0]) & \
+            (neighbour_columns >= 0) & (neighbour_columns < size[1])
+
+        neighbours_indices[..., direction] = numpy.where(
+            on_board, neighbour_rows * size[1] + neighbour_columns,
+            rows * size[1] + columns)
+
+    neighbours_indices = neighbours_indices.reshape(-1, 6)
+    neighbours_indices.flags.writeable = False
+
+    return neighbours_indices
@@ -0,0 +1,381 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import argparse
+import asyncio
+import random
+import struct
+import sys
+import threading
+import numpy
+
+import board
+import protocol
+
+
+class GameClient:
+    '''
+    GameClient object. Connection to game server, keeps copy of game's
+    board updated from keyframe and deltas sent by server. It only sends
+    intents, server decides what happens
+    '''
+
+    def __init__(self):
+        self.reader = None
+        self.writer = None
+
+        self.seat = None
+        self.players_number = 0
+        self.size = None
+        self.board = None
+
+        self.turn = 0
+        self.current_player_index = 0
+        self.winner = None
+        self.errors = []
+        # error which ended connection, None while it's open or when game
+        # ended normally
+        self.connection_error = None
+
+        # it's bigger after every applied message, board is changed under
+        # lock, so other threads can copy it safely
+        self.version = 0
+        self.lock = threading.Lock()
+
+    async def connect(self, host, port, game_id, spectate=False):
+        '''Joins game and waits for its board
+
+        Arguments:
+            host {str}
+            port {int}
+            game_id {int}
+            spectate {bool} -- if True, only watches game
+
+        Raises:
+            protocol.ProtocolError -- if server refused to join
+        '''
+
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+        self.writer.write(protocol.encode(
+            protocol.SPECTATE if spectate else protocol.JOIN,
+            protocol.JOIN_BODY.pack(game_id)))
+
+        while self.board is None:
+            message_type = await self.receive()
+            if message_type == protocol.ERROR:
+                raise protocol.ProtocolError(
+                    'server refused to join, error {}'.format(
+                        self.errors[-1]))
+
+    async def close(self):
+        '''Leaves game'''
+        self.writer.close()
+        await self.writer.wait_closed()
+
+    # intents
+    async def attack(self, attacking_coords, defending_coords):
+        '''Sends attack intent
+
+        Arguments:
+            attacking_coords {tuple(int, int)}
+            defending_coords {tuple(int, int)}
+        '''
+
+        self.writer.write(protocol.encode(
+            protocol.ATTACK, protocol.ATTACK_BODY.pack(*attacking_coords,
+                                                       *defending_coords)))
+        await self.writer.drain()
+
+    async def end_turn(self):
+        '''Sends end turn intent'''
+        self.writer.write(protocol.encode(protocol.END_TURN))
+        await self.writer.drain()
+
+    # updates
+    async def receive(self):
+        '''Reads and applies one message
+
+        Raises:
+            asyncio.IncompleteReadError -- if server closed connection
+
+        Returns:
+            int -- message's type
+        '''
+
+        message_type, body = await protocol.read_message(self.reader)
+        self.apply(message_type, body)
+
+        return message_type
+
+    def apply(self, message_type, body):
+        '''Applies one message, it can also come from spectator stream
+
+        Arguments:
+            message_type {int}
+            body {bytes}
+        '''
+
+        with self.lock:
+            if message_type == protocol.WELCOME:
+                self.seat, self.players_number, rows, columns = \
+                    protocol.WELCOME_BODY.unpack(body)
+                self.size = (rows, columns)
+            elif message_type == protocol.KEYFRAME:
+                self.turn, self.current_player_index, owner_map, dice_map = \
+                    protocol.decode_keyframe(body, self.size)
+                self.board = board.Board(self.size, owner_map, dice_map)
+            elif message_type == protocol.DELTA:
+                self.turn, self.current_player_index, cells = \
+                    protocol.decode_delta(body)
+                self.board.owner_map.ravel()[cells['index']] = cells['owner']
+                self.board.dice_map.ravel()[cells['index']] = cells['dice']
+            elif message_type == protocol.GAME_OVER:
+                self.winner = protocol.GAME_OVER_BODY.unpack(body)[0]
+            elif message_type == protocol.ERROR:
+                self.errors.append(protocol.ERROR_BODY.unpack(body)[0])
+
+            self.version += 1
+
+    async def wait_for_turn(self):
+        '''Applies messages until it's client's turn or game is over'''
+        while self.winner is None and self.current_player_index != self.seat:
+            await self.receive()
+
+    def is_my_turn(self):
+        '''Returns True if client may play now
+
+        Returns:
+            bool
+        '''
+
+        return self.winner is None and self.current_player_index == self.seat
+
+    def is_spectator(self):
+        '''Returns True if client only watches game
+
+        Returns:
+            bool
+        '''
+
+        return self.seat == protocol.SPECTATOR_SEAT
+
+    def get_local_owner_map(self):
+        '''Returns owner map with players renumbered so client's seat is 0,
+               as single player game sees human, spectator sees it as it is
+
+        Returns:
+            numpy.ndarray
+        '''
+
+        if self.is_spectator():
+            return self.board.owner_map.copy()
+
+        return numpy.where(self.board.owner_map >= 0,
+                           (self.board.owner_map - self.seat) %
+                           self.players_number, -1).astype(numpy.int16)
+
+
+class RemoteGameplay:
+    '''
+    RemoteGameplay object. Stands for game.Gameplay in graphics and event
+    handler when game is hosted by server: human's attacks and end of turn
+    are sent as intents and board is copied from client, with client's seat
+    shown as player 0. Client runs its connection in background thread
+    '''
+
+    def __init__(self, map_, client, loop, die_sides_number=6,
+                 max_dice_on_single_hex=8):
+        self.map_ = map_
+        self.client = client
+        self.loop = loop
+
+        self.die_sides_number = die_sides_number
+        self.max_dice_on_single_hex = max_dice_on_single_hex
+        self.fight_time = 0
+
+        self.attacking_hex = None
+        self.defending_hex = None
+        self.attacking_hex_power = 0
+        self.defending_hex_power = 0
+        self.fight_finished = False
+
+        self.current_player_index = 1
+        self.client_version = None
+
+        # game is recorded by server, these are None like in local game
+        # which isn't recorded
+        self.replay_log = None
+        self.spectator_stream = None
+        self.history = None
+
+    def handle_ai(self):
+        '''Copies board and turn from client if server sent anything, quits
+               game if connection was lost
+        '''
+
+        if self.client.connection_error:
+            sys.exit('connection to server lost: {}'.format(
+                self.client.connection_error))
+
+        if self.client_version == self.client.version:
+            return
+
+        with self.client.lock:
+            self.client_version = self.client.version
+
+            owner_map = self.client.get_local_owner_map()
+            changed = numpy.argwhere(owner_map != self.map_.board.owner_map)
+
+            self.map_.board.owner_map[:] = owner_map
+            self.map_.board.dice_map[:] = self.client.board.dice_map
+
+            if changed.size:
+                self.map_.report_changed_hexes(
+                    [tuple(coords) for coords in changed.tolist()])
+
+            self.current_player_index = 0 if self.client.is_my_turn() else 1
+
+    def turn(self):
+        '''Sends end turn intent'''
+        self.current_player_index = 1
+        self.attacking_hex = None
+
+        asyncio.run_coroutine_threadsafe(self.client.end_turn(), self.loop)
+
+    def fight(self):
+        '''Sends attack intent when both hexes are chosen'''
+        if self.attacking_hex and self.defending_hex:
+            asyncio.run_coroutine_threadsafe(
+                self.client.attack(self.attacking_hex.coords,
+                                   self.defending_hex.coords), self.loop)
+
+            self.attacking_hex = None
+            self.defending_hex = None
+
+    def fight_finish(self):
+        '''Fights are resolved by server'''
+
+    def is_hex_next_to_attacking_hex(self, hex_):
+        '''Returns True if hexes are neighbours else False
+
+        Arguments:
+            hex_ {map.Hex} -- candidate hex
+
+        Returns:
+            bool
+        '''
+
+        return hex_.coords in self.map_.board.get_neighbours_coords(
+            self.attacking_hex.coords)
+
+    def set_fight_time(self, fight_time):
+        '''Fights aren't animated, fight time is only kept for sliders
+
+        Arguments:
+            fight_time {int} -- fight time in milliseconds
+        '''
+
+        self.fight_time = fight_time
+
+    def set_rules(self, die_sides_number, max_dice_on_single_hex):
+        '''Rules are decided by server'''
+
+
+def run_connection(client, loop, host, port, game_id, connected,
+                   spectate=False):
+    '''Connects client and applies server's messages in background thread
+
+    Arguments:
+        client {GameClient}
+        loop {asyncio.AbstractEventLoop}
+        host {str}
+        port {int}
+        game_id {int}
+        connected {threading.Event} -- it's set when board was received
+            or when connecting failed, error is in client's
+            connection_error then
+        spectate {bool} -- if True, only watches game
+    '''
+
+    async def receive_loop():
+        try:
+            await client.connect(host, port, game_id, spectate)
+            connected.set()
+
+            while client.winner is None:
+                await client.receive()
+        finally:
+            if client.writer:
+                client.writer.close()
+
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(receive_loop())
+    except asyncio.IncompleteReadError:
+        client.connection_error = ConnectionError('server closed connection')
+    except (OSError, struct.error, protocol.ProtocolError) as error:
+        client.connection_error = error
+    finally:
+        connected.set()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Joins networked game')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--game', type=int, default=0, help='game\'s id')
+    parser.add_argument('--spectate', action='store_true',
+                        help='watches game without taking seat')
+    args = parser.parse_args()
+
+    import pygame
+
+    import events
+    import game
+    import graphics
+    import map
+
+    client = GameClient()
+    loop = asyncio.new_event_loop()
+    connected = threading.Event()
+    threading.Thread(target=run_connection, daemon=True,
+                     args=(client, loop, args.host, args.port, args.game,
+                           connected, args.spectate)).start()
+    connected.wait()
+
+    if client.connection_error:
+        sys.exit('can\'t join game: {}'.format(client.connection_error))
+
+    graphics.init_pygame()
+    resolution = pygame.display.Info()
+    window_size = (resolution.current_w, resolution.current_h)
+
+    rng = random.Random(args.game)
+    players = [game.Player((255, 0, 0))] + [
+        game.Player((rng.randrange(256), rng.randrange(256),
+                     rng.randrange(256)))
+        for player in range(client.players_number - 1)]
+
+    map_ = map.Map(client.size, int((client.board.owner_map >= 0).sum()),
+                   players, 4, 32, window_size)
+    with client.lock:
+        map_.create_map(board.Board(client.size,
+                                    client.get_local_owner_map(),
+                                    client.board.dice_map.copy()))
+
+    gameplay = RemoteGameplay(map_, client, loop)
+    graphics_ = graphics.Graphics(map_, gameplay, window_size)
+    events.EventHandler(map_, graphics_, gameplay, remote=True).event_loop()
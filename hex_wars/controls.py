@@ -27,6 +27,17 @@ class Control:
         self.font = font
         self.color = color
 
+        self.is_dirty = True
+
+    def needs_render(self):
+        '''Returns True if control changed since it was rendered last time
+
+        Returns:
+            bool
+        '''
+
+        return self.is_dirty
+
     def is_point_in_rect(self, point):
         '''Returns true if point is in button's rect
 
@@ -85,7 +96,8 @@ class Slider(Control):
     '''Slider control'''
 
     def __init__(self, rect, text_rect_shift, title, font, min_value,
-                 max_value, default_value, step, color, slider_color):
+                 max_value, default_value, step, color, slider_color,
+                 background_color):
         super().__init__(rect, title, font, color)
 
         self.slider_rect = self.rect[:]
@@ -101,6 +113,13 @@ class Slider(Control):
         self.step = step
 
         self.slider_color = slider_color
+        self.background_color = background_color
+
+        self.title_text = self.font.render(self.title, True, (255, 255, 255))
+        self.title_text_rect = self.title_text.get_rect(
+            topleft=self.text_rect[:2])
+
+        self.observers = []
 
         self.__set_starting_position()
 
@@ -111,6 +130,15 @@ class Slider(Control):
         self.slider_rect[0] += slider_relative * \
             (self.rect[2] - self.slider_rect[2])
 
+    def add_observer(self, observer):
+        '''Adds function called with new value every time value changes
+
+        Arguments:
+            observer {function(int)}
+        '''
+
+        self.observers.append(observer)
+
     def move_slider(self, shift):
         '''Moves slider by given shift
 
@@ -118,6 +146,9 @@ class Slider(Control):
             shift {list(int, int)}
         '''
 
+        slider_position = self.slider_rect[0]
+        value = self.value
+
         self.slider_rect[0] += shift[0]
         if self.slider_rect[0] < self.rect[0]:
             self.slider_rect[0] = self.rect[0]
@@ -135,6 +166,13 @@ class Slider(Control):
             (1.0 - slider_relative)) // \
             self.step * self.step
 
+        if self.slider_rect[0] != slider_position:
+            self.is_dirty = True
+
+        if self.value != value:
+            for observer in self.observers:
+                observer(self.value)
+
     def render(self, surface):
         '''Renders slider on surface
 
@@ -144,5 +182,47 @@ class Slider(Control):
 
         pygame.draw.rect(surface, self.color, self.rect)
         pygame.draw.rect(surface, self.slider_color, self.slider_rect)
-        title_text = self.font.render(self.title, True, (255, 255, 255))
-        surface.blit(title_text, self.text_rect)
+        # surface keeps previous render, antialiased text blitted on itself
+        # gets bolder every time
+        surface.fill(self.background_color, self.title_text_rect)
+        surface.blit(self.title_text, self.title_text_rect)
+
+
+class ControlsIndex:
+    '''
+    Spatial index of controls. Controls are kept in buckets of rows, so
+    finding control under point checks only controls in point's row
+    '''
+
+    def __init__(self, row_height):
+        self.row_height = row_height
+        self.rows = {}
+
+    def add(self, control):
+        '''Adds control to every row it overlaps
+
+        Arguments:
+            control {Control}
+        '''
+
+        first_row = int(control.rect[1] // self.row_height)
+        last_row = int((control.rect[1] + control.rect[3]) // self.row_height)
+
+        for row in range(first_row, last_row + 1):
+            self.rows.setdefault(row, []).append(control)
+
+    def get_control(self, point):
+        '''Returns control under point or None
+
+        Arguments:
+            point {list(int, int)} -- point, mostly mouse position
+
+        Returns:
+            Control or None
+        '''
+
+        for control in self.rows.get(int(point[1] // self.row_height), []):
+            if control.is_point_in_rect(point):
+                return control
+
+        return None
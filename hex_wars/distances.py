@@ -0,0 +1,159 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import numpy
+
+import board
+
+
+# distance of hexes which can't be reached from any source
+UNREACHABLE = numpy.iinfo(numpy.int32).max
+
+
+def get_distances(neighbours_indices, sources, passable):
+    '''Breadth-first search from all sources at once, every step expands
+           whole frontier with one gather from adjacency table
+
+    Arguments:
+        neighbours_indices {numpy.ndarray} -- see
+            board.get_neighbours_indices
+        sources {numpy.ndarray} -- flat bool array
+        passable {numpy.ndarray} -- flat bool array, hexes search can enter
+
+    Returns:
+        numpy.ndarray -- flat int32 array of distances in hexes
+    '''
+
+    distances = numpy.full(sources.size, UNREACHABLE, dtype=numpy.int32)
+    frontier = numpy.flatnonzero(sources)
+    distances[frontier] = 0
+
+    # position of hex in new frontier, to drop hexes reached twice
+    positions = numpy.empty(sources.size, dtype=numpy.intp)
+
+    distance = 0
+    while frontier.size:
+        distance += 1
+
+        neighbours = neighbours_indices[frontier].ravel()
+        neighbours = neighbours[(distances[neighbours] == UNREACHABLE) &
+                                passable[neighbours]]
+
+        neighbours_positions = numpy.arange(neighbours.size)
+        positions[neighbours] = neighbours_positions
+        frontier = neighbours[positions[neighbours] == neighbours_positions]
+        distances[frontier] = distance
+
+    return distances
+
+
+def label_regions(neighbours_indices, mask):
+    '''Labels groups of connected hexes with smallest flat index in group,
+           by taking neighbours labels and jumping to label's own label
+           until labels don't change
+
+    Arguments:
+        neighbours_indices {numpy.ndarray} -- see
+            board.get_neighbours_indices
+        mask {numpy.ndarray} -- flat bool array of hexes to group
+
+    Returns:
+        numpy.ndarray -- flat array, -1 outside of mask
+    '''
+
+    hexes = numpy.flatnonzero(mask)
+
+    hex_indices = numpy.full(mask.size, -1, dtype=numpy.intp)
+    hex_indices[hexes] = numpy.arange(hexes.size)
+
+    # (N, 6) compact indices of neighbours in mask, hex's own one elsewhere
+    neighbours = hex_indices[neighbours_indices[hexes]]
+    neighbours = numpy.where(neighbours >= 0, neighbours,
+                             numpy.arange(hexes.size)[:, None])
+
+    labels = numpy.arange(hexes.size)
+    while True:
+        new_labels = numpy.minimum(labels, labels[neighbours].min(axis=1))
+        new_labels = new_labels[new_labels]
+
+        if numpy.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+    regions = numpy.full(mask.size, -1, dtype=numpy.intp)
+    regions[hexes] = hexes[labels]
+
+    return regions
+
+
+class DistanceFields:
+    '''
+    DistanceFields object. Distances of every hex, counted in steps over
+    board's hexes, from player's frontier, from its largest region, from its
+    other regions and from strongest enemy stacks. They are computed once
+    per turn and reused by all player's decisions in it, so choosing attack
+    needs only lookups. Enemy hexes with at least strong_stack_dice dice are
+    strong stacks, by default those with the most dice enemies have
+    '''
+
+    def __init__(self, board_, player_index, strong_stack_dice=None):
+        self.size = board_.size
+        self.neighbours_indices = board.get_neighbours_indices(board_.size)
+
+        owner_list = board_.owner_map.ravel()
+        dice_list = board_.dice_map.ravel()
+
+        passable = owner_list >= 0
+        own = owner_list == player_index
+        enemy = passable & ~own
+
+        enemy_neighbours = enemy[self.neighbours_indices].any(axis=1)
+
+        regions = label_regions(self.neighbours_indices, own)
+        largest_region = numpy.zeros_like(own)
+        self.largest_region_size = 0
+        if own.any():
+            labels, sizes = numpy.unique(regions[own], return_counts=True)
+            largest_region = regions == labels[sizes.argmax()]
+            self.largest_region_size = int(sizes.max())
+
+        if strong_stack_dice is None:
+            strong_stack_dice = dice_list[enemy].max() if enemy.any() else 0
+        strong_enemies = enemy & (dice_list >= max(1, strong_stack_dice))
+
+        self.frontier = self.__get_field(own & enemy_neighbours, passable)
+        self.largest_region = self.__get_field(largest_region, passable)
+        self.other_regions = self.__get_field(own & ~largest_region,
+                                              passable)
+        self.strong_enemies = self.__get_field(strong_enemies, passable)
+
+        # enemy hexes which connect largest region with other region
+        self.joining = enemy.reshape(self.size) & \
+            (self.largest_region == 1) & (self.other_regions == 1)
+
+    def __get_field(self, sources, passable):
+        '''Returns distances from sources as 2d array
+
+        Arguments:
+            sources {numpy.ndarray} -- flat bool array
+            passable {numpy.ndarray} -- flat bool array
+
+        Returns:
+            numpy.ndarray
+        '''
+
+        return get_distances(self.neighbours_indices, sources,
+                             passable).reshape(self.size)
@@ -0,0 +1,491 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import argparse
+import multiprocessing
+import multiprocessing.shared_memory
+import random
+import time
+import numpy
+
+import ai
+import board
+import map
+import sharedboard
+
+
+# observation arrays: name -> (shape builder, dtype)
+OBSERVATION_SPECS = {
+    'owner': (lambda size, players_number: size, numpy.int16),
+    'dice': (lambda size, players_number: size, numpy.int16),
+    'owner_one_hot': (lambda size, players_number:
+                      (players_number,) + size, numpy.bool_),
+    'border': (lambda size, players_number: size, numpy.bool_),
+    'action_mask': (lambda size, players_number:
+                    (size[0] * size[1] * 6 + 1,), numpy.bool_),
+}
+# observations which are board's maps, vector environment shares them as
+# shared board
+BOARD_OBSERVATIONS = ('owner', 'dice')
+
+
+class HexWarsEnv:
+    '''
+    HexWarsEnv object. Gym-style environment, agent plays as player 0
+    against built-in ai.
+
+    Action is attacking hex's flat index * 6 + direction in
+    board.NEIGHBOUR_SHIFTS order, the last action ends turn. Observation is
+    dict of arrays which are updated in place every step: board's owner and
+    dice maps themselves, owner one-hot, border mask (agent's hexes next to
+    enemies) and legal actions mask. Caller has to copy them to keep them.
+
+    Reward is change of agent's share of hexes, plus 1 for winning and -1
+    for losing
+    '''
+
+    def __init__(self, size=(10, 10), hex_number=60, players_number=2,
+                 dice_per_hex=4, die_sides_number=6, max_dice_on_single_hex=8,
+                 max_turns=200, buffers=None):
+        self.size = tuple(size)
+        self.players_number = players_number
+        self.die_sides_number = die_sides_number
+        self.max_dice_on_single_hex = max_dice_on_single_hex
+        self.max_turns = max_turns
+
+        self.map_ = map.Map(self.size, hex_number, [None] * players_number,
+                            dice_per_hex, 0, (0, 0))
+        self.ai_worker = ai.AIWorker()
+        self.rng = random.Random()
+
+        self.observation = buffers or {
+            name: numpy.zeros(shape(self.size, players_number), dtype)
+            for name, (shape, dtype) in OBSERVATION_SPECS.items()}
+        self.end_turn_action = self.observation['action_mask'].size - 1
+        self.directions_mask = self.observation['action_mask'][:-1].reshape(
+            -1, 6)
+
+        self.players_indices = numpy.arange(players_number)[:, None, None]
+        self.neighbours_indices = board.get_neighbours_indices(self.size)
+
+        self.board = None
+        self.additional_dice = None
+        self.turn = 0
+        self.hexes_share = 0.0
+
+    # gym interface
+    def reset(self, seed=None):
+        '''Starts new game, environment's random numbers generator is
+               seeded again only if seed is given
+
+        Arguments:
+            seed {int}
+
+        Returns:
+            tuple(dict, dict) -- observation and info
+        '''
+
+        if seed is not None:
+            self.rng.seed(seed)
+
+        generated_board = self.map_.generate_board(self.rng.getrandbits(63))
+        self.observation['owner'][:] = generated_board.owner_map
+        self.observation['dice'][:] = generated_board.dice_map
+        self.board = board.Board(self.size, self.observation['owner'],
+                                 self.observation['dice'])
+
+        self.additional_dice = [0] * self.players_number
+        self.turn = 0
+
+        self.__update_observation()
+        self.hexes_share = self.__get_hexes_share()
+
+        return self.observation, {}
+
+    def step(self, action):
+        '''Plays action
+
+        Arguments:
+            action {int}
+
+        Raises:
+            ValueError -- if action isn't legal
+
+        Returns:
+            tuple(dict, float, bool, bool, dict) -- observation, reward,
+                terminated, truncated and info
+        '''
+
+        if not self.observation['action_mask'][action]:
+            raise ValueError('action {} isn\'t legal'.format(action))
+
+        if action == self.end_turn_action:
+            self.__play_enemies_turns()
+            self.turn += 1
+        else:
+            self.__attack(action)
+
+        self.__update_observation()
+
+        hexes_share = self.__get_hexes_share()
+        reward = hexes_share - self.hexes_share
+        self.hexes_share = hexes_share
+
+        terminated = hexes_share in (0.0, 1.0)
+        if terminated:
+            reward += 1.0 if hexes_share else -1.0
+
+        truncated = not terminated and self.turn >= self.max_turns
+
+        return self.observation, reward, terminated, truncated, {}
+
+    def get_legal_actions_mask(self):
+        '''Returns legal actions mask, it's updated in place every step
+
+        Returns:
+            numpy.ndarray -- bool array
+        '''
+
+        return self.observation['action_mask']
+
+    # rules
+    def __attack(self, action):
+        '''Plays agent's attack
+
+        Arguments:
+            action {int}
+        '''
+
+        flat_index, direction = divmod(action, 6)
+        coords = divmod(flat_index, self.size[1])
+        shift = board.NEIGHBOUR_SHIFTS[direction]
+        defending_coords = (coords[0] + shift[0], coords[1] + shift[1])
+
+        self.board.resolve_fight(
+            coords, defending_coords,
+            self.board.roll_dice(coords, self.die_sides_number, self.rng),
+            self.board.roll_dice(defending_coords, self.die_sides_number,
+                                 self.rng))
+
+    def __play_enemies_turns(self):
+        '''Adds agent's dice and plays enemies turns with built-in ai'''
+        for event in self.ai_worker.play_turn(
+                self.board, self.additional_dice, self.die_sides_number,
+                self.max_dice_on_single_hex, self.rng.getrandbits(64)):
+            pass
+
+    def __get_hexes_share(self):
+        '''Returns share of hexes owned by agent
+
+        Returns:
+            float
+        '''
+
+        return numpy.count_nonzero(self.observation['owner_one_hot'][0]) / \
+            self.map_.hex_number
+
+    # observation
+    def __update_observation(self):
+        '''Updates derived observation arrays in place'''
+        owner_list = self.board.owner_map.ravel()
+        own = self.observation['owner_one_hot'][0].ravel()
+
+        numpy.equal(self.board.owner_map, self.players_indices,
+                    out=self.observation['owner_one_hot'])
+
+        enemy_neighbours = owner_list[self.neighbours_indices] > 0
+
+        numpy.logical_and(
+            enemy_neighbours,
+            (own & (self.board.dice_map.ravel() > 1))[:, None],
+            out=self.directions_mask)
+        numpy.logical_and(own, enemy_neighbours.any(axis=1),
+                          out=self.observation['border'].ravel())
+
+        self.observation['action_mask'][-1] = True
+
+
+class VectorEnv:
+    '''
+    VectorEnv object. Runs many environments split between worker
+    processes. Actions, observations, rewards and flags of all environments
+    are kept in shared memory, one (N, ...) array each, so only short
+    commands go through pipes. Environment which finished is reset right
+    away, its observation is already the new game's one.
+
+    Boards of all environments are one shared board, its owner and dice
+    maps are owner and dice observations. Its version is odd while workers
+    step and turn is number of steps, so other processes can attach to it
+    by name and read consistent boards while training runs
+    '''
+
+    def __init__(self, envs_number, workers_number=None, **env_kwargs):
+        self.envs_number = envs_number
+        workers_number = min(envs_number, workers_number or
+                             multiprocessing.cpu_count())
+
+        size = tuple(env_kwargs.get('size', (10, 10)))
+        players_number = env_kwargs.get('players_number', 2)
+
+        self.shared_board = sharedboard.SharedBoard.create(
+            size, players_number, boards_number=envs_number)
+        self.steps = 0
+
+        specs = {name: ((envs_number,) + shape(size, players_number), dtype)
+                 for name, (shape, dtype) in OBSERVATION_SPECS.items()
+                 if name not in BOARD_OBSERVATIONS}
+        specs['action'] = ((envs_number,), numpy.int64)
+        specs['reward'] = ((envs_number,), numpy.float64)
+        specs['terminated'] = ((envs_number,), numpy.bool_)
+        specs['truncated'] = ((envs_number,), numpy.bool_)
+
+        self.shared_memories = {}
+        self.arrays = {}
+        for name, (shape, dtype) in specs.items():
+            self.shared_memories[name] = \
+                multiprocessing.shared_memory.SharedMemory(
+                    create=True, size=int(numpy.prod(shape)) *
+                    numpy.dtype(dtype).itemsize)
+            self.arrays[name] = numpy.ndarray(
+                shape, dtype, self.shared_memories[name].buf)
+
+        self.arrays['owner'] = self.shared_board.owner_maps
+        self.arrays['dice'] = self.shared_board.dice_maps
+
+        self.observation = {name: self.arrays[name]
+                            for name in OBSERVATION_SPECS}
+
+        shared_memory_names = {name: shared_memory.name for name, shared_memory
+                               in self.shared_memories.items()}
+
+        self.connections = []
+        self.processes = []
+        for worker_index in range(workers_number):
+            envs_range = (envs_number * worker_index // workers_number,
+                          envs_number * (worker_index + 1) // workers_number)
+
+            connection, worker_connection = multiprocessing.Pipe()
+            process = multiprocessing.Process(
+                target=run_worker, daemon=True,
+                args=(worker_connection, envs_range, specs,
+                      shared_memory_names, self.shared_board.name,
+                      env_kwargs))
+            process.start()
+
+            self.connections.append(connection)
+            self.processes.append(process)
+
+    def reset(self, seed=None):
+        '''Resets all environments, i-th one with seed + i
+
+        Arguments:
+            seed {int}
+
+        Returns:
+            tuple(dict, list(dict)) -- observations and infos
+        '''
+
+        with self.shared_board.writing(self.steps):
+            for connection in self.connections:
+                connection.send(('reset', seed))
+
+            infos = self.__receive_infos()
+
+        return self.observation, infos
+
+    def step(self, actions):
+        '''Plays one action in every environment
+
+        Arguments:
+            actions {numpy.ndarray} -- (N,) actions
+
+        Returns:
+            tuple(dict, numpy.ndarray, numpy.ndarray, numpy.ndarray,
+                list(dict)) -- observations, rewards, terminated, truncated
+                and infos
+        '''
+
+        self.arrays['action'][:] = actions
+        self.steps += 1
+
+        with self.shared_board.writing(self.steps):
+            for connection in self.connections:
+                connection.send(('step', None))
+
+            infos = self.__receive_infos()
+
+        return (self.observation, self.arrays['reward'],
+                self.arrays['terminated'], self.arrays['truncated'], infos)
+
+    def __receive_infos(self):
+        '''Waits for all workers and returns infos of all environments
+
+        Returns:
+            list(dict)
+        '''
+
+        infos = []
+        for connection in self.connections:
+            infos.extend(connection.recv())
+
+        return infos
+
+    def close(self):
+        '''Stops workers and frees shared memory'''
+        for connection in self.connections:
+            connection.send(('close', None))
+        for process in self.processes:
+            process.join()
+
+        self.arrays.clear()
+        self.observation.clear()
+        for shared_memory in self.shared_memories.values():
+            shared_memory.close()
+            shared_memory.unlink()
+        self.shared_board.close()
+
+
+def run_worker(connection, envs_range, specs, shared_memory_names,
+               shared_board_name, env_kwargs):
+    '''Vector environment's worker loop, steps range of environments
+
+    Arguments:
+        connection {multiprocessing.connection.Connection}
+        envs_range {tuple(int, int)} -- first and after last environment
+        specs {dict} -- array name -> (shape, dtype)
+        shared_memory_names {dict} -- array name -> shared memory name
+        shared_board_name {str} -- shared board with boards of all
+            environments, vector environment brackets steps with writing
+        env_kwargs {dict}
+    '''
+
+    shared_memories = {
+        name: multiprocessing.shared_memory.SharedMemory(shared_memory_name)
+        for name, shared_memory_name in shared_memory_names.items()}
+    arrays = {name: numpy.ndarray(shape, dtype, shared_memories[name].buf)
+              for name, (shape, dtype) in specs.items()}
+
+    shared_board = sharedboard.SharedBoard.attach(shared_board_name,
+                                                  writable=True)
+    arrays['owner'] = shared_board.owner_maps
+    arrays['dice'] = shared_board.dice_maps
+
+    envs = [HexWarsEnv(buffers={name: arrays[name][env_index, ...]
+                                for name in OBSERVATION_SPECS}, **env_kwargs)
+            for env_index in range(*envs_range)]
+
+    while True:
+        command, seed = connection.recv()
+
+        if command == 'reset':
+            connection.send([
+                env.reset(None if seed is None else seed + env_index)[1]
+                for env_index, env in enumerate(envs, envs_range[0])])
+        elif command == 'step':
+            infos = []
+            for env_index, env in enumerate(envs, envs_range[0]):
+                observation, reward, terminated, truncated, info = \
+                    env.step(int(arrays['action'][env_index]))
+
+                arrays['reward'][env_index] = reward
+                arrays['terminated'][env_index] = terminated
+                arrays['truncated'][env_index] = truncated
+
+                if terminated or truncated:
+                    env.reset()
+                infos.append(info)
+
+            connection.send(infos)
+        elif command == 'close':
+            break
+
+    envs.clear()
+    arrays.clear()
+    for shared_memory in shared_memories.values():
+        shared_memory.close()
+    shared_board.close()
+
+
+def choose_random_actions(action_masks, rng, end_turn_probability=0.1):
+    '''Chooses random legal action for every mask, ending turn with given
+           probability
+
+    Arguments:
+        action_masks {numpy.ndarray} -- (N, A) bool array
+        rng {numpy.random.Generator}
+        end_turn_probability {float}
+
+    Returns:
+        numpy.ndarray -- (N,) actions
+    '''
+
+    keys = numpy.where(action_masks, rng.random(action_masks.shape), -1)
+    actions = keys[:, :-1].argmax(axis=1)
+
+    end_turn = (keys[:, :-1].max(axis=1) < 0) | \
+        (rng.random(len(actions)) < end_turn_probability)
+    actions[end_turn] = action_masks.shape[1] - 1
+
+    return actions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Measures steps per second of random agent')
+    parser.add_argument('--map-size', type=int, nargs=2, default=[10, 10])
+    parser.add_argument('--hex-number', type=int, default=60)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--envs', type=int, default=0,
+                        help='number of vector environment\'s environments, '
+                             '0 runs single environment in this process')
+    parser.add_argument('--workers', type=int,
+                        help='number of vector environment\'s processes, '
+                             'number of cpus by default')
+    parser.add_argument('--steps', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    env_kwargs = {'size': tuple(args.map_size),
+                  'hex_number': args.hex_number,
+                  'players_number': args.players}
+    rng = numpy.random.default_rng(args.seed)
+
+    if args.envs:
+        env = VectorEnv(args.envs, args.workers, **env_kwargs)
+        observation, infos = env.reset(args.seed)
+
+        start_time = time.perf_counter()
+        for step in range(args.steps // args.envs):
+            env.step(choose_random_actions(observation['action_mask'], rng))
+        steps_time = time.perf_counter() - start_time
+
+        env.close()
+    else:
+        env = HexWarsEnv(**env_kwargs)
+        observation, info = env.reset(args.seed)
+
+        start_time = time.perf_counter()
+        for step in range(args.steps):
+            action = choose_random_actions(
+                observation['action_mask'][None], rng)[0]
+            observation, reward, terminated, truncated, info = \
+                env.step(action)
+
+            if terminated or truncated:
+                env.reset()
+        steps_time = time.perf_counter() - start_time
+
+    print('{:.0f} steps per second'.format(args.steps / steps_time))
@@ -17,7 +17,10 @@
 import pygame
 import sys
 
-import map
+import savegame
+
+
+SAVE_FILE_PATH = 'hex_wars.save'
 
 
 class EventHandler:
@@ -26,31 +29,59 @@ class EventHandler:
     main game loop
     '''
 
-    def __init__(self, map_, graphics, gameplay):
+    def __init__(self, map_, graphics, gameplay, replay_=None,
+                 profiler_=None, remote=False):
         self.map_ = map_
         self.graphics = graphics
         self.gameplay = gameplay
 
+        # replay played instead of human, None in normal game
+        self.replay_ = replay_
+        # profiler toggled with F3, None if it isn't available
+        self.profiler = profiler_
+        # True if game is hosted by server, map can't be changed locally
+        self.remote = remote
+
         self.last_mouse_pos = None
         self.last_mouse_pos_for_sliders = None
         self.slider_targeted = None
 
+        self.map_shift = [0, 0]
+        self.slider_shift = [0, 0]
+
+        # object timing stages of every frame, None if frames aren't timed
+        self.frame_timer = None
+
     def event_loop(self):
         '''Main event loop'''
         while True:
+            if self.frame_timer:
+                self.frame_timer.start_frame()
+
             self.handle_events()
             self.tick()
 
+            if self.frame_timer:
+                self.frame_timer.finish_frame()
+
     # Events handling
     def handle_events(self):
         '''Handles user input'''
         for event in pygame.event.get():
             self.__check_event_game_close(event)
 
+            self.__check_event_save(event)
+
+            self.__check_event_profiler(event)
+
             self.__check_event_mouse(event)
 
             self.__check_event_human_turn(event)
 
+        self.__apply_mouse_motion()
+
+        self.__mark_stage('handle_events')
+
     #
     # Nested event handling
     def __check_event_game_close(self, event):
@@ -61,6 +92,42 @@ class EventHandler:
             if event.key == pygame.K_q:
                 sys.exit(0)
 
+    def __check_event_save(self, event):
+        '''Checks if user wants to save (F5) or load (F9) the game'''
+        if event.type == pygame.KEYDOWN and \
+           not self.gameplay.fight_finished and self.__is_local_game():
+            if event.key == pygame.K_F5:
+                savegame.SaveFile(SAVE_FILE_PATH).save(self.map_,
+                                                       self.gameplay)
+            elif event.key == pygame.K_F9:
+                try:
+                    savegame.SaveFile(SAVE_FILE_PATH).load(self.map_,
+                                                           self.gameplay)
+                except (OSError, savegame.SaveFileError):
+                    pass
+
+    def __check_event_profiler(self, event):
+        '''Checks if user wants to toggle profiler (F3)'''
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+            self.toggle_profiler()
+
+    def toggle_profiler(self):
+        '''Enables or disables profiler and its overlay'''
+        if not self.profiler:
+            return
+
+        if self.profiler.enabled:
+            self.profiler.disable()
+            self.frame_timer = None
+            self.graphics.overlay = None
+        else:
+            self.profiler.enable()
+            # profiler may be toggled in the middle of frame, so timing
+            # starts from now instead of frame it wasn't there for
+            self.profiler.start_frame()
+            self.frame_timer = self.profiler
+            self.graphics.overlay = self.profiler
+
     def __check_event_mouse(self, event):
         '''Checks user input from mouse'''
         self.__check_event_mouse_button_down(event)
@@ -71,44 +138,61 @@ class EventHandler:
         '''Checks if event was MOUSEBUTTONDOWN and then handles it'''
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:
-                for slider in self.graphics.sliders:
-                    if slider.is_point_in_rect(pygame.mouse.get_pos()):
-                        self.last_mouse_pos_for_sliders = \
-                            pygame.mouse.get_pos()
-                        self.slider_targeted = slider
-                        break
-                else:
-                    if self.graphics.button_new_map.is_point_in_rect(
-                     pygame.mouse.get_pos()):
-                            self.graphics.set_options_for_new_map()
-                            self.map_.create_map()
+                control = self.graphics.controls_index.get_control(
+                    event.pos)
+
+                if control in self.graphics.sliders:
+                    self.last_mouse_pos_for_sliders = event.pos
+                    self.slider_targeted = control
+                elif control is self.graphics.button_new_map and \
+                        self.__is_local_game():
+                    self.graphics.set_options_for_new_map()
+                    self.map_.create_map()
+                elif control is self.graphics.minimap:
+                    self.graphics.minimap.jump_to_point(
+                        event.pos)
             elif event.button == 3:
-                self.last_mouse_pos = pygame.mouse.get_pos()
+                self.last_mouse_pos = event.pos
             elif event.button == 4:
                 self.map_.resize_polygons(self.map_.side_length + 2)
             elif event.button == 5:
                 self.map_.resize_polygons(self.map_.side_length - 2)
 
     def __check_event_mouse_motion(self, event):
-        '''Checks if event was MOUSEMOTION and then handles it'''
+        '''
+        Checks if event was MOUSEMOTION and then accumulates it, motion is
+        applied once per frame
+        '''
+
         if event.type == pygame.MOUSEMOTION:
             if self.last_mouse_pos:
-                current_pos = pygame.mouse.get_pos()
-                shift = [item1 - item2 for item1,
-                         item2 in zip(current_pos, self.last_mouse_pos)]
-                self.last_mouse_pos = current_pos
-                self.map_.move_polygons(shift)
+                self.map_shift = [
+                    item1 + item2 - item3 for item1, item2, item3 in
+                    zip(self.map_shift, event.pos, self.last_mouse_pos)]
+                self.last_mouse_pos = event.pos
             elif self.last_mouse_pos_for_sliders:
-                current_pos = pygame.mouse.get_pos()
-                shift = [item1 - item2 for item1,
-                         item2 in zip(current_pos,
-                                      self.last_mouse_pos_for_sliders)]
-                self.last_mouse_pos_for_sliders = current_pos
-                self.slider_targeted.move_slider(shift)
+                self.slider_shift = [
+                    item1 + item2 - item3 for item1, item2, item3 in
+                    zip(self.slider_shift, event.pos,
+                        self.last_mouse_pos_for_sliders)]
+                self.last_mouse_pos_for_sliders = event.pos
+
+    def __apply_mouse_motion(self):
+        '''Applies mouse motion accumulated since last call'''
+        if self.map_shift != [0, 0]:
+            self.map_.move_polygons(self.map_shift)
+            self.map_shift = [0, 0]
+
+        if self.slider_shift != [0, 0]:
+            if self.slider_targeted:
+                self.slider_targeted.move_slider(self.slider_shift)
+            self.slider_shift = [0, 0]
 
     def __check_event_mouse_button_up(self, event):
         '''Checks if event was MOUSEBUTTONUP and then handles it'''
         if event.type == pygame.MOUSEBUTTONUP:
+            self.__apply_mouse_motion()
+
             if event.button == 1:
                 self.last_mouse_pos_for_sliders = None
                 self.slider_targeted = None
@@ -117,7 +201,8 @@ class EventHandler:
 
     def __check_event_human_turn(self, event):
         '''Checks if current player is human and handles input'''
-        if self.gameplay.current_player_index == 0:
+        if self.gameplay.current_player_index == 0 and \
+           not self.gameplay.fight_finished and not self.replay_:
             self.__check_event_human_turn_keydown(event)
             self.__check_event_human_turn_mouse_button_down(event)
 
@@ -126,8 +211,11 @@ class EventHandler:
         if event.type == pygame.KEYDOWN:
             if event.key == pygame.K_SPACE:
                 self.gameplay.turn()
-            elif event.key == pygame.K_a:
+            elif event.key == pygame.K_a and self.__is_local_game():
                 self.map_.create_map()
+            elif event.key == pygame.K_u and self.__is_local_game() and \
+                    self.gameplay.history:
+                self.gameplay.history.undo(self.map_, self.gameplay)
 
     def __check_event_human_turn_mouse_button_down(self, event):
         '''
@@ -137,19 +225,28 @@ class EventHandler:
 
         if event.type == pygame.MOUSEBUTTONDOWN:
             if event.button == 1:
-                for hex_ in list(self.map_.hex_map.flat):
-                    if type(hex_) == map.Hex:
-                        if hex_.is_point_inside_polygon(
-                           pygame.mouse.get_pos()):
-                            if hex_.player == self.map_.players[0] and \
-                               hex_.dice_number > 1:
-                                self.gameplay.attacking_hex = hex_
-                            elif type(hex_.player) != \
-                                self.map_.players[0] and \
-                                self.gameplay.attacking_hex and \
-                                    self.gameplay.is_hex_next_to_attacking_hex(
-                                        hex_):
-                                self.gameplay.defending_hex = hex_
+                coords = self.graphics.board_rasterizer.get_hex_coords(
+                    event.pos)
+
+                if coords:
+                    hex_ = self.map_.hex_map[coords]
+                    if hex_.player == self.map_.players[0] and \
+                       hex_.dice_number > 1:
+                        self.gameplay.attacking_hex = hex_
+                    elif type(hex_.player) != self.map_.players[0] and \
+                        self.gameplay.attacking_hex and \
+                            self.gameplay.is_hex_next_to_attacking_hex(hex_):
+                        self.gameplay.defending_hex = hex_
+
+    def __is_local_game(self):
+        '''Returns True if game is played here, not replayed or hosted by
+               server
+
+        Returns:
+            bool
+        '''
+
+        return not self.replay_ and not self.remote
 
     def tick(self):
         '''
@@ -157,8 +254,25 @@ class EventHandler:
         input
         '''
 
+        if self.replay_:
+            self.replay_.step(self.map_, self.gameplay)
+
         self.gameplay.handle_ai()
+        self.__mark_stage('handle_ai')
+
         self.graphics.render()
-        self.graphics.read_sliders_values()
+        self.__mark_stage('render')
+
         self.gameplay.fight_finish()
         self.gameplay.fight()
+        self.__mark_stage('fight')
+
+    def __mark_stage(self, stage):
+        '''Tells frame timer, if there is one, that stage just finished
+
+        Arguments:
+            stage {str}
+        '''
+
+        if self.frame_timer:
+            self.frame_timer.mark_stage(stage)
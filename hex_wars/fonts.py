@@ -0,0 +1,169 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import collections
+import functools
+import json
+import os
+import pygame
+
+
+FONT_CACHE_FILE_PATH = os.path.join(
+    os.environ.get('XDG_CACHE_HOME') or
+    os.path.join(os.path.expanduser('~'), '.cache'), 'hex_wars', 'fonts.json')
+# loaded fonts kept in memory, dice numbers font changes size with zoom
+MAX_LOADED_FONTS = 32
+
+
+class FontCache:
+    '''
+    FontCache object. Resolves system fonts names to font files once and
+    keeps resolution in file, so next starts don't scan system fonts, which
+    pygame.font.SysFont does on its first call, e.g. with fc-list on Linux.
+    Loaded fonts are kept in memory, so getting font every frame is only
+    lookup
+    '''
+
+    def __init__(self, path=FONT_CACHE_FILE_PATH):
+        self.path = path
+
+        # 'name:bold' -> [font file, synthetic bold]
+        self.font_files = self.__load()
+        # fonts resolved to pygame's default font, they aren't saved in file,
+        # so they're resolved again on next start, font may be installed then
+        self.unresolved_font_files = {}
+        # (name, size, bold) -> pygame.font.Font, least recently used first
+        self.fonts = collections.OrderedDict()
+
+    def get_font(self, name, size, bold=False):
+        '''Returns font like pygame.font.SysFont
+
+        Arguments:
+            name {str}
+            size {int}
+            bold {bool}
+
+        Returns:
+            pygame.font.Font
+        '''
+
+        key = (name, size, bool(bold))
+        if key in self.fonts:
+            self.fonts.move_to_end(key)
+            return self.fonts[key]
+
+        font_file, synthetic_bold = self.get_font_file(name, bold)
+
+        font = pygame.font.Font(font_file, size)
+        if synthetic_bold:
+            font.set_bold(True)
+
+        self.fonts[key] = font
+        while len(self.fonts) > MAX_LOADED_FONTS:
+            self.fonts.popitem(last=False)
+
+        return font
+
+    def get_font_file(self, name, bold=False):
+        '''Returns font's file, resolved again if cached file was removed
+
+        Arguments:
+            name {str}
+            bold {bool}
+
+        Returns:
+            tuple(str or None, bool) -- font file, None for pygame's default
+                font, and True if bold has to be synthesized
+        '''
+
+        key = '{}:{}'.format(name, int(bool(bold)))
+
+        font_file = self.font_files.get(key) or \
+            self.unresolved_font_files.get(key)
+        if not font_file or font_file[0] and not os.path.exists(font_file[0]):
+            font_file = self.__resolve(name, bold)
+            if font_file[0]:
+                self.font_files[key] = font_file
+            else:
+                self.font_files.pop(key, None)
+                self.unresolved_font_files[key] = font_file
+            self.__save()
+
+        return tuple(font_file)
+
+    def __resolve(self, name, bold):
+        '''Finds font's file as pygame.font.SysFont does, it scans system
+               fonts on first call
+
+        Arguments:
+            name {str}
+            bold {bool}
+
+        Returns:
+            list(str or None, bool) -- see get_font_file
+        '''
+
+        font_file = pygame.font.match_font(name, bold)
+
+        # without bold file SysFont falls back to regular one made bold
+        return [font_file, bool(bold) and (
+            font_file is None or font_file == pygame.font.match_font(name))]
+
+    def __load(self):
+        '''Reads cache file
+
+        Returns:
+            dict
+        '''
+
+        try:
+            with open(self.path) as file_:
+                font_files = json.load(file_)
+        except (OSError, ValueError):
+            return {}
+
+        if not isinstance(font_files, dict):
+            return {}
+
+        # older cache files kept fonts resolved to default one too
+        return {key: font_file for key, font_file in font_files.items()
+                if isinstance(font_file, list) and font_file and font_file[0]}
+
+    def __save(self):
+        '''Writes cache file, it's only optimization, so it isn't an error
+               if it can't be written
+        '''
+
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+
+            temporary_path = '{}.{}'.format(self.path, os.getpid())
+            with open(temporary_path, 'w') as file_:
+                json.dump(self.font_files, file_, indent=4)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            pass
+
+
+@functools.lru_cache(maxsize=1)
+def get_font_cache():
+    '''Returns font cache shared by whole game
+
+    Returns:
+        FontCache
+    '''
+
+    return FontCache()
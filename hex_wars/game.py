@@ -17,14 +17,15 @@
 import math
 import random
 import time
-import numpy
 
-import map
+import ai
 
 
 class Player:
     '''Player object'''
 
+    __slots__ = ('color', 'additional_dice')
+
     def __init__(self, color):
         self.color = color
         self.additional_dice = 0
@@ -36,276 +37,190 @@ class Gameplay:
     enemys AI, turn system, fighthing, etc.
     '''
 
-    def __init__(self, map_, die_sides_number, fight_time, 
-                 max_dice_on_single_hex):
+    def __init__(self, map_, die_sides_number, fight_time,
+                 max_dice_on_single_hex, seed=None, strategies=None):
         self.map_ = map_
         self.die_sides_number = die_sides_number
         self.fight_time = fight_time
         self.max_dice_on_single_hex = max_dice_on_single_hex
 
-        self.is_enemy_playing = False
-
         self.attacking_hex = None
         self.defending_hex = None
 
         self.fight_finished = False
+        self.fight_start_time = 0
 
         self.attacking_hex_power = 0
         self.defending_hex_power = 0
 
         self.current_player_index = 0
 
-        self.ai_coords_and_hexes_list = []
+        self.rng = random.Random(seed)
+        self.replay_log = None
+        self.spectator_stream = None
+        self.history = None
+
+        self.ai_generation = self.map_.generation
+        # player's index -> ai.Strategy, enemies without one play greedy
+        self.ai_worker = ai.AIWorker(strategies)
+        self.ai_worker.start()
 
     # turn
     def turn(self):
-        '''Adds dice to human player's hexes and run ai script'''
-        self.add_dice(self.map_.players[0])
-        self.current_player_index = 1
-        self.prepare_enemy_ai()
-
-    def finish_turn(self):
-        '''Finishes turn'''
-        self.current_player_index = 0
-
-    def finish_single_ai_turn(self):
-        '''Adds dice to player's hexes and increments current player'''
-        self.attacking_hex = None
-        self.defending_hex = None
-        self.add_dice(self.map_.players[self.current_player_index])
-        self.current_player_index += 1
-
-    # ai
-    def __ai_get_hex_enemy_neighbours(self, hex_coords):
-        '''Returns list of hex's neighbours
-
-        Arguments:
-            hex_coords {list(int, int)} -- hex's coords given as 2d array index
-
-        Returns:
-            list(map.Hex) -- list of neighbours
+        '''
+        Sends board to ai worker, which adds dice to human player's hexes
+        and plays enemies turns
         '''
 
-        neighbours = []
-
-        if hex_coords[0] > 0:
-            neighbours.append(self.map_.hex_map[hex_coords[0] - 1,
-                              hex_coords[1]])
-            if hex_coords[1] < self.map_.size[1] - 1:
-                neighbours.append(self.map_.hex_map[hex_coords[0] - 1,
-                                  hex_coords[1] + 1])
+        if self.replay_log:
+            self.replay_log.log_end_turn()
 
-        if hex_coords[0] < self.map_.size[0] - 1:
-            neighbours.append(self.map_.hex_map[hex_coords[0] + 1,
-                              hex_coords[1]])
-            if hex_coords[1] > 0:
-                neighbours.append(self.map_.hex_map[hex_coords[0] + 1,
-                                  hex_coords[1] - 1])
+        self.current_player_index = 1
+        self.__request_ai_turn(0)
 
-        if hex_coords[1] > 0:
-            neighbours.append(self.map_.hex_map[hex_coords[0],
-                              hex_coords[1] - 1])
+    def play_turn_now(self):
+        '''
+        Adds dice to human player's hexes and plays enemies turns on calling
+        thread, without fight animations
+        '''
 
-        if hex_coords[1] < self.map_.size[1] - 1:
-            neighbours.append(self.map_.hex_map[hex_coords[0],
-                              hex_coords[1] + 1])
+        self.current_player_index = 1
 
-        neighbours = [hex_ for hex_ in neighbours if type(hex_) == map.Hex]
-        return [hex_ for hex_ in neighbours if hex_.player !=
-                self.map_.players[self.current_player_index]]
+        for event in self.ai_worker.play_turn(
+                self.map_.board.copy(),
+                [player.additional_dice for player in self.map_.players],
+                self.die_sides_number, self.max_dice_on_single_hex,
+                self.rng.getrandbits(64)):
+            if event[0] == 'attack':
+                self.map_.board.resolve_fight(*event[1:])
+                self.map_.report_changed_hexes(event[1:3])
+
+                if self.spectator_stream:
+                    self.spectator_stream.record_action(
+                        self.map_.board, event[1:3],
+                        self.current_player_index)
+                if self.history:
+                    self.history.record_fight(self, *event[1:])
+            elif event[0] == 'dice':
+                self.__apply_ai_dice(*event[1:])
+
+    def resume_turn(self):
+        '''Continues enemies turns from current player, e.g. after loading'''
+        if self.current_player_index > 0:
+            self.__request_ai_turn(self.current_player_index)
 
-    def __ai_select_best_target(self, dice_number, neighbours):
-        '''Returns easiest targets to attack
+    def __request_ai_turn(self, first_player_index):
+        '''Sends board to ai worker, which plays turns from given player
 
         Arguments:
-            dice_number {int} -- attacking hex dice number
-            neighbours {list(map.Hex)} -- list of hex's
-
-        Returns:
-            [type] -- [description]
+            first_player_index {int}
         '''
 
-        neighbours.sort(key=lambda x: x.dice_number)
-        neighbours = [
-            hex_ for hex_ in neighbours if hex_.dice_number ==
-            neighbours[0].dice_number and hex_.dice_number <= dice_number]
-
-        return neighbours
+        self.ai_generation = self.map_.generation
+        self.ai_worker.request_turn(
+            self.ai_generation, self.map_.board.copy(),
+            [player.additional_dice for player in self.map_.players],
+            self.die_sides_number, self.max_dice_on_single_hex,
+            self.rng.getrandbits(64), first_player_index)
 
-    def __ai_attack(self, neighbours):
-        '''Randomly attacks one of the neighbours
+    def set_fight_time(self, fight_time):
+        '''Sets fight time, it affects fights started from now on
 
         Arguments:
-            neighbours {list(map.Hex)} -- list of neighbour hexes
+            fight_time {int} -- fight time in milliseconds
         '''
 
-        self.defending_hex = neighbours[random.randrange(len(neighbours))]
-        self.fight()
+        self.fight_time = fight_time
 
-    def handle_ai(self):
-        '''Handles all enemies ai'''
-        if self.current_player_index > 0:
-            if self.ai_coords_and_hexes_list:
-                self.enemy_ai(self.ai_coords_and_hexes_list[0])
-                self.ai_coords_and_hexes_list.pop(0)
-            else:
-                self.finish_single_ai_turn()
-                if self.current_player_index < len(self.map_.players):
-                    self.prepare_enemy_ai()
-                else:
-                    self.finish_turn()       
-
-    def prepare_enemy_ai(self):
-        '''Creates list of all ai's hexes and their coords'''
-        for coords, hex_ in numpy.ndenumerate(self.map_.hex_map):
-            if type(hex_) == map.Hex:
-                if hex_.player == self.map_.players[self.current_player_index]:
-                    if hex_.dice_number > 1:
-                        self.ai_coords_and_hexes_list.append((coords, hex_))                
-
-    def enemy_ai(self, coords_and_hex):
-        '''Prepares ai to attack'''
-        neighbours = self.__ai_get_hex_enemy_neighbours(coords_and_hex[0])
-        neighbours = self.__ai_select_best_target(
-            coords_and_hex[1].dice_number, neighbours)
-
-        if len(neighbours) > 0:
-            self.attacking_hex = coords_and_hex[1] 
-            self.__ai_attack(neighbours)
-
-    # adding dice
-    def add_dice(self, player):
-        '''Adds dice to player's hexes
+    def set_rules(self, die_sides_number, max_dice_on_single_hex):
+        '''Sets rules for current map
 
         Arguments:
-            player {game.Player}
+            die_sides_number {int}
+            max_dice_on_single_hex {int}
         '''
 
-        hex_list = [
-            hex_ for hex_ in self.map_.hex_map.flat if type(hex_) == map.Hex]
-        hex_list = [hex_ for hex_ in hex_list if hex_.player == player]
+        self.die_sides_number = die_sides_number
+        self.max_dice_on_single_hex = max_dice_on_single_hex
 
-        dice = self.__count_connected_hexes(player)
-        dice_to_add = dice + player.additional_dice
+        if self.replay_log:
+            self.replay_log.log_rules(self)
 
-        max_dice_on_single_hex_to_add = 0
-        for hex_ in hex_list:
-            max_dice_on_single_hex_to_add += (
-                self.max_dice_on_single_hex - hex_.dice_number)
+    def finish_turn(self):
+        '''Finishes turn'''
+        self.current_player_index = 0
 
-        player.additional_dice = dice_to_add - max_dice_on_single_hex_to_add
-        if player.additional_dice < 0:
-            player.additional_dice = 0
-        elif player.additional_dice > 4 * self.max_dice_on_single_hex:
-            player.additional_dice = 4 * self.max_dice_on_single_hex
+    # ai
+    def handle_ai(self):
+        '''Applies next result of all enemies ai, if it is ready'''
+        if self.current_player_index > 0:
+            if self.ai_generation != self.map_.generation:
+                self.finish_turn()
+                return
 
-        if dice_to_add > max_dice_on_single_hex_to_add:
-            dice_to_add = max_dice_on_single_hex_to_add
+            if self.fight_finished:
+                return
 
-        for die in range(dice_to_add):
-            while True:
-                hex_ = hex_list[random.randrange(len(hex_list))]
-                if hex_.dice_number < self.max_dice_on_single_hex:
-                    hex_.dice_number += 1
-                    break
+            result = self.ai_worker.get_result()
+            while result and result[0] != self.ai_generation:
+                result = self.ai_worker.get_result()
 
-    def __count_connected_hexes(self, player):
-        '''Returns number of player's connected hexes
+            if result:
+                event = result[1]
+                if event[0] == 'attack':
+                    self.__apply_ai_attack(*event[1:])
+                elif event[0] == 'dice':
+                    self.__apply_ai_dice(*event[1:])
 
-        Arguments:
-            player {game.Player}
+    def __apply_ai_attack(self, attacking_coords, defending_coords,
+                          attacking_hex_power, defending_hex_power):
+        '''Starts fight chosen and rolled by ai worker
 
-        Returns:
-            int -- number of connected hexes
+        Arguments:
+            attacking_coords {tuple(int, int)}
+            defending_coords {tuple(int, int)}
+            attacking_hex_power {int}
+            defending_hex_power {int}
         '''
 
-        hex_map = numpy.copy(self.map_.hex_map)
-        hex_and_coords_list = []
-        count_ = 0
-        max_ = 0
-
-        for coords, hex_ in numpy.ndenumerate(hex_map):
-            if type(hex_) == map.Hex:
-                if hex_.player == player:
-                    hex_and_coords_list.append([hex_, coords])
-
-                    for hex_in_list in hex_and_coords_list:
-                        coords = hex_in_list[1]
-
-                        for dir_ in range(6):
-                            new_coords = self.__move_hex_coords(coords, dir_)
-                            hex_connected = self.__get_connected_hex(
-                                player, new_coords)
+        self.attacking_hex = self.map_.hex_map[attacking_coords]
+        self.defending_hex = self.map_.hex_map[defending_coords]
+        self.attacking_hex_power = attacking_hex_power
+        self.defending_hex_power = defending_hex_power
 
-                            if hex_connected and \
-                                [hex_connected, new_coords] not in \
-                                    hex_and_coords_list:
-                                hex_and_coords_list.append(
-                                    [hex_connected, new_coords])
-                                hex_map[
-                                    self.__move_hex_coords(coords, dir_)] = 0
+        self.fight_start_time = time.time()
+        self.fight_finished = True
 
-                    count_ = len(hex_and_coords_list)
-                    if max_ < count_:
-                        max_ = count_
-
-                    hex_and_coords_list = []
-
-        return max_
-
-    def __move_hex_coords(self, hex_coords, direction):
-        '''Returns hex's coords moved to given direction
+    def __apply_ai_dice(self, player_index, added_dice_coords,
+                        additional_dice):
+        '''Adds dice chosen by ai worker and moves turn to next player
 
         Arguments:
-            hex_coords {list(int, int)} -- hex's coords given as 2d array index
-            direction {int} -- direction (0 .. 5)
-
-        Returns:
-            [type] -- [description]
+            player_index {int}
+            added_dice_coords {list(tuple(int, int))} -- coords of hex for
+                every added die
+            additional_dice {int}
         '''
 
-        hex_coords_moved = list(hex_coords)
-        if direction == 0:
-            if hex_coords[0] > 0:
-                hex_coords_moved[0] -= 1
-        elif direction == 1:
-            if hex_coords[0] > 0 and hex_coords[1] < self.map_.size[1] - 1:
-                hex_coords_moved[0] -= 1
-                hex_coords_moved[1] += 1
-        elif direction == 2:
-            if hex_coords[0] < self.map_.size[0] - 1:
-                hex_coords_moved[0] += 1
-        elif direction == 3:
-            if hex_coords[0] < self.map_.size[0] - 1 and hex_coords[1] > 0:
-                hex_coords_moved[0] += 1
-                hex_coords_moved[1] -= 1
-        elif direction == 4:
-            if hex_coords[1] > 0:
-                hex_coords_moved[1] -= 1
-        elif direction == 5:
-            if hex_coords[1] < self.map_.size[1] - 1:
-                hex_coords_moved[1] += 1
-
-        return tuple(hex_coords_moved)
-
-    def __get_connected_hex(self, player, hex_coords):
-        '''Returns hex if it's player is given player, else returns None
-
-        Arguments:
-            player {game.Player}
-            hex_coords {[type]} hex's coords given as 2d array index
+        self.attacking_hex = None
+        self.defending_hex = None
 
-        Returns:
-            map.Hex or None -- hex with given coords
-        '''
+        for coords in added_dice_coords:
+            self.map_.board.dice_map[coords] += 1
 
-        hex_ = self.map_.hex_map[hex_coords]
+        self.map_.players[player_index].additional_dice = additional_dice
 
-        if type(hex_) == map.Hex:
-            if hex_.player == player:
-                return hex_
+        self.current_player_index = player_index + 1
+        if self.current_player_index >= len(self.map_.players):
+            self.finish_turn()
 
-        return None
+        if self.spectator_stream:
+            self.spectator_stream.record_action(
+                self.map_.board, added_dice_coords,
+                self.current_player_index)
+        if self.history:
+            self.history.record_dice(self, player_index, added_dice_coords,
+                                     additional_dice)
 
     # fight system
     def fight_finish(self):
@@ -314,8 +229,8 @@ class Gameplay:
         '''
 
         if self.fight_finished:
-            if self.fight_time > 0:
-                time.sleep(self.fight_time / 1000)
+            if (time.time() - self.fight_start_time) * 1000 < self.fight_time:
+                return
 
             if self.attacking_hex_power > self.defending_hex_power:
                 self.defending_hex.player = self.attacking_hex.player
@@ -325,6 +240,20 @@ class Gameplay:
             else:
                 self.attacking_hex.dice_number = 1
 
+            self.map_.report_changed_hexes([self.attacking_hex.coords,
+                                            self.defending_hex.coords])
+
+            if self.spectator_stream:
+                self.spectator_stream.record_action(
+                    self.map_.board, [self.attacking_hex.coords,
+                                      self.defending_hex.coords],
+                    self.current_player_index)
+            if self.history:
+                self.history.record_fight(
+                    self, self.attacking_hex.coords,
+                    self.defending_hex.coords, self.attacking_hex_power,
+                    self.defending_hex_power)
+
             self.attacking_hex = None
             self.defending_hex = None
             self.attacking_hex_power = 0
@@ -334,15 +263,18 @@ class Gameplay:
 
     def fight(self):
         '''Rolls dice for attacking and defending hex and finishes fight'''
-        if self.attacking_hex and self.defending_hex:
-            for die in range(self.attacking_hex.dice_number):
-                self.attacking_hex_power += random.randrange(
-                    1, self.die_sides_number + 1)
-
-            for die in range(self.defending_hex.dice_number):
-                self.defending_hex_power += random.randrange(
-                    1, self.die_sides_number + 1)
-
+        if self.attacking_hex and self.defending_hex and \
+           not self.fight_finished:
+            if self.replay_log:
+                self.replay_log.log_attack(self.attacking_hex.coords,
+                                           self.defending_hex.coords)
+
+            self.attacking_hex_power = self.map_.board.roll_dice(
+                self.attacking_hex.coords, self.die_sides_number, self.rng)
+            self.defending_hex_power = self.map_.board.roll_dice(
+                self.defending_hex.coords, self.die_sides_number, self.rng)
+
+            self.fight_start_time = time.time()
             self.fight_finished = True
 
     # etc
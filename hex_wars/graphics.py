@@ -15,11 +15,25 @@
 '''
 
 import ctypes
+import numpy
 import pygame
-import random
 
 import controls
+import fonts
 import game
+import minimap
+import rasterizer
+import sprites
+
+
+# below this side length dice numbers aren't drawn
+LOD_DICE_NUMBER_SIDE_LENGTH = 16
+# below this side length board is drawn as scaled image with pixel per hex
+LOD_PIXEL_IMAGE_SIDE_LENGTH = 10
+# maps with at least this hex number are drawn by board rasterizer
+RASTERIZER_HEX_NUMBER = 1000
+
+RIGHT_BAR_COLOR = (40, 40, 40)
 
 
 class NewGameOptions:
@@ -41,7 +55,9 @@ class Graphics:
     '''
 
     def __init__(self, map_, gameplay, window_size):
-        ctypes.windll.user32.SetProcessDPIAware()
+        # dpi awareness is only set on Windows
+        if hasattr(ctypes, 'windll'):
+            ctypes.windll.user32.SetProcessDPIAware()
 
         self.map_ = map_
         self.gameplay = gameplay
@@ -56,17 +72,21 @@ class Graphics:
                                     self.gameplay.die_sides_number,
                                     self.gameplay.max_dice_on_single_hex)
 
+        self.hex_sprite_cache = sprites.HexSpriteCache(self.map_)
+        self.font_cache = fonts.get_font_cache()
+
+        # object with render(surface) drawn over everything, e.g. profiler
+        self.overlay = None
+
         self.__init_fonts()
         self.__init_right_bar()
 
     def __init_fonts(self):
         '''Initializes fonts'''
         self.font_bar_size = 32
-        self.font_bar = pygame.font.SysFont(
-                            'arial',
-                            self.font_bar_size,
-                            bold=1)
-        self.font_sliders = pygame.font.SysFont('arial', 20, bold=1)
+        self.font_bar = self.font_cache.get_font('arial', self.font_bar_size,
+                                                 bold=True)
+        self.font_sliders = self.font_cache.get_font('arial', 20, bold=True)
 
     def __init_right_bar(self):
         '''Initializes right bar and controls on it'''
@@ -77,8 +97,21 @@ class Graphics:
             self.window_size[0] - (self.right_bar_units[0] * 8),
             0, self.right_bar_units[0] * 8, self.window_size[1])
 
+        self.board_rasterizer = rasterizer.BoardRasterizer(
+            self.map_, (self.right_bar_rect[0], self.window_size[1]))
+
         self.__init_hex_right_bar_representation()
         self.__init_controls()
+        self.__init_right_bar_layer()
+
+    def __init_right_bar_layer(self):
+        '''
+        Initializes layer keeping right bar with rendered controls, only
+        changed controls are rendered on it again
+        '''
+
+        self.right_bar_layer = pygame.Surface(self.window_size).convert()
+        self.right_bar_layer.fill(RIGHT_BAR_COLOR, self.right_bar_rect)
 
     def __init_hex_right_bar_representation(self):
         '''Initializes choosen hex visual representation'''
@@ -113,6 +146,42 @@ class Graphics:
         '''Initializes controls'''
         self.__init_sliders()
         self.__init_button()
+        self.__init_minimap()
+
+        self.controls = self.sliders + [self.button_new_map, self.minimap]
+
+        self.controls_index = controls.ControlsIndex(self.right_bar_units[1])
+        for control in self.controls:
+            self.controls_index.add(control)
+
+        self.__init_sliders_observers()
+
+    def __init_sliders_observers(self):
+        '''
+        Connects sliders with objects depending on their values and sets
+        sliders starting values on them
+        '''
+
+        self.slider_fight_time.add_observer(self.gameplay.set_fight_time)
+
+        for slider in self.sliders:
+            if slider != self.slider_fight_time:
+                slider.add_observer(self.__on_new_game_option_changed)
+
+        self.new_map_generation_params = None
+
+        self.gameplay.set_fight_time(self.slider_fight_time.value)
+        self.__on_new_game_option_changed(None)
+
+    def __init_minimap(self):
+        '''Initializes minimap between fight time and map size sliders'''
+        self.minimap_rect = self.slider_fight_time_rect[:]
+        self.minimap_rect[1] += self.right_bar_units[1] * 1.5
+        self.minimap_rect[3] = self.right_bar_units[1] * 3
+
+        self.minimap = minimap.Minimap(
+            self.minimap_rect, self.map_,
+            (self.right_bar_rect[0], self.window_size[1]), (0, 0, 0))
 
     def __init_button(self):
         '''Initializes new map button'''
@@ -147,7 +216,8 @@ class Graphics:
         self.slider_fight_time = controls.Slider(
             self.slider_fight_time_rect, [0, -self.right_bar_units[1]],
             'fight time', self.font_sliders, 0, 5000,
-            1000, 100, (0, 0, 0), (255, 150, 0))
+            1000, 100, (0, 0, 0), (255, 150, 0),
+            RIGHT_BAR_COLOR)
 
         self.sliders.append(self.slider_fight_time)
 
@@ -159,7 +229,8 @@ class Graphics:
             self.slider_map_size_x_rect,
             [0, -self.right_bar_units[1]], 'map size x',
             self.font_sliders, 5, 100,
-            10, 1, (0, 0, 0), (255, 150, 0))
+            10, 1, (0, 0, 0), (255, 150, 0),
+            RIGHT_BAR_COLOR)
 
         self.sliders.append(self.slider_map_size_x)
 
@@ -171,7 +242,8 @@ class Graphics:
             self.slider_map_size_y_rect, 
             [0, -self.right_bar_units[1]], 'map size y',
             self.font_sliders, 5, 100,
-            10, 1, (0, 0, 0), (255, 150, 0))
+            10, 1, (0, 0, 0), (255, 150, 0),
+            RIGHT_BAR_COLOR)
 
         self.sliders.append(self.slider_map_size_y)
 
@@ -183,7 +255,8 @@ class Graphics:
             self.slider_hex_number_rect,
             [0, -self.right_bar_units[1]], 'hex number',
             self.font_sliders, 10, 100,
-            25, 1, (0, 0, 0), (255, 150, 0))
+            25, 1, (0, 0, 0), (255, 150, 0),
+            RIGHT_BAR_COLOR)
 
         self.sliders.append(self.slider_hex_number)
 
@@ -195,7 +268,8 @@ class Graphics:
             self.slider_players_number_rect,
             [0, -self.right_bar_units[1]], 'players number',
             self.font_sliders, 2, 20,
-            2, 1, (0, 0, 0), (255, 150, 0))
+            2, 1, (0, 0, 0), (255, 150, 0),
+            RIGHT_BAR_COLOR)
 
         self.sliders.append(self.slider_players_number)
 
@@ -207,7 +281,8 @@ class Graphics:
             self.slider_die_sides_number_rect,
             [0, -self.right_bar_units[1]], 'die sides number',
             self.font_sliders, 2, 50,
-            6, 1, (0, 0, 0), (255, 150, 0))
+            6, 1, (0, 0, 0), (255, 150, 0),
+            RIGHT_BAR_COLOR)
 
         self.sliders.append(self.slider_die_sides_number)
 
@@ -221,36 +296,55 @@ class Graphics:
             self.slider_max_dice_on_single_hex_rect,
             [0, -self.right_bar_units[1]], 'max dice on single hex',
             self.font_sliders, 2, 100,
-            8, 1, (0, 0, 0), (255, 150, 0))
+            8, 1, (0, 0, 0), (255, 150, 0),
+            RIGHT_BAR_COLOR)
 
         self.sliders.append(self.slider_max_dice_on_single_hex)
 
+    def __get_new_map_generation_params(self):
+        '''Returns generation params of map created from new game options
+
+        Returns:
+            tuple -- see map.Map.get_generation_params
+        '''
+
+        map_area = self.new_game_options.map_size[0] * \
+            self.new_game_options.map_size[1]
+        hex_number = int(self.new_game_options.hex_number / 100 * map_area)
+
+        return (tuple(self.new_game_options.map_size), hex_number,
+                min(self.new_game_options.players_number, hex_number),
+                self.map_.dice_per_hex)
+
     def set_options_for_new_map(self):
         '''Reads values from new game options and sets options for new map'''
-        self.map_.size = self.new_game_options.map_size
-
-        map_area = self.map_.size[0] * self.map_.size[1]
-        self.map_.hex_number = int(
-            self.new_game_options.hex_number / 100 * map_area)
+        size, hex_number, players_number, dice_per_hex = \
+            self.__get_new_map_generation_params()
 
-        if self.new_game_options.players_number > self.map_.hex_number:
-            self.new_game_options.players_number = self.map_.hex_number
+        self.map_.size = list(size)
+        self.map_.hex_number = hex_number
+        self.new_game_options.players_number = players_number
 
         self.map_.players = []
         self.map_.players.append(game.Player((255, 0, 0)))
         for player in range(self.new_game_options.players_number - 1):
             self.map_.players.append(game.Player((
-                random.randrange(40, 215),
-                random.randrange(40, 215),
-                random.randrange(40, 215))))
+                self.map_.rng.randrange(40, 215),
+                self.map_.rng.randrange(40, 215),
+                self.map_.rng.randrange(40, 215))))
 
-        self.gameplay.die_sides_number = self.new_game_options.die_sides_number
+        self.hex_sprite_cache.invalidate()
 
-        self.gameplay.max_dice = self.new_game_options.max_dice_on_single_hex
+        self.gameplay.set_rules(self.new_game_options.die_sides_number,
+                                self.new_game_options.max_dice_on_single_hex)
+
+    def __on_new_game_option_changed(self, value):
+        '''Reads new map sliders values and saves them to new game options
+
+        Arguments:
+            value {int} -- changed slider's value
+        '''
 
-    def read_sliders_values(self):
-        '''Reads sliders values and saves them to new game options object'''
-        self.gameplay.fight_time = self.slider_fight_time.value
         self.new_game_options.map_size[0] = self.slider_map_size_x.value
         self.new_game_options.map_size[1] = self.slider_map_size_y.value
         self.new_game_options.hex_number = self.slider_hex_number.value
@@ -260,34 +354,104 @@ class Graphics:
         self.new_game_options.max_dice_on_single_hex = \
             self.slider_max_dice_on_single_hex.value
 
+        if self.map_.map_generator:
+            if self.new_map_generation_params != \
+               self.map_.get_generation_params():
+                self.map_.map_generator.discard(
+                    self.new_map_generation_params)
+
+            self.new_map_generation_params = \
+                self.__get_new_map_generation_params()
+            self.map_.map_generator.prepare(self.new_map_generation_params)
+
     def render(self):
         '''Rendering'''
         self.surface.fill((0, 0, 0))
 
         self.__draw_visible_hexes()
 
+        self.__draw_controls()
+
         self.__draw_right_bar_hexes()
 
         self.__draw_right_bar_hexes_power()
 
-        self.__draw_controls()
+        if self.overlay:
+            self.overlay.render(self.surface)
 
         pygame.display.flip()
 
     def __draw_visible_hexes(self):
-        '''Draws all visible hexes'''
-        font_dice_number_text_size = int(self.map_.side_length)
-        font_dice_number_text = pygame.font.SysFont(
-            'timesnewroman', font_dice_number_text_size, 1)
+        '''Draws all visible hexes with level of detail fitting side length'''
+        if self.map_.side_length < LOD_PIXEL_IMAGE_SIDE_LENGTH:
+            self.__draw_board_pixel_image()
+        elif self.map_.hex_number >= RASTERIZER_HEX_NUMBER:
+            self.board_rasterizer.render(self.surface)
+            self.__draw_attacking_hex_outline()
+
+            if self.map_.side_length >= LOD_DICE_NUMBER_SIDE_LENGTH:
+                self.__draw_dice_numbers([
+                    self.map_.hex_map[coords] for coords in
+                    self.board_rasterizer.get_visible_hexes_coords()])
+        else:
+            visible_hex_list = self.map_.get_visibile_hex_list(
+                self.right_bar_rect)
+
+            self.__draw_hex_sprites(visible_hex_list)
+
+            if self.map_.side_length >= LOD_DICE_NUMBER_SIDE_LENGTH:
+                self.__draw_dice_numbers(visible_hex_list)
 
-        for hex_ in self.map_.get_visibile_hex_list(self.right_bar_rect):
+    def __draw_hex_sprites(self, visible_hex_list):
+        '''Draws hexes polygons
+
+        Arguments:
+            visible_hex_list {list(map.Hex)}
+        '''
+
+        sprite_shift = self.hex_sprite_cache.get_sprite_shift()
+
+        blit_sequence = []
+        for hex_ in visible_hex_list:
             if hex_ == self.gameplay.attacking_hex:
-                pygame.draw.lines(self.surface, hex_.player.color, True, 
-                                  hex_.polygon, 1)
+                sprite = self.hex_sprite_cache.get_outlined_sprite(
+                    hex_.player.color)
             else:
-                pygame.draw.polygon(self.surface, hex_.player.color, 
-                                    hex_.polygon)
+                sprite = self.hex_sprite_cache.get_filled_sprite(
+                    hex_.player.color)
+
+            blit_sequence.append((sprite, (hex_.middle[0] - sprite_shift[0],
+                                           hex_.middle[1] - sprite_shift[1])))
+
+        self.surface.blits(blit_sequence, False)
+
+    def __draw_attacking_hex_outline(self):
+        '''Draws attacking hex as outline over already drawn board'''
+        hex_ = self.gameplay.attacking_hex
+        if hex_:
+            sprite_shift = self.hex_sprite_cache.get_sprite_shift()
+            sprite_pos = (hex_.middle[0] - sprite_shift[0],
+                          hex_.middle[1] - sprite_shift[1])
+
+            self.surface.blit(
+                self.hex_sprite_cache.get_filled_sprite((0, 0, 0)),
+                sprite_pos)
+            self.surface.blit(
+                self.hex_sprite_cache.get_outlined_sprite(hex_.player.color),
+                sprite_pos)
+
+    def __draw_dice_numbers(self, visible_hex_list):
+        '''Draws dice number on every hex
+
+        Arguments:
+            visible_hex_list {list(map.Hex)}
+        '''
+
+        font_dice_number_text_size = int(self.map_.side_length)
+        font_dice_number_text = self.font_cache.get_font(
+            'timesnewroman', font_dice_number_text_size, bold=True)
 
+        for hex_ in visible_hex_list:
             dice_number_text = font_dice_number_text.render(
                 str(hex_.dice_number), True, (255, 255, 255))
 
@@ -295,7 +459,40 @@ class Graphics:
                 hex_.middle[0] - font_dice_number_text_size / 4,
                 hex_.middle[1] - font_dice_number_text_size / 2))
 
-        pygame.draw.rect(self.surface, (40, 40, 40), self.right_bar_rect)
+    def __draw_board_pixel_image(self):
+        '''
+        Draws board as image with two pixels per hex, each row shifted by one
+        pixel, scaled to current side length
+        '''
+
+        owner_map = self.map_.board.owner_map
+
+        pixel_size = (self.map_.half_side_length_root3,
+                      self.map_.half_side_length + self.map_.side_length)
+        image_pos = (self.map_.pos_shift[0],
+                     self.map_.pos_shift[1] + self.map_.side_length -
+                     pixel_size[1] / 2)
+
+        visible_rect = pygame.Rect(
+            -image_pos[0] // pixel_size[0], -image_pos[1] // pixel_size[1],
+            self.right_bar_rect[0] // pixel_size[0] + 2,
+            self.window_size[1] // pixel_size[1] + 2).clip(
+                (0, 0, 2 * owner_map.shape[0] + owner_map.shape[1],
+                 owner_map.shape[1]))
+
+        if not visible_rect.width or not visible_rect.height:
+            return
+
+        image = pygame.surfarray.make_surface(get_board_pixel_image(
+            owner_map, self.map_.get_players_palette(), visible_rect))
+        image.set_colorkey((0, 0, 0))
+
+        self.surface.blit(
+            pygame.transform.scale(image, (
+                visible_rect.width * pixel_size[0],
+                visible_rect.height * pixel_size[1])),
+            (image_pos[0] + visible_rect.left * pixel_size[0],
+             image_pos[1] + visible_rect.top * pixel_size[1]))
 
     def __draw_right_bar_hexes(self):
         '''Draws choosen hexes representation on right bar'''
@@ -355,8 +552,52 @@ class Graphics:
                 self.font_bar_size / 2))
 
     def __draw_controls(self):
-        '''Draws controls'''
-        for slider in self.sliders:
-            slider.render(self.surface)
+        '''Draws changed controls on right bar layer, then draws right bar'''
+        for control in self.controls:
+            if control.needs_render():
+                control.render(self.right_bar_layer)
+                control.is_dirty = False
+
+        self.surface.blit(self.right_bar_layer, self.right_bar_rect,
+                          self.right_bar_rect)
+
+
+def get_board_pixel_image(owner_map, palette, rect):
+    '''Returns part of board's image with two pixels per hex, each row
+           shifted by one pixel. Only hexes in rect are read, so it costs
+           the same whatever board's size is
+
+    Arguments:
+        owner_map {numpy.ndarray}
+        palette {numpy.ndarray} -- see map.Map.get_players_palette
+        rect {pygame.Rect} -- part of image, hex (i, j) has pixels
+            (2 * i + j, j) and (2 * i + j + 1, j)
+
+    Returns:
+        numpy.ndarray -- (width, height, 3) array, black without hex
+    '''
+
+    image_array = numpy.zeros((rect.width, rect.height, 3), dtype=numpy.uint8)
+
+    first_i = max(0, (rect.left - rect.bottom) // 2)
+    last_i = min(owner_map.shape[0], (rect.right - rect.top) // 2 + 1)
+    owners = owner_map[first_i:last_i, max(0, rect.top):rect.bottom]
+
+    i_indices, j_indices = numpy.indices(owners.shape)
+    x_indices = 2 * (i_indices + first_i) + j_indices + rect.top - rect.left
+    colors = palette[owners + 1]
+
+    for x_indices_ in (x_indices, x_indices + 1):
+        inside = (x_indices_ >= 0) & (x_indices_ < rect.width)
+        image_array[x_indices_[inside], j_indices[inside]] = colors[inside]
+
+    return image_array
+
+
+def init_pygame():
+    '''Initializes only pygame modules game uses, pygame.init would also
+           start audio, joysticks etc.
+    '''
 
-        self.button_new_map.render(self.surface)
+    pygame.display.init()
+    pygame.font.init()
@@ -0,0 +1,380 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import argparse
+import bisect
+import hashlib
+import numpy
+
+import game
+import map
+import replay
+
+
+# events between checkpoints, rewinding applies at most this number of events
+CHECKPOINT_INTERVAL = 64
+
+EVENT_FIGHT = 0
+EVENT_DICE = 1
+
+
+class GameHistory:
+    '''
+    GameHistory object. Event-sourced history of current map. New map is
+    its first checkpoint and then every change of state is recorded as
+    small event: fight as coords and rolled powers, adding dice as coords
+    of added dice, not as changed board. Every checkpoint_interval events
+    whole state is checkpointed, so state after any number of events is
+    one checkpoint copy and at most checkpoint_interval events applied
+    again by board's own rules. It's used for undo, rewinding to turn and
+    bisecting ai behaviour
+    '''
+
+    def __init__(self, checkpoint_interval=CHECKPOINT_INTERVAL):
+        self.checkpoint_interval = max(1, checkpoint_interval)
+
+        # (EVENT_FIGHT, player index, attacking coords, defending coords,
+        #  attacking hex power, defending hex power) or
+        # (EVENT_DICE, player index, added dice coords, additional dice,
+        #  next player index)
+        self.events = []
+        # state after every checkpoint_interval-th event: board, additional
+        # dice per player, current player index
+        self.checkpoints = []
+        # numbers of events played before every turn
+        self.turn_positions = []
+
+        self.players_number = 0
+
+    # recording
+    def record_new_map(self, map_, current_player_index=0):
+        '''Starts history of new map, previous map's one is dropped
+
+        Arguments:
+            map_ {map.Map}
+            current_player_index {int} -- other than 0 if map was loaded in
+                the middle of enemies turns
+        '''
+
+        self.players_number = len(map_.players)
+
+        self.events = []
+        self.checkpoints = [(
+            map_.board.copy(),
+            [player.additional_dice for player in map_.players],
+            current_player_index)]
+        self.turn_positions = [0]
+
+    def record_fight(self, gameplay, attacking_coords, defending_coords,
+                     attacking_hex_power, defending_hex_power):
+        '''Records fight, it has to be called after fight was resolved
+
+        Arguments:
+            gameplay {game.Gameplay}
+            attacking_coords {tuple(int, int)}
+            defending_coords {tuple(int, int)}
+            attacking_hex_power {int}
+            defending_hex_power {int}
+        '''
+
+        # attacker keeps its hex whatever fight's result is
+        self.__add_event(gameplay, (
+            EVENT_FIGHT,
+            int(gameplay.map_.board.owner_map[tuple(attacking_coords)]),
+            tuple(attacking_coords), tuple(defending_coords),
+            int(attacking_hex_power), int(defending_hex_power)))
+
+    def record_dice(self, gameplay, player_index, added_dice_coords,
+                    additional_dice):
+        '''Records adding dice, it has to be called after dice were added
+               and turn was passed to next player
+
+        Arguments:
+            gameplay {game.Gameplay}
+            player_index {int}
+            added_dice_coords {list(tuple(int, int))} -- coords of hex for
+                every added die
+            additional_dice {int}
+        '''
+
+        self.__add_event(gameplay, (
+            EVENT_DICE, player_index,
+            tuple(tuple(coords) for coords in added_dice_coords),
+            additional_dice, gameplay.current_player_index))
+
+        # last player adds dice at the end of turn
+        if player_index == self.players_number - 1:
+            self.turn_positions.append(len(self.events))
+
+    def __add_event(self, gameplay, event):
+        '''Adds event and checkpoints state if it's time for it
+
+        Arguments:
+            gameplay {game.Gameplay}
+            event {tuple}
+        '''
+
+        if not self.checkpoints:
+            return
+
+        self.events.append(event)
+
+        if len(self.events) % self.checkpoint_interval == 0:
+            self.checkpoints.append((
+                gameplay.map_.board.copy(),
+                [player.additional_dice for player in gameplay.map_.players],
+                gameplay.current_player_index))
+
+    # reading
+    def get_state(self, position=None):
+        '''Returns state after given number of events
+
+        Arguments:
+            position {int} -- all events by default
+
+        Returns:
+            tuple(board.Board, list(int), int) -- board, additional dice per
+                player and current player index
+        '''
+
+        if position is None:
+            position = len(self.events)
+        position = max(0, min(position, len(self.events)))
+
+        checkpoint_index = position // self.checkpoint_interval
+        board_, additional_dice_list, current_player_index = \
+            self.checkpoints[checkpoint_index]
+
+        board_ = board_.copy()
+        additional_dice_list = list(additional_dice_list)
+
+        for event in self.events[
+                checkpoint_index * self.checkpoint_interval:position]:
+            if event[0] == EVENT_FIGHT:
+                board_.resolve_fight(*event[2:])
+                current_player_index = event[1]
+            else:
+                if event[2]:
+                    numpy.add.at(board_.dice_map,
+                                 tuple(numpy.array(event[2]).T), 1)
+                additional_dice_list[event[1]] = event[3]
+                current_player_index = event[4]
+
+        return board_, additional_dice_list, current_player_index
+
+    def get_turn_position(self, turn):
+        '''Returns number of events played before given turn
+
+        Arguments:
+            turn {int} -- 0 is first turn of map, negative turns are counted
+                from current one
+
+        Returns:
+            int
+        '''
+
+        return self.turn_positions[max(-len(self.turn_positions),
+                                       min(turn,
+                                           len(self.turn_positions) - 1))]
+
+    def get_turn(self, position=None):
+        '''Returns turn which given number of events was played in
+
+        Arguments:
+            position {int} -- all events by default
+
+        Returns:
+            int
+        '''
+
+        if position is None:
+            position = len(self.events)
+
+        return bisect.bisect_right(self.turn_positions, position) - 1
+
+    def bisect(self, predicate, start=0, end=None):
+        '''Returns first number of events after which predicate holds,
+               predicate has to hold for every later number too, e.g.
+               player was eliminated. Every probe restores one checkpoint,
+               so it costs log2(events) probes instead of replaying game
+
+        Arguments:
+            predicate {callable} -- called with board.Board, additional dice
+                per player and current player index
+            start {int}
+            end {int} -- all events by default
+
+        Returns:
+            int or None -- None if predicate doesn't hold even at the end
+        '''
+
+        if end is None:
+            end = len(self.events)
+
+        if not predicate(*self.get_state(end)):
+            return None
+
+        while start < end:
+            middle = (start + end) // 2
+            if predicate(*self.get_state(middle)):
+                end = middle
+            else:
+                start = middle + 1
+
+        return start
+
+    # rewinding
+    def rewind(self, map_, gameplay, position):
+        '''Restores game state after given number of events, later events
+               are dropped. Gameplay's random numbers aren't rewound, so
+               game continues with new rolls
+
+        Arguments:
+            map_ {map.Map}
+            gameplay {game.Gameplay}
+            position {int}
+        '''
+
+        position = max(0, min(position, len(self.events)))
+        board_, additional_dice_list, current_player_index = \
+            self.get_state(position)
+
+        # board is changed in place, hexes and graphics keep referring to it
+        map_.board.owner_map[:] = board_.owner_map
+        map_.board.dice_map[:] = board_.dice_map
+        for player, additional_dice in zip(map_.players,
+                                           additional_dice_list):
+            player.additional_dice = additional_dice
+
+        del self.events[position:]
+        del self.checkpoints[position // self.checkpoint_interval + 1:]
+        del self.turn_positions[bisect.bisect_right(self.turn_positions,
+                                                    position):]
+
+        gameplay.attacking_hex = None
+        gameplay.defending_hex = None
+        gameplay.attacking_hex_power = 0
+        gameplay.defending_hex_power = 0
+        gameplay.fight_finished = False
+        gameplay.current_player_index = current_player_index
+
+        # results of enemies turns played on board from before rewinding
+        # are dropped by ai's generation check
+        map_.generation += 1
+
+        # rewound game can't be replayed, so logging stops there, like after
+        # loading save file
+        if gameplay.replay_log:
+            gameplay.replay_log.close()
+        if gameplay.spectator_stream:
+            gameplay.spectator_stream.record_keyframe(map_.board,
+                                                      current_player_index)
+
+        gameplay.resume_turn()
+
+    def undo(self, map_, gameplay):
+        '''Rewinds game to state before human's last fight or end of turn
+
+        Arguments:
+            map_ {map.Map}
+            gameplay {game.Gameplay}
+
+        Returns:
+            bool -- False if human didn't play anything yet
+        '''
+
+        for position in range(len(self.events) - 1, -1, -1):
+            if self.events[position][1] == 0:
+                self.rewind(map_, gameplay, position)
+                return True
+
+        return False
+
+
+def record_replay(path, checkpoint_interval=CHECKPOINT_INTERVAL):
+    '''Plays replay headlessly and returns its history, it's history of
+           replay's last map
+
+    Arguments:
+        path {str}
+        checkpoint_interval {int}
+
+    Returns:
+        GameHistory
+    '''
+
+    replay_ = replay.Replay(path)
+
+    map_ = map.Map((5, 5), 10, [game.Player((255, 0, 0))], 4, 32, (0, 0))
+    gameplay = game.Gameplay(map_, 6, 0, 8, replay_.seed)
+
+    game_history = GameHistory(checkpoint_interval)
+    map_.history = game_history
+    gameplay.history = game_history
+
+    replay_.run_headless(map_, gameplay)
+    gameplay.ai_worker.stop()
+
+    return game_history
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Shows board of replay\'s last map at any point of game')
+    parser.add_argument('path', help='replay file, see main.py --record')
+    parser.add_argument('--turn', type=int,
+                        help='shows board at the beginning of this turn, '
+                             'negative turns are counted from the last one')
+    parser.add_argument('--events', type=int,
+                        help='shows board after this number of events')
+    parser.add_argument('--eliminated', type=int, metavar='PLAYER',
+                        help='shows board right after player lost its last '
+                             'hex')
+    parser.add_argument('--checkpoint-interval', type=int,
+                        default=CHECKPOINT_INTERVAL)
+    args = parser.parse_args()
+
+    game_history = record_replay(args.path, args.checkpoint_interval)
+
+    if args.eliminated is not None:
+        position = game_history.bisect(
+            lambda board_, additional_dice_list, current_player_index:
+                not (board_.owner_map == args.eliminated).any())
+        if position is None:
+            parser.exit(1, 'player {} wasn\'t eliminated\n'.format(
+                args.eliminated))
+    elif args.turn is not None:
+        position = game_history.get_turn_position(args.turn)
+    elif args.events is not None:
+        position = max(0, min(args.events, len(game_history.events)))
+    else:
+        position = len(game_history.events)
+
+    board_, additional_dice_list, current_player_index = \
+        game_history.get_state(position)
+
+    print('events: {} of {}, turn: {}, current player: {}'.format(
+        position, len(game_history.events), game_history.get_turn(position),
+        current_player_index))
+
+    for player_index in range(game_history.players_number):
+        print('player {}: {} hexes, {} additional dice'.format(
+            player_index, (board_.owner_map == player_index).sum(),
+            additional_dice_list[player_index]))
+
+    digest = hashlib.sha1(board_.owner_map.tobytes())
+    digest.update(board_.dice_map.tobytes())
+    print('board: {}'.format(digest.hexdigest()))
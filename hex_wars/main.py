@@ -14,13 +14,17 @@
     limitations under the License.
 '''
 
-import pygame
+import argparse
+import atexit
+import hashlib
+import random
 
-import controls
+import board
 import map
+import mapgen
 import game
-import graphics
-import events
+import history
+import replay
 
 
 class Main:
@@ -29,26 +33,149 @@ class Main:
     etc.
     '''
 
-    def __init__(self):
-        pygame.init()
+    def __init__(self, seed=None, replay_=None, profile_path=None,
+                 stream_path=None, record_path=None):
+        # window's modules import pygame, headless replay doesn't load them
+        import pygame
+
+        import events
+        import graphics
+        import profiler
+        import rasterizer
+
+        graphics.init_pygame()
         players = [game.Player((255, 0, 0))]
 
         resolution = pygame.display.Info()
 
         self.window_size = (resolution.current_w, resolution.current_h)
 
-        self.map_ = map.Map((5, 5), 10, players, 4, 32, self.window_size)
+        if replay_:
+            seed = replay_.seed
+        elif seed is None:
+            seed = random.getrandbits(63)
+
+        map_generator = mapgen.MapGenerator(seed=seed)
+        atexit.register(map_generator.close)
+
+        self.map_ = map.Map((5, 5), 10, players, 4, 32, self.window_size,
+                            map_generator, seed)
+        self.gameplay = game.Gameplay(self.map_, 6, 2000, 8, seed)
+
+        if not replay_:
+            if record_path:
+                replay_log = replay.ReplayLog(record_path, seed)
+                self.map_.replay_log = replay_log
+                self.gameplay.replay_log = replay_log
+            self.gameplay.set_rules(6, 8)
+
+            game_history = history.GameHistory()
+            self.map_.history = game_history
+            self.gameplay.history = game_history
+
+        if stream_path:
+            set_spectator_stream(self.map_, self.gameplay, stream_path)
+
         self.map_.create_map()
 
-        self.gameplay = game.Gameplay(self.map_, 6, 2000, 8)
         self.graphics = graphics.Graphics(self.map_, self.gameplay,
                                           self.window_size)
+
+        self.profiler = profiler.Profiler()
+        self.profiler.instrument(map.Map, 'create_map')
+        self.profiler.instrument(map.Map, 'get_visibile_hex_list')
+        self.profiler.instrument(board.Board, 'count_connected_hexes')
+        self.profiler.instrument(rasterizer.BoardRasterizer, 'render')
+
         self.event_handler = events.EventHandler(self.map_, self.graphics,
-                                                 self.gameplay)
+                                                 self.gameplay, replay_,
+                                                 self.profiler)
+
+        if profile_path:
+            self.event_handler.toggle_profiler()
+            atexit.register(self.profiler.dump, profile_path)
 
     def play(self):
         '''Starts event loop'''
         self.event_handler.event_loop()
 
-main = Main()
-main.play()
+
+def set_spectator_stream(map_, gameplay, path):
+    '''Makes game write spectator stream to file
+
+    Arguments:
+        map_ {map.Map}
+        gameplay {game.Gameplay}
+        path {str}
+    '''
+
+    # spectator stream imports network client, it's loaded only when needed
+    import spectator
+
+    spectator_stream = spectator.SpectatorStream(path)
+    map_.spectator_stream = spectator_stream
+    gameplay.spectator_stream = spectator_stream
+    atexit.register(spectator_stream.close)
+
+
+def run_headless(replay_, stream_path=None):
+    '''Plays replay without graphics and prints final state of the board
+
+    Arguments:
+        replay_ {replay.Replay}
+        stream_path {str} -- writes spectator stream of replay there
+    '''
+
+    players = [game.Player((255, 0, 0))]
+    map_ = map.Map((5, 5), 10, players, 4, 32, (0, 0))
+    gameplay = game.Gameplay(map_, 6, 0, 8, replay_.seed)
+
+    if stream_path:
+        set_spectator_stream(map_, gameplay, stream_path)
+
+    replay_.run_headless(map_, gameplay)
+
+    if map_.board:
+        for player_index in range(len(map_.players)):
+            print('player {}: {} hexes'.format(
+                player_index,
+                (map_.board.owner_map == player_index).sum()))
+
+        digest = hashlib.sha1(map_.board.owner_map.tobytes())
+        digest.update(map_.board.dice_map.tobytes())
+        print('board: {}'.format(digest.hexdigest()))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--seed', type=int,
+                        help='seed of the game, random if not given')
+    parser.add_argument('--record', metavar='PATH',
+                        help='writes replay log of the game, it\'s '
+                             'overwritten if it exists')
+    parser.add_argument('--replay', metavar='PATH',
+                        help='plays replay log instead of new game')
+    parser.add_argument('--headless', action='store_true',
+                        help='plays replay at maximum speed, without window')
+    parser.add_argument('--profile-output', metavar='PATH',
+                        help='enables profiler and saves its metrics on exit, '
+                             'as CSV if path ends with .csv, otherwise as '
+                             'JSON')
+    parser.add_argument('--spectator-stream', metavar='PATH',
+                        help='writes keyframes and deltas of the game for '
+                             'spectators, see spectator.py')
+    args = parser.parse_args()
+
+    if args.headless and not args.replay:
+        parser.error('--headless requires --replay')
+    if args.record and args.replay:
+        parser.error('--record can\'t be used with --replay')
+
+    replay_ = replay.Replay(args.replay) if args.replay else None
+
+    if args.headless:
+        run_headless(replay_, args.spectator_stream)
+    else:
+        main = Main(args.seed, replay_, args.profile_output,
+                    args.spectator_stream, args.record)
+        main.play()
@@ -18,15 +18,55 @@ import numpy
 import math
 import random
 
+import board
 
-class Hex:
-    '''Hex object'''
 
-    def __init__(self, middle, polygon, player):
-        self.middle = middle
-        self.polygon = polygon
-        self.player = player
-        self.dice_number = 0
+class Hex:
+    '''
+    Hex object. Owner and dice number are kept in board's arrays, middle
+    point and polygon are calculated from map's layout when needed, so hex
+    holds only its map and coords
+    '''
+
+    __slots__ = ('map_', 'coords')
+
+    def __init__(self, map_, coords):
+        self.map_ = map_
+        self.coords = tuple(coords)
+
+    @property
+    def player_id(self):
+        '''Index of player owning the hex'''
+        return int(self.map_.board.owner_map[self.coords])
+
+    @property
+    def player(self):
+        '''Player owning the hex'''
+        return self.map_.players[self.map_.board.owner_map[self.coords]]
+
+    @player.setter
+    def player(self, player):
+        self.map_.board.owner_map[self.coords] = \
+            self.map_.players.index(player)
+
+    @property
+    def dice_number(self):
+        '''Number of dice placed on the hex'''
+        return int(self.map_.board.dice_map[self.coords])
+
+    @dice_number.setter
+    def dice_number(self, dice_number):
+        self.map_.board.dice_map[self.coords] = dice_number
+
+    @property
+    def middle(self):
+        '''Hex's middle point on the screen'''
+        return self.map_.get_hex_middle(self.coords)
+
+    @property
+    def polygon(self):
+        '''Hex's polygon on the screen'''
+        return self.map_.calculate_hex_polygon(self.middle)
 
     def is_point_inside_polygon(self, point):
         '''Returns True if point is inside polygon else False
@@ -39,18 +79,19 @@ class Hex:
         '''
 
         is_inside = False
+        polygon = self.polygon
 
         i = 0
-        j = len(self.polygon) - 1
+        j = len(polygon) - 1
 
-        while i < len(self.polygon):
+        while i < len(polygon):
             if ((
-                self.polygon[i][1] > point[1]) !=
-                (self.polygon[j][1] > point[1])) and \
-                    (point[0] < (self.polygon[j][0]-self.polygon[i][0]) *
-                        (point[1]-self.polygon[i][1]) /
-                        (self.polygon[j][1]-self.polygon[i][1]) +
-                        self.polygon[i][0]):
+                polygon[i][1] > point[1]) !=
+                (polygon[j][1] > point[1])) and \
+                    (point[0] < (polygon[j][0]-polygon[i][0]) *
+                        (point[1]-polygon[i][1]) /
+                        (polygon[j][1]-polygon[i][1]) +
+                        polygon[i][0]):
                 is_inside = not is_inside
 
             j = i
@@ -59,17 +100,67 @@ class Hex:
         return is_inside
 
 
+class HexMap:
+    '''
+    HexMap object. Map's hexes indexed like 2d array of Hex objects, with 0
+    where there is no hex. Hex's object is created when it's got first time,
+    so creating map doesn't depend on board's size
+    '''
+
+    def __init__(self, map_):
+        self.map_ = map_
+        self.shape = tuple(map_.board.size)
+
+        # coords -> Hex
+        self.hexes = {}
+
+    def __getitem__(self, coords):
+        '''Returns hex at given coords, 0 if there is no hex
+
+        Arguments:
+            coords {tuple(int, int)}
+
+        Returns:
+            Hex or int
+        '''
+
+        coords = (int(coords[0]), int(coords[1]))
+
+        hex_ = self.hexes.get(coords)
+        if hex_ is None:
+            if self.map_.board.owner_map[coords] < 0:
+                return 0
+
+            hex_ = Hex(self.map_, coords)
+            self.hexes[coords] = hex_
+
+        return hex_
+
+
 class Map:
     '''Map object'''
 
     # inits
     def __init__(self, size, hex_number, players, dice_per_hex,
-                 default_side_length, window_size):
+                 default_side_length, window_size, map_generator=None,
+                 seed=None):
         self.size = size
 
         self.hex_number = hex_number
 
-        self.hex_map = numpy.zeros([self.size[0], self.size[1]], dtype=Hex)
+        self.board = board.Board(self.size)
+        self.hex_map = HexMap(self)
+        self.generation = 0
+
+        self.map_generator = map_generator
+        self.rng = random.Random(seed)
+        self.replay_log = None
+        self.spectator_stream = None
+        self.history = None
+
+        # functions called with coords of hexes whose owner may have changed
+        # without new map, see add_observer
+        self.observers = []
 
         self.players = players
 
@@ -95,19 +186,6 @@ class Map:
         self.half_side_length_root3 = int(self.half_side_length * math.sqrt(3))
 
     # creation and transformation of visual hex representation
-    def __recalculate_hex_polygons(self):
-        '''Recalculates all hex's middle points and polygons'''
-
-        for i in range(self.hex_map.shape[0]):
-            for j in range(self.hex_map.shape[1]):
-                if type(self.hex_map[i, j]) == Hex:
-                    hex_middle = self.__calculate_hex_middle((i, j))
-                    hex_middle_shifted = [item1 + item2 for item1, item2 in
-                                          zip(hex_middle, self.pos_shift)]
-                    self.hex_map[i, j].middle = hex_middle_shifted
-                    self.hex_map[i, j].polygon = \
-                        self.calculate_hex_polygon(hex_middle_shifted)
-
     def __calculate_hex_middle(self, point):
         '''Calculates and returns hex's middle point coords
 
@@ -131,6 +209,22 @@ class Map:
 
         return hex_middle
 
+    def get_hex_middle(self, point):
+        '''Returns hex's middle point coords on the screen, shifted with map
+
+        Arguments:
+            point {list(int, int)} -- hex's index in 2d array representation
+                of map
+
+        Returns:
+            [list(int, int)] -- hex's middle point coords
+        '''
+
+        hex_middle = self.__calculate_hex_middle(point)
+
+        return [hex_middle[0] + self.pos_shift[0],
+                hex_middle[1] + self.pos_shift[1]]
+
     def calculate_hex_polygon(self, hex_middle):
         '''Calculates and returns hex's polygon
 
@@ -156,7 +250,8 @@ class Map:
         return polygon
 
     def resize_polygons(self, side_length):
-        '''Changes hex's side length and related attributes, then resizes hex's polygon
+        '''Changes hex's side length and related attributes, hexes polygons
+               are calculated from them
 
         Arguments:
             side_length {int} -- hex's side length
@@ -164,10 +259,9 @@ class Map:
 
         if side_length >= 6 and side_length <= 60:
             self.__init_side_lengths(side_length)
-            self.__recalculate_hex_polygons()
 
     def move_polygons(self, pos_shift):
-        '''Moves hex's polygon by given shift
+        '''Moves map, and so hexes polygons, by given shift
 
         Arguments:
             pos_shift {list(int, int)} -- position shift
@@ -176,8 +270,6 @@ class Map:
         self.pos_shift = [item1 + item2 for item1, item2 in
                           zip(self.pos_shift, pos_shift)]
 
-        self.__recalculate_hex_polygons()
-
     # map creation
     def __side_to_point_diff(self, side, point):
         '''If move in given direction is possible returns moved point else
@@ -232,10 +324,13 @@ class Map:
 
     #
     # hexes and dice distribution
-    def __create_hex_distribution_list(self):
+    def __create_hex_distribution_list(self, rng):
         '''Returns list with number of hexes per player. Each element
                corresponds to player in players list
 
+        Arguments:
+            rng {random.Random}
+
         Returns:
             list(int) -- list with number of hexes per player
         '''
@@ -245,34 +340,38 @@ class Map:
 
         for hex_left in range(self.hex_number % len(self.players), 0, -1):
             while True:
-                hex_choosen = random.randrange(len(hex_distribution_list))
+                hex_choosen = rng.randrange(len(hex_distribution_list))
                 if hex_distribution_list[hex_choosen] == hex_per_player:
                     hex_distribution_list[hex_choosen] += 1
                     break
 
         return hex_distribution_list
 
-    def __choose_player(self, hex_distribution_list):
+    def __choose_player(self, hex_distribution_list, rng):
         '''Chooses player from list
 
         Arguments:
             hex_distribution_list {list(int)} -- list with number of nexes per
                 player
+            rng {random.Random}
 
         Returns:
             int -- player index
         '''
 
         while True:
-            player = random.randrange(len(self.players))
+            player = rng.randrange(len(self.players))
             if hex_distribution_list[player] > 0:
                 hex_distribution_list[player] -= 1
                 return player
 
-    def __create_dice_distribution_list(self):
+    def __create_dice_distribution_list(self, rng):
         '''Returns list with number of dice per hex. Each element corresponds to hex on
         flat 2d array map representation
 
+        Arguments:
+            rng {random.Random}
+
         Returns:
             list(int) -- list with number of dice per hex
         '''
@@ -281,26 +380,27 @@ class Map:
         dice_distribution_list = [0] * self.hex_number
 
         for hex_ in range(len(dice_distribution_list)):
-            dice_number = random.randrange(self.dice_per_hex - 2,
-                                           self.dice_per_hex + 1)
+            dice_number = rng.randrange(self.dice_per_hex - 2,
+                                        self.dice_per_hex + 1)
             dice_left += self.dice_per_hex - dice_number
             dice_distribution_list[hex_] = dice_number
 
         for die in range(dice_left):
             while True:
-                hex_choosen = random.randrange(self.hex_number)
+                hex_choosen = rng.randrange(self.hex_number)
                 if dice_distribution_list[hex_choosen] < self.dice_per_hex + 2:
                     dice_distribution_list[hex_choosen] += 1
                     break
 
         return dice_distribution_list
 
-    def __is_dice_distribution_fair(self, dice_distribution_list,
+    def __is_dice_distribution_fair(self, board_, dice_distribution_list,
                                     fair_variation):
         '''Returns True if variation between lowest and highest dice number if
                smaller than fair_variation, otherwise returns False
 
         Arguments:
+            board_ {board.Board} -- board with hexes distributed to players
             dice_distribution_list {list(int)} -- list with number of dice per
                 hex
             fair_variation {float} -- maximum variation (between 0.2 and 0.4)
@@ -312,22 +412,15 @@ class Map:
         if not (0.2 <= fair_variation <= 0.4):
             raise Exception('fair_variation isn\'t in range')
 
-        players_dice_number = {}
-        hex_list = [hex_ for hex_ in list(self.hex_map.flat) if type(hex_) ==
-                    Hex]
-
-        for hex_number in range(len(dice_distribution_list)):
-            player = hex_list[hex_number].player
-            if player in players_dice_number:
-                players_dice_number[player] += dice_distribution_list[
-                    hex_number]
-            else:
-                players_dice_number[player] = dice_distribution_list[
-                    hex_number]
+        owners = board_.owner_map[board_.owner_map >= 0]
+        players_dice_number = numpy.bincount(
+            owners, weights=dice_distribution_list)
+        players_dice_number = list(
+            players_dice_number[numpy.bincount(owners) > 0])
 
-        min_ = min(players_dice_number.values())
-        max_ = max(players_dice_number.values())
-        average = sum(players_dice_number.values()) / len(players_dice_number)
+        min_ = min(players_dice_number)
+        max_ = max(players_dice_number)
+        average = sum(players_dice_number) / len(players_dice_number)
 
         if (average / min_ > 1.0 + fair_variation) or (average / max_ < 1.0 -
            fair_variation):
@@ -335,54 +428,148 @@ class Map:
 
         return True
 
-    def __distribute_dice_to_hexes(self, dice_distribution_list):
+    def __distribute_dice_to_hexes(self, board_, dice_distribution_list):
         '''Distributes dice to hexes
 
         Arguments:
+            board_ {board.Board} -- board with hexes distributed to players
             dice_distribution_list {list(int)} -- list with dice number per hex
         '''
 
-        hex_list = [hex_ for hex_ in list(self.hex_map.flat) if type(hex_) ==
-                    Hex]
-
-        for hex_ in range(len(dice_distribution_list)):
-            hex_list[hex_].dice_number += dice_distribution_list[hex_]
+        board_.dice_map[board_.owner_map >= 0] += numpy.array(
+            dice_distribution_list, dtype=board_.dice_map.dtype)
 
     #
     # main map creation
-    def create_map(self):
+    def get_generation_params(self):
+        '''Returns parameters which board generation depends on
+
+        Returns:
+            tuple -- size, hex number, players number and dice per hex
         '''
-        Initializes hex's 2d array map with hex's objects.
-        Distributes hexes to players and dice to hexes
+
+        return (tuple(self.size), self.hex_number, len(self.players),
+                self.dice_per_hex)
+
+    def generate_board(self, seed=None):
         '''
+        Creates board and distributes hexes to players and dice to hexes.
+        The same seed and generation params always give the same board
 
-        self.pos_shift = [0, 0]
+        Arguments:
+            seed {int} -- if it isn't given, it's drawn from map's random
+                numbers generator
 
-        self.hex_map = numpy.zeros([self.size[0], self.size[1]], Hex)
+        Returns:
+            board.Board
+        '''
+
+        if seed is None:
+            seed = self.rng.getrandbits(63)
+        rng = random.Random(seed)
 
-        hex_distribution_list = self.__create_hex_distribution_list()
+        board_ = board.Board(self.size)
+        board_.seed = seed
 
-        point = [random.randrange(self.size[0]), random.randrange(self.size[1])]
+        hex_distribution_list = self.__create_hex_distribution_list(rng)
+
+        point = [rng.randrange(self.size[0]), rng.randrange(self.size[1])]
 
         i = 0
         while i < self.hex_number:
-            point = self.__side_to_point_diff(random.randrange(6), point)
-            if not self.hex_map[point[0], point[1]]:
-                hex_middle = self.__calculate_hex_middle(point)
-                self.hex_map[point[0], point[1]] = Hex(
-                    hex_middle,
-                    self.calculate_hex_polygon(hex_middle),
-                    self.players[self.__choose_player(hex_distribution_list)])
+            point = self.__side_to_point_diff(rng.randrange(6), point)
+            if board_.owner_map[point[0], point[1]] < 0:
+                board_.owner_map[point[0], point[1]] = \
+                    self.__choose_player(hex_distribution_list, rng)
                 i += 1
 
+        self.distribute_dice(board_, rng)
+
+        return board_
+
+    def distribute_dice(self, board_, rng):
+        '''Draws dice distributions until fair one is found and distributes
+               it to hexes
+
+        Arguments:
+            board_ {board.Board} -- board with hexes distributed to players
+            rng {random.Random}
+        '''
+
         while True:
-            dice_distribution_list = self.__create_dice_distribution_list()
-            if self.__is_dice_distribution_fair(dice_distribution_list, 0.3):
+            dice_distribution_list = self.__create_dice_distribution_list(rng)
+            if self.__is_dice_distribution_fair(
+               board_, dice_distribution_list, 0.3):
                 break
 
-        self.__distribute_dice_to_hexes(dice_distribution_list)
+        self.__distribute_dice_to_hexes(board_, dice_distribution_list)
+
+    def create_map(self, board_=None):
+        '''
+        Sets map's board, hexes objects are created when they're needed.
+        If board isn't given, it's taken from map generator or generated
+        right away
+
+        Arguments:
+            board_ {board.Board} -- board with distributed hexes and dice
+        '''
+
+        if not board_:
+            if self.map_generator:
+                board_ = self.map_generator.get_board(
+                    self.get_generation_params())
+            else:
+                board_ = self.generate_board()
+
+        self.pos_shift = [0, 0]
+
+        self.board = board_
+        self.generation += 1
+
+        if self.replay_log:
+            self.replay_log.log_new_map(self)
+        if self.spectator_stream:
+            self.spectator_stream.record_new_map(self)
+        if self.history:
+            self.history.record_new_map(self)
+
+        self.hex_map = HexMap(self)
+
+    # observers
+    def add_observer(self, observer):
+        '''Adds function called with coords of hexes whose owner may have
+               changed, e.g. after fight. New board or generation of map
+               isn't reported, whole board may have changed then
+
+        Arguments:
+            observer {function(list(tuple(int, int)))}
+        '''
+
+        self.observers.append(observer)
+
+    def report_changed_hexes(self, coords_list):
+        '''Tells observers that hexes with given coords may have changed
+
+        Arguments:
+            coords_list {list(tuple(int, int))}
+        '''
+
+        for observer in self.observers:
+            observer(coords_list)
 
     # etc
+    def get_players_palette(self):
+        '''Returns players colors indexed with owner id + 1, first color is
+               black for places without hex
+
+        Returns:
+            numpy.ndarray -- array of shape (players number + 1, 3)
+        '''
+
+        return numpy.array(
+            [(0, 0, 0)] + [player.color for player in self.players],
+            dtype=numpy.uint8)
+
     def get_visibile_hex_list(self, right_bar_rect):
         '''Returns list of hexes in visibility range
 
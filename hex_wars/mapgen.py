@@ -0,0 +1,172 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import collections
+import concurrent.futures
+import functools
+import random
+
+import map
+import sharedboard
+
+
+class MapGenerator:
+    '''
+    MapGenerator object. Keeps small queue of boards generated in background
+    process for given generation parameters, so new map can be created
+    without waiting for hexes and dice distribution. Every prepared board
+    gets shared board, which background process writes it to, so boards
+    aren't pickled back
+    '''
+
+    def __init__(self, queue_size=2, seed=None):
+        self.queue_size = queue_size
+        self.rng = random.Random(seed)
+
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+
+        # generation params -> queue of (future, shared board, seed)
+        self.pending_boards = collections.OrderedDict()
+
+    @staticmethod
+    def generate_board(params, seed, shared_board_name=None):
+        '''Generates board in worker process
+
+        Arguments:
+            params {tuple} -- size, hex number, players number and dice per
+                hex, see map.Map.get_generation_params
+            seed {int}
+            shared_board_name {str} -- board is written to this shared board
+                instead of being returned
+
+        Returns:
+            board.Board or None
+        '''
+
+        size, hex_number, players_number, dice_per_hex = params
+
+        board_ = map.Map(size, hex_number, [None] * players_number,
+                         dice_per_hex, 0, (0, 0)).generate_board(seed)
+
+        if shared_board_name is None:
+            return board_
+
+        shared_board = sharedboard.SharedBoard.attach(shared_board_name,
+                                                      writable=True)
+        shared_board.write(board_)
+        shared_board.close()
+
+    def prepare(self, params):
+        '''Starts generating boards for given params, only two most recently
+               prepared params are kept
+
+        Arguments:
+            params {tuple} -- see map.Map.get_generation_params
+        '''
+
+        pending = self.pending_boards.pop(params, collections.deque())
+        self.pending_boards[params] = pending
+
+        while len(pending) < self.queue_size:
+            seed = self.rng.getrandbits(63)
+            shared_board = sharedboard.SharedBoard.create(params[0],
+                                                          params[2])
+
+            pending.append((self.executor.submit(
+                MapGenerator.generate_board, params, seed,
+                shared_board.name), shared_board, seed))
+
+        while len(self.pending_boards) > 2:
+            self.discard(next(iter(self.pending_boards)))
+
+    def discard(self, params):
+        '''Drops boards prepared for given params
+
+        Arguments:
+            params {tuple} -- see map.Map.get_generation_params
+        '''
+
+        for future, shared_board, seed in self.pending_boards.pop(params, []):
+            future.cancel()
+            # board which is being generated is still written to its block
+            future.add_done_callback(functools.partial(
+                MapGenerator.close_shared_board, shared_board))
+
+    def __restart_executor(self):
+        '''Replaces broken executor, boards it was preparing are dropped'''
+        for params in list(self.pending_boards):
+            self.discard(params)
+
+        self.executor.shutdown(wait=False)
+        self.executor = concurrent.futures.ProcessPoolExecutor(max_workers=1)
+
+    def close(self):
+        '''Drops all prepared boards and frees their shared boards'''
+        for params in list(self.pending_boards):
+            self.discard(params)
+
+    @staticmethod
+    def close_shared_board(shared_board, future):
+        '''Frees shared board of finished or cancelled future
+
+        Arguments:
+            shared_board {sharedboard.SharedBoard}
+            future {concurrent.futures.Future}
+        '''
+
+        shared_board.close()
+
+    def get_board(self, params):
+        '''Returns prepared board if there is one ready, otherwise or if
+               preparing it failed generates board right away. Then starts
+               preparing next board
+
+        Arguments:
+            params {tuple} -- see map.Map.get_generation_params
+
+        Returns:
+            board.Board
+        '''
+
+        board_ = None
+        seed = None
+
+        pending = self.pending_boards.get(params, [])
+        for entry in pending:
+            future, shared_board, prepared_seed = entry
+            if future.done() and not future.cancelled():
+                pending.remove(entry)
+                seed = prepared_seed
+                try:
+                    future.result()
+                    board_ = shared_board.read()[0]
+                    board_.seed = seed
+                except Exception as error:
+                    # board is generated below from the same seed
+                    if isinstance(error, concurrent.futures.BrokenExecutor):
+                        self.__restart_executor()
+                finally:
+                    shared_board.close()
+                break
+
+        if not board_:
+            if seed is None:
+                seed = self.rng.getrandbits(63)
+            board_ = MapGenerator.generate_board(params, seed)
+
+        self.prepare(params)
+
+        return board_
@@ -0,0 +1,224 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import math
+import numpy
+import pygame
+
+import controls
+
+
+class Minimap(controls.Control):
+    '''
+    Minimap control. Shows whole board with two pixels per hex, each row
+    shifted by one pixel. Hexes changed by fights are reported by map, only
+    their pixels are updated, in image and in its scaled copy. New board or
+    map's generation creates image again
+    '''
+
+    def __init__(self, rect, map_, view_size, color):
+        super().__init__(rect, None, None, color)
+
+        self.map_ = map_
+        self.view_size = view_size
+
+        self.board = None
+        self.players = None
+        self.generation = None
+        self.palette = None
+        # coords of hexes reported since image was updated
+        self.changed_coords = []
+
+        self.image = None
+        self.image_scaled = None
+        self.image_rect = None
+        self.pixel_size = None
+
+        self.view_key = None
+
+        self.map_.add_observer(self.changed_coords.extend)
+
+    def needs_render(self):
+        '''Returns True if board or visible part of the map changed
+
+        Returns:
+            bool
+        '''
+
+        view_key = (tuple(self.map_.pos_shift), self.map_.side_length)
+
+        if self.__check_image() or self.view_key != view_key:
+            self.view_key = view_key
+            return True
+
+        return self.is_dirty
+
+    # image
+    def __check_image(self):
+        '''Creates or incrementally updates minimap's image
+
+        Returns:
+            bool -- True if image changed
+        '''
+
+        if self.board is not self.map_.board or \
+           self.players is not self.map_.players or \
+           self.generation != self.map_.generation:
+            self.__create_image()
+            return True
+
+        if self.changed_coords:
+            changed = tuple(numpy.array(self.changed_coords).T)
+            self.changed_coords.clear()
+
+            self.__update_pixels(changed)
+            self.__update_scaled_pixels(changed)
+            return True
+
+        return False
+
+    def __create_image(self):
+        '''Creates minimap's image from scratch'''
+        self.board = self.map_.board
+        self.players = self.map_.players
+        self.generation = self.map_.generation
+        self.changed_coords.clear()
+
+        self.palette = self.map_.get_players_palette()
+
+        image_size = (2 * self.board.size[0] + self.board.size[1],
+                      self.board.size[1])
+        self.image = pygame.Surface(image_size)
+        self.image.set_colorkey((0, 0, 0))
+        self.__update_pixels(numpy.nonzero(self.board.owner_map >= 0))
+
+        # row of hexes is sqrt(3) times higher than half of hex's width
+        scale = min(self.rect[2] / image_size[0],
+                    self.rect[3] / (image_size[1] * math.sqrt(3)))
+        self.pixel_size = (scale, scale * math.sqrt(3))
+        self.image_rect = pygame.Rect(
+            0, 0, int(image_size[0] * self.pixel_size[0]),
+            int(image_size[1] * self.pixel_size[1]))
+        self.image_rect.center = (self.rect[0] + self.rect[2] / 2,
+                                  self.rect[1] + self.rect[3] / 2)
+
+        self.__scale_image()
+
+    def __update_pixels(self, coords):
+        '''Colors pixels of hexes with given coords
+
+        Arguments:
+            coords {tuple(numpy.ndarray, numpy.ndarray)} -- hexes indices
+        '''
+
+        pixels = pygame.surfarray.pixels3d(self.image)
+        x = 2 * coords[0] + coords[1]
+        colors = self.palette[self.board.owner_map[coords] + 1]
+        pixels[x, coords[1]] = colors
+        pixels[x + 1, coords[1]] = colors
+        del pixels
+
+    def __update_scaled_pixels(self, coords):
+        '''Colors scaled pixels of hexes with given coords, scaled pixel d
+               shows image's pixel d * image's size // scaled size, as in
+               pygame.transform.scale
+
+        Arguments:
+            coords {tuple(numpy.ndarray, numpy.ndarray)} -- hexes indices
+        '''
+
+        for i, j in zip(*(axis_coords.tolist() for axis_coords in coords)):
+            x = 2 * i + j
+            left, top = self.__get_first_scaled_pixel((x, j))
+            right, bottom = self.__get_first_scaled_pixel((x + 2, j + 1))
+
+            self.image_scaled.fill(
+                self.palette[self.board.owner_map[i, j] + 1],
+                (left, top, right - left, bottom - top))
+
+    def __get_first_scaled_pixel(self, pixel):
+        '''Returns first scaled pixel showing given image's pixel
+
+        Arguments:
+            pixel {tuple(int, int)}
+
+        Returns:
+            tuple(int, int)
+        '''
+
+        return tuple(-(-pixel[axis] * self.image_scaled.get_size()[axis] //
+                       self.image.get_size()[axis]) for axis in (0, 1))
+
+    def __scale_image(self):
+        '''Scales minimap's image to control's size'''
+        self.image_scaled = pygame.transform.scale(self.image,
+                                                   self.image_rect.size)
+
+    # camera
+    def jump_to_point(self, point):
+        '''Moves map so that hex under given minimap's point is in the middle
+               of the view
+
+        Arguments:
+            point {list(int, int)} -- point, mostly mouse position
+        '''
+
+        if not self.image_rect:
+            return
+
+        image_x = (point[0] - self.image_rect[0]) / self.pixel_size[0]
+        image_y = (point[1] - self.image_rect[1]) / self.pixel_size[1]
+
+        pos_shift = (
+            self.view_size[0] / 2 -
+            image_x * self.map_.half_side_length_root3,
+            self.view_size[1] / 2 - image_y *
+            (self.map_.half_side_length + self.map_.side_length))
+
+        self.map_.move_polygons([
+            int(item1 - item2) for item1, item2 in
+            zip(pos_shift, self.map_.pos_shift)])
+
+    def __get_view_rect(self):
+        '''Returns visible part of the map in minimap's coords
+
+        Returns:
+            pygame.Rect
+        '''
+
+        pixel_width = self.map_.half_side_length_root3 / self.pixel_size[0]
+        pixel_height = (self.map_.half_side_length +
+                        self.map_.side_length) / self.pixel_size[1]
+
+        return pygame.Rect(
+            self.image_rect[0] - self.map_.pos_shift[0] / pixel_width,
+            self.image_rect[1] - self.map_.pos_shift[1] / pixel_height,
+            self.view_size[0] / pixel_width,
+            self.view_size[1] / pixel_height).clip(self.rect)
+
+    def render(self, surface):
+        '''Renders minimap on surface
+
+        Arguments:
+            surface {pygame.Surface} -- surface to render on
+        '''
+
+        if not self.image:
+            self.__check_image()
+
+        pygame.draw.rect(surface, self.color, self.rect)
+        surface.blit(self.image_scaled, self.image_rect)
+        pygame.draw.rect(surface, (255, 255, 255), self.__get_view_rect(), 1)
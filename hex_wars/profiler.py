@@ -0,0 +1,298 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import bisect
+import collections
+import csv
+import functools
+import json
+import threading
+import time
+import numpy
+import pygame
+
+import fonts
+
+
+# upper bounds of histogram buckets in milliseconds, last bucket is open
+HISTOGRAM_BOUNDS = (0.1, 0.25, 0.5, 1, 2, 4, 8, 16, 33, 66, 133)
+# number of latest samples percentiles are calculated from
+ROLLING_SAMPLES_NUMBER = 600
+# how often overlay's text is rendered again, in seconds
+OVERLAY_UPDATE_TIME = 0.25
+
+
+class Metric:
+    '''
+    Metric object. Call count, total time and histogram since profiler was
+    created, and latest samples for rolling percentiles
+    '''
+
+    def __init__(self):
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BOUNDS) + 1)
+        self.samples = collections.deque(maxlen=ROLLING_SAMPLES_NUMBER)
+
+    def add_sample(self, duration):
+        '''Adds sample
+
+        Arguments:
+            duration {float} -- milliseconds
+        '''
+
+        self.calls += 1
+        self.total_time += duration
+        self.max_time = max(self.max_time, duration)
+        self.histogram[bisect.bisect_left(HISTOGRAM_BOUNDS, duration)] += 1
+        self.samples.append(duration)
+
+    def get_percentiles(self):
+        '''Returns rolling p50, p95 and p99
+
+        Returns:
+            tuple(float, float, float)
+        '''
+
+        if not self.samples:
+            return (0.0, 0.0, 0.0)
+
+        return tuple(numpy.percentile(self.samples, (50, 95, 99)))
+
+
+class Profiler:
+    '''
+    Profiler object. Times stages of every frame, as event handler's frame
+    timer, and calls of instrumented methods. Methods are wrapped only while
+    profiler is enabled, so disabled profiler costs nothing
+    '''
+
+    def __init__(self):
+        self.enabled = False
+
+        self.metrics = collections.OrderedDict()
+        self.lock = threading.Lock()
+
+        # (owner, attribute, metric name) of every instrumented method
+        self.instrumented = []
+        self.originals = {}
+
+        self.frame_start_time = None
+        self.stage_start_time = None
+        self.frame_times = collections.deque(maxlen=ROLLING_SAMPLES_NUMBER)
+
+        self.font = None
+        self.overlay = None
+        self.overlay_update_time = 0
+
+    # instrumenting
+    def instrument(self, owner, attribute):
+        '''Registers method timed while profiler is enabled
+
+        Arguments:
+            owner {type} -- class, method is timed for all its instances
+            attribute {str} -- method's name
+        '''
+
+        self.instrumented.append(
+            (owner, attribute, '{}.{}'.format(owner.__name__, attribute)))
+
+        if self.enabled:
+            self.__wrap(*self.instrumented[-1])
+
+    def __wrap(self, owner, attribute, name):
+        '''Replaces method with timed one
+
+        Arguments:
+            owner {type}
+            attribute {str}
+            name {str} -- metric name
+        '''
+
+        original = getattr(owner, attribute)
+        self.originals[(owner, attribute)] = original
+
+        @functools.wraps(original)
+        def timed(*args, **kwargs):
+            start_time = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                self.add_sample(name, (time.perf_counter() - start_time) *
+                                1000)
+
+        setattr(owner, attribute, timed)
+
+    def enable(self):
+        '''Starts timing'''
+        if not self.enabled:
+            self.enabled = True
+
+            for owner, attribute, name in self.instrumented:
+                self.__wrap(owner, attribute, name)
+
+    def disable(self):
+        '''Stops timing and restores instrumented methods'''
+        if self.enabled:
+            self.enabled = False
+
+            for (owner, attribute), original in self.originals.items():
+                setattr(owner, attribute, original)
+            self.originals.clear()
+
+    # frame timing
+    def start_frame(self):
+        '''Starts timing new frame'''
+        self.frame_start_time = time.perf_counter()
+        self.stage_start_time = self.frame_start_time
+
+    def mark_stage(self, stage):
+        '''Adds time passed since previous stage as stage's sample
+
+        Arguments:
+            stage {str}
+        '''
+
+        now = time.perf_counter()
+        self.add_sample(stage, (now - self.stage_start_time) * 1000)
+        self.stage_start_time = now
+
+    def finish_frame(self):
+        '''Adds time passed since frame started as frame's sample'''
+        frame_time = time.perf_counter() - self.frame_start_time
+
+        self.frame_times.append(frame_time)
+        self.add_sample('frame', frame_time * 1000)
+
+    def add_sample(self, name, duration):
+        '''Adds sample to metric, it may be called from any thread
+
+        Arguments:
+            name {str}
+            duration {float} -- milliseconds
+        '''
+
+        with self.lock:
+            if name not in self.metrics:
+                self.metrics[name] = Metric()
+            self.metrics[name].add_sample(duration)
+
+    def get_fps(self):
+        '''Returns frames per second of latest frames
+
+        Returns:
+            float
+        '''
+
+        if not self.frame_times:
+            return 0.0
+
+        return len(self.frame_times) / sum(self.frame_times)
+
+    # overlay
+    def render(self, surface):
+        '''Renders overlay with fps and timings in window's corner
+
+        Arguments:
+            surface {pygame.Surface} -- surface to render on
+        '''
+
+        if time.perf_counter() - self.overlay_update_time > \
+           OVERLAY_UPDATE_TIME:
+            self.overlay_update_time = time.perf_counter()
+            self.__render_overlay()
+
+        surface.blit(self.overlay, (0, 0))
+
+    def __render_overlay(self):
+        '''Renders overlay's text on its own surface'''
+        if not self.font:
+            self.font = fonts.get_font_cache().get_font('monospace', 14)
+
+        lines = ['FPS {:.1f}'.format(self.get_fps()),
+                 '{:<32}{:>8}{:>8}{:>8}{:>8}'.format('', 'calls', 'p50',
+                                                     'p95', 'p99')]
+        with self.lock:
+            for name, metric in self.metrics.items():
+                lines.append('{:<32}{:>8}{:>8.2f}{:>8.2f}{:>8.2f}'.format(
+                    name, metric.calls, *metric.get_percentiles()))
+
+        texts = [self.font.render(line, True, (255, 255, 255))
+                 for line in lines]
+        line_height = self.font.get_linesize()
+
+        self.overlay = pygame.Surface(
+            (max(text.get_width() for text in texts) + 8,
+             len(texts) * line_height + 8), pygame.SRCALPHA)
+        self.overlay.fill((0, 0, 0, 192))
+        for i, text in enumerate(texts):
+            self.overlay.blit(text, (4, 4 + i * line_height))
+
+    # export
+    def get_metrics(self):
+        '''Returns all metrics as dicts, times are in milliseconds
+
+        Returns:
+            list(dict)
+        '''
+
+        metrics = []
+        with self.lock:
+            for name, metric in self.metrics.items():
+                p50, p95, p99 = metric.get_percentiles()
+                metrics.append({
+                    'name': name,
+                    'calls': metric.calls,
+                    'total': metric.total_time,
+                    'mean': metric.total_time / metric.calls,
+                    'p50': p50,
+                    'p95': p95,
+                    'p99': p99,
+                    'max': metric.max_time,
+                    'histogram': list(metric.histogram),
+                })
+
+        return metrics
+
+    def dump(self, path):
+        '''Saves metrics as CSV if path ends with .csv, otherwise as JSON
+
+        Arguments:
+            path {str}
+        '''
+
+        metrics = self.get_metrics()
+
+        if path.endswith('.csv'):
+            histogram_columns = ['<={}ms'.format(bound) for bound in
+                                 HISTOGRAM_BOUNDS] + \
+                ['>{}ms'.format(HISTOGRAM_BOUNDS[-1])]
+
+            with open(path, 'w', newline='') as file_:
+                writer = csv.writer(file_)
+                writer.writerow(['name', 'calls', 'total', 'mean', 'p50',
+                                 'p95', 'p99', 'max'] + histogram_columns)
+                for metric in metrics:
+                    writer.writerow(
+                        [metric[key] for key in ('name', 'calls', 'total',
+                                                 'mean', 'p50', 'p95', 'p99',
+                                                 'max')] +
+                        metric['histogram'])
+        else:
+            with open(path, 'w') as file_:
+                json.dump({'histogram_bounds': HISTOGRAM_BOUNDS,
+                           'metrics': metrics}, file_, indent=4)
@@ -0,0 +1,212 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import struct
+import numpy
+
+
+# every message is length of its body, type and body, little-endian
+FRAME_HEADER = struct.Struct('<IB')
+
+# client -> server
+JOIN = 1
+ATTACK = 2
+END_TURN = 3
+SPECTATE = 4
+# server -> client
+WELCOME = 16
+KEYFRAME = 17
+DELTA = 18
+GAME_OVER = 19
+ERROR = 20
+
+JOIN_BODY = struct.Struct('<I')  # game's id, also body of SPECTATE
+ATTACK_BODY = struct.Struct('<HHHH')  # attacking and defending coords
+# seat, players number, board's rows and columns
+WELCOME_BODY = struct.Struct('<BBHH')
+# turn counter and current player, then owner and dice of every hex
+KEYFRAME_BODY = struct.Struct('<IB')
+# turn counter and current player, then changed cells
+DELTA_BODY = struct.Struct('<IB')
+GAME_OVER_BODY = struct.Struct('<B')  # winner
+ERROR_BODY = struct.Struct('<B')
+
+CELL = numpy.dtype([('index', '<u4'), ('owner', 'i1'), ('dice', 'u1')])
+
+# seat in WELCOME sent to spectators
+SPECTATOR_SEAT = 255
+
+# hexes of the biggest board which can be sent
+MAX_HEXES = 1000 * 1000
+# longer bodies aren't read, delta changing every hex is the longest message
+MAX_MESSAGE_LENGTH = DELTA_BODY.size + MAX_HEXES * CELL.itemsize
+# clients send only intents, attack is the longest of them
+MAX_CLIENT_MESSAGE_LENGTH = ATTACK_BODY.size
+
+# error codes
+GAME_FULL = 1
+NOT_YOUR_TURN = 2
+ILLEGAL_ATTACK = 3
+UNKNOWN_MESSAGE = 4
+UNKNOWN_GAME = 5
+
+
+class ProtocolError(Exception):
+    '''Raised when message can't be decoded'''
+
+
+def encode(message_type, body=b''):
+    '''Returns message framed to be sent
+
+    Arguments:
+        message_type {int}
+        body {bytes}
+
+    Returns:
+        bytes
+    '''
+
+    return FRAME_HEADER.pack(len(body), message_type) + body
+
+
+async def read_message(reader, max_length=MAX_MESSAGE_LENGTH):
+    '''Reads one message
+
+    Arguments:
+        reader {asyncio.StreamReader}
+        max_length {int} -- longer body isn't read
+
+    Raises:
+        asyncio.IncompleteReadError -- if connection was closed
+        ProtocolError -- if body is longer than max_length
+
+    Returns:
+        tuple(int, bytes) -- type and body
+    '''
+
+    length, message_type = FRAME_HEADER.unpack(
+        await reader.readexactly(FRAME_HEADER.size))
+
+    if length > max_length:
+        raise ProtocolError('message is longer than {} bytes'.format(
+            max_length))
+
+    return message_type, await reader.readexactly(length)
+
+
+def iter_messages(data):
+    '''Yields messages from buffer of framed messages
+
+    Arguments:
+        data {bytes}
+
+    Raises:
+        ProtocolError -- if buffer ends inside message
+
+    Yields:
+        tuple(int, bytes) -- type and body
+    '''
+
+    offset = 0
+    while offset < len(data):
+        if len(data) - offset < FRAME_HEADER.size:
+            raise ProtocolError('buffer ends inside frame header')
+
+        length, message_type = FRAME_HEADER.unpack_from(data, offset)
+        offset += FRAME_HEADER.size
+
+        if len(data) - offset < length:
+            raise ProtocolError('buffer ends inside message body')
+
+        yield message_type, data[offset:offset + length]
+        offset += length
+
+
+def encode_keyframe(turn, current_player_index, board_):
+    '''Returns keyframe message with whole board
+
+    Arguments:
+        turn {int}
+        current_player_index {int}
+        board_ {board.Board}
+
+    Returns:
+        bytes
+    '''
+
+    return encode(KEYFRAME, KEYFRAME_BODY.pack(turn, current_player_index) +
+                  board_.owner_map.astype('i1').tobytes() +
+                  board_.dice_map.astype('u1').tobytes())
+
+
+def decode_keyframe(body, size):
+    '''Decodes keyframe message
+
+    Arguments:
+        body {bytes}
+        size {tuple(int, int)}
+
+    Returns:
+        tuple(int, int, numpy.ndarray, numpy.ndarray) -- turn, current
+            player, owner and dice maps
+    '''
+
+    hexes = size[0] * size[1]
+    if len(body) != KEYFRAME_BODY.size + 2 * hexes:
+        raise ProtocolError('keyframe doesn\'t match board\'s size')
+
+    turn, current_player_index = KEYFRAME_BODY.unpack_from(body)
+    maps = numpy.frombuffer(body, 'u1', offset=KEYFRAME_BODY.size)
+
+    return (turn, current_player_index,
+            maps[:hexes].view('i1').reshape(size).astype(numpy.int16),
+            maps[hexes:].reshape(size).astype(numpy.int16))
+
+
+def encode_delta(turn, current_player_index, cells):
+    '''Returns delta message
+
+    Arguments:
+        turn {int}
+        current_player_index {int}
+        cells {numpy.ndarray} -- CELL array of changed hexes
+
+    Returns:
+        bytes
+    '''
+
+    return encode(DELTA, DELTA_BODY.pack(turn, current_player_index) +
+                  cells.tobytes())
+
+
+def decode_delta(body):
+    '''Decodes delta message
+
+    Arguments:
+        body {bytes}
+
+    Returns:
+        tuple(int, int, numpy.ndarray) -- turn, current player and CELL
+            array of changed hexes
+    '''
+
+    if (len(body) - DELTA_BODY.size) % CELL.itemsize:
+        raise ProtocolError('delta has partial cell')
+
+    turn, current_player_index = DELTA_BODY.unpack_from(body)
+
+    return (turn, current_player_index,
+            numpy.frombuffer(body, CELL, offset=DELTA_BODY.size))
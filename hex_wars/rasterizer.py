@@ -0,0 +1,349 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import numpy
+import pygame
+
+
+class BoardRasterizer:
+    '''
+    BoardRasterizer object. Draws whole board with single numpy gather from
+    players palette, using pixel to hex lookup built from hex's layout.
+
+    Hex's layout is periodic: two rows of hexes form a tile, which repeats
+    every 2 * half_side_length_root3 pixels horizontally and shifts by the
+    same amount every two rows. The tile lookup holds index shift of hex
+    covering every tile pixel and is built once per zoom level. Lookup of
+    area one tile bigger than the view is built from it once per zoom level
+    too, as index of every pixel's hex in small window of hexes. Moving map
+    by whole tiles only adds constant to hexes indices, so view is slice of
+    that lookup and only window of hexes is moved with map, drawing gathers
+    pixels from colors of window's hexes.
+    '''
+
+    def __init__(self, map_, view_size):
+        self.map_ = map_
+        self.view_size = (int(view_size[0]), int(view_size[1]))
+
+        self.tile_key = None
+        self.tile_di = None
+        self.tile_dj = None
+
+        self.padded_view_key = None
+        self.padded_view_i = None
+        self.padded_view_j = None
+        # flat index of every padded view pixel's hex in window of hexes
+        self.padded_view_window_indices = None
+        # hexes indices of window's first hex and window's shape
+        self.window_origin = None
+        self.window_shape = None
+
+        self.view_key = None
+        self.view_slice = None
+        # hexes indices of window's first hex for current map move
+        self.view_window_origin = None
+        # hexes indices of view's border pixels, visible hexes are found
+        # from them
+        self.view_border_i = None
+        self.view_border_j = None
+
+        self.view_surface = None
+
+    # lookups
+    def __check_tile(self):
+        '''Rebuilds tile lookup if map was zoomed'''
+        if self.tile_key != self.map_.side_length:
+            self.tile_key = self.map_.side_length
+            self.__build_tile()
+
+    def __build_tile(self):
+        '''Builds lookup with index shift of hex covering every tile pixel'''
+        tile_width = 2 * self.map_.half_side_length_root3
+        row_height = self.map_.half_side_length + self.map_.side_length
+
+        x, y = numpy.indices((tile_width, 2 * row_height))
+        shifts = [(di, dj) for di in (-1, 0, 1) for dj in (-1, 0, 1, 2)]
+
+        # nearest hex's middle for pixels lying exactly on polygons edges
+        distances = numpy.empty((len(shifts), ) + x.shape)
+        for index, (di, dj) in enumerate(shifts):
+            middle = self.__calculate_tile_hex_middle(di, dj)
+            distances[index] = (x - middle[0]) ** 2 + (y - middle[1]) ** 2
+
+        nearest = numpy.argmin(distances, axis=0)
+        for index, (di, dj) in enumerate(shifts):
+            polygon = self.map_.calculate_hex_polygon(
+                self.__calculate_tile_hex_middle(di, dj))
+            nearest[self.__is_inside_polygon(x, y, polygon)] = index
+
+        nearest = numpy.array(shifts)[nearest]
+        self.tile_di = nearest[..., 0]
+        self.tile_dj = nearest[..., 1]
+
+    def __calculate_tile_hex_middle(self, di, dj):
+        '''Returns middle of hex shifted by given index shift from tile's hex
+
+        Arguments:
+            di {int}
+            dj {int}
+
+        Returns:
+            tuple(int, int)
+        '''
+
+        return (self.map_.half_side_length_root3 * (1 + 2 * di + dj),
+                self.map_.side_length +
+                dj * (self.map_.half_side_length + self.map_.side_length))
+
+    def __is_inside_polygon(self, x, y, polygon):
+        '''Vectorized version of map.Hex.is_point_inside_polygon
+
+        Arguments:
+            x {numpy.ndarray} -- points x coords
+            y {numpy.ndarray} -- points y coords
+            polygon {list(list(int, int))}
+
+        Returns:
+            numpy.ndarray -- bool array
+        '''
+
+        is_inside = numpy.zeros(x.shape, dtype=bool)
+
+        j = len(polygon) - 1
+        for i in range(len(polygon)):
+            if polygon[i][1] != polygon[j][1]:
+                is_inside ^= ((polygon[i][1] > y) != (polygon[j][1] > y)) & \
+                    (x < (polygon[j][0] - polygon[i][0]) *
+                     (y - polygon[i][1]) / (polygon[j][1] - polygon[i][1]) +
+                     polygon[i][0])
+            j = i
+
+        return is_inside
+
+    def get_hexes_indices(self, x, y):
+        '''Returns 2d array indices of hexes covering given points
+
+        Arguments:
+            x {numpy.ndarray} -- points x coords on screen
+            y {numpy.ndarray} -- points y coords on screen
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray) -- hexes indices, they can
+                be outside of map
+        '''
+
+        return self.__get_map_hexes_indices(
+            numpy.asarray(x) - int(self.map_.pos_shift[0]),
+            numpy.asarray(y) - int(self.map_.pos_shift[1]))
+
+    def __get_map_hexes_indices(self, x, y):
+        '''Returns 2d array indices of hexes covering given points of map
+               which isn't moved
+
+        Arguments:
+            x {numpy.ndarray}
+            y {numpy.ndarray}
+
+        Returns:
+            tuple(numpy.ndarray, numpy.ndarray) -- see get_hexes_indices
+        '''
+
+        self.__check_tile()
+
+        tile_width = 2 * self.map_.half_side_length_root3
+        tile_height = 2 * (self.map_.half_side_length + self.map_.side_length)
+
+        tile_row = y // tile_height
+        x = x - tile_row * tile_width
+        tile_column = x // tile_width
+
+        tile_x = x - tile_column * tile_width
+        tile_y = y - tile_row * tile_height
+
+        return (tile_column + self.tile_di[tile_x, tile_y],
+                2 * tile_row + self.tile_dj[tile_x, tile_y])
+
+    def get_hex_coords(self, point):
+        '''Returns coords of hex under point or None if there is no hex
+
+        Arguments:
+            point {list(int, int)} -- point, mostly mouse position
+
+        Returns:
+            tuple(int, int) or None
+        '''
+
+        i, j = self.get_hexes_indices(int(point[0]), int(point[1]))
+        coords = (int(i), int(j))
+
+        if self.map_.board.is_point_on_board(coords) and \
+           self.map_.board.owner_map[coords] >= 0:
+            return coords
+
+        return None
+
+    def __check_padded_view(self):
+        '''Rebuilds lookup of area one tile bigger than view if map was
+               zoomed
+        '''
+
+        if self.padded_view_key != self.map_.side_length:
+            self.padded_view_key = self.map_.side_length
+            self.__build_padded_view()
+
+    def __build_padded_view(self):
+        '''
+        Builds hexes indices of area one tile bigger than the view, for map
+        moved by one tile left and up, so every map move within a tile is
+        its slice
+        '''
+
+        tile_width = 2 * self.map_.half_side_length_root3
+        tile_height = 2 * (self.map_.half_side_length + self.map_.side_length)
+
+        x, y = numpy.indices((self.view_size[0] + tile_width,
+                              self.view_size[1] + tile_height))
+        self.padded_view_i, self.padded_view_j = \
+            self.__get_map_hexes_indices(x - tile_width, y - tile_height)
+
+        self.window_origin = (int(self.padded_view_i.min()),
+                              int(self.padded_view_j.min()))
+        self.window_shape = (
+            int(self.padded_view_i.max()) - self.window_origin[0] + 1,
+            int(self.padded_view_j.max()) - self.window_origin[1] + 1)
+
+        self.padded_view_window_indices = (
+            (self.padded_view_i - self.window_origin[0]) *
+            self.window_shape[1] +
+            self.padded_view_j - self.window_origin[1]).astype(numpy.int32)
+
+    def __check_view(self):
+        '''Rebuilds visible area lookup if map was zoomed or moved'''
+        view_key = (self.map_.side_length, int(self.map_.pos_shift[0]),
+                    int(self.map_.pos_shift[1]), tuple(self.map_.size))
+
+        if self.view_key != view_key:
+            self.view_key = view_key
+            self.__build_view()
+
+    def __build_view(self):
+        '''
+        Finds visible slice of padded lookup and hexes of window for current
+        map move: moving map by tile's width increases hexes first indices by
+        one, moving it by tile's height decreases them by one and increases
+        second ones by two
+        '''
+
+        self.__check_padded_view()
+
+        tile_width = 2 * self.map_.half_side_length_root3
+        tile_height = 2 * (self.map_.half_side_length + self.map_.side_length)
+
+        tiles_x, shift_x = divmod(int(self.map_.pos_shift[0]), tile_width)
+        tiles_y, shift_y = divmod(int(self.map_.pos_shift[1]), tile_height)
+
+        self.view_slice = (slice(tile_width - shift_x,
+                                 tile_width - shift_x + self.view_size[0]),
+                           slice(tile_height - shift_y,
+                                 tile_height - shift_y + self.view_size[1]))
+        shift_i = tiles_y - tiles_x
+        shift_j = -2 * tiles_y
+
+        self.view_window_origin = (self.window_origin[0] + shift_i,
+                                   self.window_origin[1] + shift_j)
+
+        i = self.padded_view_i[self.view_slice]
+        j = self.padded_view_j[self.view_slice]
+        self.view_border_i = numpy.concatenate((i[0], i[-1], i[:, 0],
+                                                i[:, -1])) + shift_i
+        self.view_border_j = numpy.concatenate((j[0], j[-1], j[:, 0],
+                                                j[:, -1])) + shift_j
+
+    def get_visible_hexes_coords(self):
+        '''Returns coords of all hexes having at least one visible pixel.
+               Hexes of every row are visible from the one with the lowest
+               first index to the one with the highest, and both are cut by
+               view's border, so only border pixels are looked at
+
+        Returns:
+            list(tuple(int, int))
+        '''
+
+        self.__check_view()
+
+        rows = numpy.unique(self.view_border_j)
+        rows = rows[(rows >= 0) & (rows < self.map_.size[1])]
+
+        coords = []
+        for j in rows.tolist():
+            row_i = self.view_border_i[self.view_border_j == j]
+            first_i = max(0, int(row_i.min()))
+            last_i = min(self.map_.size[0] - 1, int(row_i.max()))
+
+            owners = self.map_.board.owner_map[first_i:last_i + 1, j]
+            coords.extend((first_i + i, j)
+                          for i in numpy.flatnonzero(owners >= 0).tolist())
+
+        return coords
+
+    # rendering
+    def render(self, surface):
+        '''Draws board on surface
+
+        Arguments:
+            surface {pygame.Surface} -- surface to render on
+        '''
+
+        self.__check_view()
+
+        if not self.view_surface:
+            self.view_surface = pygame.Surface(self.view_size).convert(
+                surface)
+
+        palette = numpy.array(
+            [self.view_surface.map_rgb((0, 0, 0))] +
+            [self.view_surface.map_rgb(player.color)
+             for player in self.map_.players], dtype=numpy.uint32)
+
+        pygame.surfarray.blit_array(self.view_surface, palette[
+            self.__get_window_owners() + 1].ravel()[
+                self.padded_view_window_indices[self.view_slice]])
+        surface.blit(self.view_surface, (0, 0))
+
+    def __get_window_owners(self):
+        '''Returns owners of window's hexes, -1 outside of map
+
+        Returns:
+            numpy.ndarray
+        '''
+
+        owners = numpy.full(self.window_shape, -1, dtype=numpy.int16)
+
+        first_i = max(0, self.view_window_origin[0])
+        first_j = max(0, self.view_window_origin[1])
+        last_i = min(self.map_.size[0],
+                     self.view_window_origin[0] + self.window_shape[0])
+        last_j = min(self.map_.size[1],
+                     self.view_window_origin[1] + self.window_shape[1])
+
+        if first_i < last_i and first_j < last_j:
+            owners[first_i - self.view_window_origin[0]:
+                   last_i - self.view_window_origin[0],
+                   first_j - self.view_window_origin[1]:
+                   last_j - self.view_window_origin[1]] = \
+                self.map_.board.owner_map[first_i:last_i, first_j:last_j]
+
+        return owners
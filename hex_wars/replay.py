@@ -0,0 +1,255 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import struct
+
+import game
+
+
+MAGIC = b'HEXR'
+VERSION = 1
+
+# magic, version, gameplay's seed
+HEADER_FORMAT = '<4sHxxQ'
+# record type
+RECORD_TYPE_FORMAT = '<B'
+
+RECORD_NEW_MAP = 0
+RECORD_RULES = 1
+RECORD_ATTACK = 2
+RECORD_END_TURN = 3
+
+RECORD_FORMATS = {
+    # board's seed, map size x and y, hex number, dice per hex, players number
+    RECORD_NEW_MAP: '<QIIIHH',
+    # die sides number, max dice on single hex
+    RECORD_RULES: '<HH',
+    # attacking hex coords, defending hex coords
+    RECORD_ATTACK: '<IIII',
+    RECORD_END_TURN: '<',
+}
+
+# color r, g, b, written for every player after new map record
+PLAYER_FORMAT = '<BBB'
+
+
+class ReplayError(Exception):
+    '''Raised when file isn't a replay file or has unsupported version'''
+    pass
+
+
+class ReplayLog:
+    '''
+    ReplayLog object. Append-only binary log of everything that isn't drawn
+    from gameplay's seeded generator: new maps, rules, human's attacks and
+    ends of turns. Every record is flushed right away, so log of crashed
+    game can still be replayed
+    '''
+
+    def __init__(self, path, seed):
+        self.file_ = open(path, 'wb')
+        self.file_.write(struct.pack(HEADER_FORMAT, MAGIC, VERSION, seed))
+        self.file_.flush()
+
+    def log_new_map(self, map_):
+        '''Logs new map. Board which wasn't generated from seed, e.g. loaded
+               from save file, can't be replayed, so logging stops there
+
+        Arguments:
+            map_ {map.Map}
+        '''
+
+        if map_.board.seed is None:
+            self.close()
+            return
+
+        self.__write(RECORD_NEW_MAP, map_.board.seed, map_.size[0],
+                     map_.size[1], map_.hex_number, map_.dice_per_hex,
+                     len(map_.players))
+
+        if self.file_:
+            for player in map_.players:
+                self.file_.write(struct.pack(PLAYER_FORMAT, *player.color))
+            self.file_.flush()
+
+    def log_rules(self, gameplay):
+        '''Logs rules
+
+        Arguments:
+            gameplay {game.Gameplay}
+        '''
+
+        self.__write(RECORD_RULES, gameplay.die_sides_number,
+                     gameplay.max_dice_on_single_hex)
+
+    def log_attack(self, attacking_coords, defending_coords):
+        '''Logs human's attack
+
+        Arguments:
+            attacking_coords {tuple(int, int)}
+            defending_coords {tuple(int, int)}
+        '''
+
+        self.__write(RECORD_ATTACK, *attacking_coords, *defending_coords)
+
+    def log_end_turn(self):
+        '''Logs end of human's turn'''
+        self.__write(RECORD_END_TURN)
+
+    def close(self):
+        '''Closes log, next records are ignored'''
+        if self.file_:
+            self.file_.close()
+            self.file_ = None
+
+    def __write(self, record_type, *values):
+        '''Writes record
+
+        Arguments:
+            record_type {int}
+            values -- record's fields in its format order
+        '''
+
+        if not self.file_:
+            return
+
+        self.file_.write(struct.pack(RECORD_TYPE_FORMAT, record_type))
+        self.file_.write(struct.pack(RECORD_FORMATS[record_type], *values))
+        self.file_.flush()
+
+
+class Replay:
+    '''
+    Replay object. Reads replay log and plays it again, either headlessly at
+    maximum speed or one record per frame, with animations, while event
+    handler ticks
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+        with open(self.path, 'rb') as file_:
+            data = file_.read(struct.calcsize(HEADER_FORMAT))
+
+        if len(data) < struct.calcsize(HEADER_FORMAT) or data[:4] != MAGIC:
+            raise ReplayError('{} isn\'t a replay file'.format(self.path))
+
+        magic, version, self.seed = struct.unpack(HEADER_FORMAT, data)
+        if version != VERSION:
+            raise ReplayError('unsupported replay file version {}'.format(
+                version))
+
+        self.records_iterator = self.records()
+        self.finished = False
+
+    def records(self):
+        '''Yields records in log order as tuples of record type and fields,
+               new map record's last field is list of players colors
+        '''
+
+        with open(self.path, 'rb') as file_:
+            file_.seek(struct.calcsize(HEADER_FORMAT))
+
+            while True:
+                data = file_.read(struct.calcsize(RECORD_TYPE_FORMAT))
+                if not data:
+                    return
+
+                record_type = struct.unpack(RECORD_TYPE_FORMAT, data)[0]
+                if record_type not in RECORD_FORMATS:
+                    raise ReplayError('unknown record type {}'.format(
+                        record_type))
+
+                record_format = RECORD_FORMATS[record_type]
+                data = file_.read(struct.calcsize(record_format))
+                if len(data) < struct.calcsize(record_format):
+                    return
+
+                record = (record_type,) + struct.unpack(record_format, data)
+
+                if record_type == RECORD_NEW_MAP:
+                    colors = [struct.unpack(PLAYER_FORMAT, file_.read(
+                        struct.calcsize(PLAYER_FORMAT)))
+                        for player in range(record[-1])]
+                    record += (colors,)
+
+                yield record
+
+    # playing
+    def run_headless(self, map_, gameplay):
+        '''Plays whole replay at maximum speed, without graphics
+
+        Arguments:
+            map_ {map.Map}
+            gameplay {game.Gameplay}
+        '''
+
+        gameplay.set_fight_time(0)
+
+        for record in self.records():
+            self.__apply_record(record, map_, gameplay, True)
+
+    def step(self, map_, gameplay):
+        '''Applies next record if human would be able to act now
+
+        Arguments:
+            map_ {map.Map}
+            gameplay {game.Gameplay}
+        '''
+
+        if self.finished or gameplay.current_player_index != 0 or \
+           gameplay.fight_finished:
+            return
+
+        record = next(self.records_iterator, None)
+        if record:
+            self.__apply_record(record, map_, gameplay, False)
+        else:
+            self.finished = True
+
+    def __apply_record(self, record, map_, gameplay, headless):
+        '''Applies single record to game
+
+        Arguments:
+            record {tuple} -- see records
+            map_ {map.Map}
+            gameplay {game.Gameplay}
+            headless {bool} -- if True, fights and enemies turns are
+                finished right away
+        '''
+
+        if record[0] == RECORD_NEW_MAP:
+            seed, size_x, size_y, hex_number, dice_per_hex = record[1:6]
+
+            map_.size = [size_x, size_y]
+            map_.hex_number = hex_number
+            map_.dice_per_hex = dice_per_hex
+            map_.players = [game.Player(color) for color in record[-1]]
+            map_.create_map(map_.generate_board(seed))
+        elif record[0] == RECORD_RULES:
+            gameplay.set_rules(*record[1:])
+        elif record[0] == RECORD_ATTACK:
+            gameplay.attacking_hex = map_.hex_map[record[1], record[2]]
+            gameplay.defending_hex = map_.hex_map[record[3], record[4]]
+            gameplay.fight()
+
+            if headless:
+                gameplay.fight_finish()
+        elif record[0] == RECORD_END_TURN:
+            if headless:
+                gameplay.play_turn_now()
+            else:
+                gameplay.turn()
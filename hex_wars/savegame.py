@@ -0,0 +1,246 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import math
+import os
+import struct
+import numpy
+
+import board
+import game
+
+
+MAGIC = b'HEXW'
+VERSION = 1
+
+# magic, version, players number, map size x and y, hex number, dice per hex,
+# die sides number, max dice on single hex, current player index,
+# owner map offset, dice map offset
+HEADER_FORMAT = '<4sHHIIIIIIHxxQQ'
+# color r, g, b, additional dice
+PLAYER_FORMAT = '<BBBxi'
+# random's state version, internal state, next gaussian (nan if there is none)
+RNG_FORMAT = '<i625Id'
+
+ARRAY_DTYPE = numpy.dtype('<i2')
+ARRAY_ALIGNMENT = 64
+
+
+class SaveFileError(Exception):
+    '''Raised when file isn't a save file or has unsupported version'''
+    pass
+
+
+class SaveFile:
+    '''
+    SaveFile object. Binary, versioned save of the game: header, players,
+    random's state and then owner and dice maps as raw arrays aligned to 64
+    bytes, so board can be memory mapped instead of parsed
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+    # saving
+    def save(self, map_, gameplay):
+        '''Saves game state. It's written to temporary file which then
+               replaces save file, so board mapped from that file isn't
+               truncated under the game and crashed save doesn't destroy
+               the previous one
+
+        Arguments:
+            map_ {map.Map}
+            gameplay {game.Gameplay}
+        '''
+
+        players_size = len(map_.players) * struct.calcsize(PLAYER_FORMAT)
+        owner_map_offset = self.__align(
+            struct.calcsize(HEADER_FORMAT) + players_size +
+            struct.calcsize(RNG_FORMAT))
+        dice_map_offset = self.__align(
+            owner_map_offset + map_.board.owner_map.size *
+            ARRAY_DTYPE.itemsize)
+
+        temporary_path = '{}.{}'.format(self.path, os.getpid())
+        with open(temporary_path, 'wb') as file_:
+            file_.write(struct.pack(
+                HEADER_FORMAT, MAGIC, VERSION, len(map_.players),
+                map_.board.size[0], map_.board.size[1], map_.hex_number,
+                map_.dice_per_hex, gameplay.die_sides_number,
+                gameplay.max_dice_on_single_hex,
+                gameplay.current_player_index, owner_map_offset,
+                dice_map_offset))
+
+            for player in map_.players:
+                file_.write(struct.pack(
+                    PLAYER_FORMAT, *player.color, player.additional_dice))
+
+            rng_version, rng_internal_state, rng_gauss_next = \
+                gameplay.rng.getstate()
+            if rng_gauss_next is None:
+                rng_gauss_next = math.nan
+            file_.write(struct.pack(RNG_FORMAT, rng_version,
+                                    *rng_internal_state, rng_gauss_next))
+
+            file_.seek(owner_map_offset)
+            file_.write(map_.board.owner_map.astype(ARRAY_DTYPE).tobytes())
+            file_.seek(dice_map_offset)
+            file_.write(map_.board.dice_map.astype(ARRAY_DTYPE).tobytes())
+
+        self.__detach_board(map_.board)
+        os.replace(temporary_path, self.path)
+
+    def __detach_board(self, board_):
+        '''Reads to memory board's maps mapped from save file, as file which
+               is mapped can't be replaced on every system
+
+        Arguments:
+            board_ {board.Board}
+        '''
+
+        for name in ('owner_map', 'dice_map'):
+            array = getattr(board_, name)
+            if isinstance(array, numpy.memmap) and \
+               array.filename == os.path.abspath(self.path):
+                setattr(board_, name, numpy.array(array))
+
+    def __align(self, offset):
+        '''Returns offset rounded up to array alignment
+
+        Arguments:
+            offset {int}
+
+        Returns:
+            int
+        '''
+
+        return -(-offset // ARRAY_ALIGNMENT) * ARRAY_ALIGNMENT
+
+    # loading
+    def read_header(self):
+        '''Reads and checks header
+
+        Raises:
+            SaveFileError -- if file isn't save file of supported version
+
+        Returns:
+            tuple -- header fields in HEADER_FORMAT order
+        '''
+
+        with open(self.path, 'rb') as file_:
+            data = file_.read(struct.calcsize(HEADER_FORMAT))
+
+        if len(data) < struct.calcsize(HEADER_FORMAT) or data[:4] != MAGIC:
+            raise SaveFileError('{} isn\'t a save file'.format(self.path))
+
+        header = struct.unpack(HEADER_FORMAT, data)
+        if header[1] != VERSION:
+            raise SaveFileError('unsupported save file version {}'.format(
+                header[1]))
+
+        return header
+
+    def load_board(self):
+        '''Returns board mapped from file. Only touched parts of maps are
+               read, changes aren't written back to file
+
+        Returns:
+            board.Board
+        '''
+
+        header = self.read_header()
+        size = (header[3], header[4])
+
+        return board.Board(
+            size,
+            numpy.memmap(self.path, ARRAY_DTYPE, 'c', header[10], size),
+            numpy.memmap(self.path, ARRAY_DTYPE, 'c', header[11], size))
+
+    def read_players(self):
+        '''Reads players without loading game, e.g. for their colors
+
+        Returns:
+            list(game.Player)
+        '''
+
+        return self.__read_players_and_rng(self.read_header()[2])[0]
+
+    def __read_players_and_rng(self, players_number):
+        '''Reads players and random's state following header
+
+        Arguments:
+            players_number {int}
+
+        Returns:
+            tuple(list(game.Player), tuple) -- players and random's state in
+                RNG_FORMAT order
+        '''
+
+        with open(self.path, 'rb') as file_:
+            file_.seek(struct.calcsize(HEADER_FORMAT))
+
+            players = []
+            for player_index in range(players_number):
+                player_data = struct.unpack(PLAYER_FORMAT, file_.read(
+                    struct.calcsize(PLAYER_FORMAT)))
+                player = game.Player(player_data[:3])
+                player.additional_dice = player_data[3]
+                players.append(player)
+
+            rng_state = struct.unpack(RNG_FORMAT, file_.read(
+                struct.calcsize(RNG_FORMAT)))
+
+        return players, rng_state
+
+    def load(self, map_, gameplay):
+        '''Restores game state saved in file
+
+        Arguments:
+            map_ {map.Map}
+            gameplay {game.Gameplay}
+        '''
+
+        header = self.read_header()
+        players, rng_state = self.__read_players_and_rng(header[2])
+
+        map_.size = [header[3], header[4]]
+        map_.hex_number = header[5]
+        map_.dice_per_hex = header[6]
+        map_.players = players
+
+        # board stays copy-on-write mapping of file, only pages game touches
+        # are read, and hexes objects are created when they're needed
+        map_.create_map(self.load_board())
+
+        gameplay.die_sides_number = header[7]
+        gameplay.max_dice_on_single_hex = header[8]
+        gameplay.attacking_hex = None
+        gameplay.defending_hex = None
+        gameplay.attacking_hex_power = 0
+        gameplay.defending_hex_power = 0
+        gameplay.fight_finished = False
+        gameplay.current_player_index = header[9]
+
+        # new map's history starts from human's turn, save may be from later
+        if gameplay.history:
+            gameplay.history.record_new_map(map_,
+                                            gameplay.current_player_index)
+
+        gameplay.rng.setstate((
+            rng_state[0], rng_state[1:-1],
+            None if math.isnan(rng_state[-1]) else rng_state[-1]))
+
+        gameplay.resume_turn()
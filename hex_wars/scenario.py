@@ -0,0 +1,363 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import atexit
+import json
+import time
+import numpy
+import pygame
+
+import events
+import game
+import graphics
+import map
+import mapgen
+
+
+STAGES = ('handle_events', 'handle_ai', 'render', 'fight')
+
+# step name and its argument, mostly number of repetitions
+DEFAULT_SCRIPT = (
+    ('pan', 4),
+    ('zoom', 10),
+    ('attack', 10),
+    ('end_turn', 1),
+    ('pan', 4),
+    ('attack', 10),
+    ('end_turn', 1),
+    ('new_map', 1),
+    ('zoom', 20),
+    ('pan', 4),
+    ('attack', 10),
+    ('end_turn', 1),
+)
+
+
+class FrameTimer:
+    '''
+    FrameTimer object. Collects duration of every stage of every frame, it's
+    told about finished stages by event handler
+    '''
+
+    def __init__(self):
+        self.frames = []
+        self.current_frame = None
+        self.stage_start_time = None
+
+    def start_frame(self):
+        '''Starts timing new frame'''
+        self.current_frame = dict.fromkeys(STAGES, 0.0)
+        self.stage_start_time = time.perf_counter()
+
+    def mark_stage(self, stage):
+        '''Adds time passed since previous stage to given stage
+
+        Arguments:
+            stage {str}
+        '''
+
+        now = time.perf_counter()
+        self.current_frame[stage] += now - self.stage_start_time
+        self.stage_start_time = now
+
+    def finish_frame(self):
+        '''Finishes timing current frame'''
+        self.frames.append(self.current_frame)
+
+    def get_report(self, frame_budget):
+        '''Returns percentiles of frame and stages durations in milliseconds
+               and number of frames longer than budget
+
+        Arguments:
+            frame_budget {float} -- milliseconds
+
+        Returns:
+            dict
+        '''
+
+        durations = {stage: numpy.array([frame[stage] for frame in
+                                         self.frames]) * 1000
+                     for stage in STAGES}
+        durations['frame'] = sum(durations[stage] for stage in STAGES)
+
+        report = {
+            'frames': len(self.frames),
+            'frame_budget': frame_budget,
+            'dropped_frames': int((durations['frame'] > frame_budget).sum()),
+        }
+
+        for name, stage_durations in durations.items():
+            p50, p95, p99 = numpy.percentile(stage_durations, (50, 95, 99))
+            report[name] = {'p50': p50, 'p95': p95, 'p99': p99,
+                            'max': stage_durations.max()}
+
+        return report
+
+
+class ScenarioRunner:
+    '''
+    ScenarioRunner object. Drives event handler's loop with scripted input
+    posted to pygame's event queue, as if user played, and times every frame
+    '''
+
+    def __init__(self, map_, graphics_, gameplay, event_handler):
+        self.map_ = map_
+        self.graphics = graphics_
+        self.gameplay = gameplay
+        self.event_handler = event_handler
+
+        self.frame_timer = FrameTimer()
+        self.event_handler.frame_timer = self.frame_timer
+
+        self.view_middle = (self.graphics.right_bar_rect[0] // 2,
+                            self.graphics.window_size[1] // 2)
+
+    def run(self, script):
+        '''Plays script, frame by frame
+
+        Arguments:
+            script {tuple(tuple(str, int))} -- steps and their arguments
+        '''
+
+        steps = {
+            'pan': self.__pan,
+            'zoom': self.__zoom,
+            'attack': self.__attack,
+            'end_turn': self.__end_turn,
+            'new_map': self.__new_map,
+        }
+
+        for step, argument in script:
+            for frame_events in steps[step](argument):
+                for event in frame_events:
+                    pygame.event.post(event)
+
+                self.frame_timer.start_frame()
+                self.event_handler.handle_events()
+                self.event_handler.tick()
+                self.frame_timer.finish_frame()
+
+    # steps, every one yields list of events for every frame
+    def __pan(self, drags_number):
+        '''Drags map with right mouse button, every drag in other direction
+
+        Arguments:
+            drags_number {int}
+        '''
+
+        directions = ((-1, -1), (1, -1), (-1, 1), (1, 1))
+
+        for drag in range(drags_number):
+            direction = directions[drag % len(directions)]
+            pos = self.view_middle
+
+            yield [pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos,
+                                      button=3)]
+
+            for frame in range(30):
+                pos = (pos[0] + 8 * direction[0], pos[1] + 6 * direction[1])
+                yield [pygame.event.Event(pygame.MOUSEMOTION, pos=pos,
+                                          rel=(0, 0), buttons=(0, 0, 1))]
+
+            yield [pygame.event.Event(pygame.MOUSEBUTTONUP, pos=pos,
+                                      button=3)]
+
+    def __zoom(self, steps_number):
+        '''Zooms out and then back in with mouse wheel
+
+        Arguments:
+            steps_number {int}
+        '''
+
+        for button in (5, 4):
+            for step in range(steps_number):
+                yield [pygame.event.Event(pygame.MOUSEBUTTONDOWN,
+                                          pos=self.view_middle,
+                                          button=button)]
+
+    def __attack(self, attacks_number):
+        '''Clicks visible human's hex and its enemy neighbour, then waits
+               until fight is finished
+
+        Arguments:
+            attacks_number {int}
+        '''
+
+        for attack in range(attacks_number):
+            yield from self.__wait(lambda: self.gameplay.fight_finished or
+                                   self.gameplay.current_player_index)
+
+            hexes = self.__find_visible_attack()
+            if not hexes:
+                return
+
+            for hex_ in hexes:
+                yield [pygame.event.Event(pygame.MOUSEBUTTONDOWN,
+                                          pos=hex_.middle, button=1)]
+
+    def __end_turn(self, turns_number):
+        '''Presses space and waits until enemies finish their turns
+
+        Arguments:
+            turns_number {int}
+        '''
+
+        for turn in range(turns_number):
+            yield from self.__wait(lambda: self.gameplay.fight_finished or
+                                   self.gameplay.current_player_index)
+
+            yield [pygame.event.Event(pygame.KEYDOWN, key=pygame.K_SPACE,
+                                      mod=0, unicode=' ', scancode=0)]
+
+            yield from self.__wait(
+                lambda: self.gameplay.current_player_index)
+
+    def __new_map(self, maps_number):
+        '''Clicks new map button
+
+        Arguments:
+            maps_number {int}
+        '''
+
+        rect = self.graphics.button_new_map.rect
+
+        for new_map in range(maps_number):
+            yield [pygame.event.Event(
+                pygame.MOUSEBUTTONDOWN, button=1,
+                pos=(rect[0] + rect[2] // 2, rect[1] + rect[3] // 2))]
+
+    def __wait(self, condition):
+        '''Yields frames without events while condition is true
+
+        Arguments:
+            condition {function}
+        '''
+
+        while condition():
+            yield []
+
+    def __find_visible_attack(self):
+        '''Returns visible human's hex able to attack and its visible enemy
+               neighbour, or None if there isn't any
+
+        Returns:
+            tuple(map.Hex, map.Hex) or None
+        '''
+
+        board_ = self.map_.board
+
+        for coords in numpy.argwhere((board_.owner_map == 0) &
+                                     (board_.dice_map > 1)).tolist():
+            attacking_hex = self.map_.hex_map[tuple(coords)]
+            if not self.__is_hex_visible(attacking_hex):
+                continue
+
+            for defending_coords in board_.get_enemy_neighbours_coords(
+                    tuple(coords), 0):
+                defending_hex = self.map_.hex_map[defending_coords]
+                if self.__is_hex_visible(defending_hex):
+                    return attacking_hex, defending_hex
+
+        return None
+
+    def __is_hex_visible(self, hex_):
+        '''Returns True if hex's middle is on the board's part of the window
+
+        Arguments:
+            hex_ {map.Hex}
+
+        Returns:
+            bool
+        '''
+
+        return 0 <= hex_.middle[0] < self.graphics.right_bar_rect[0] and \
+            0 <= hex_.middle[1] < self.graphics.window_size[1]
+
+
+def print_report(report):
+    '''Prints frame times report
+
+    Arguments:
+        report {dict} -- see FrameTimer.get_report
+    '''
+
+    print('{} frames, {} dropped (budget {:.2f} ms)'.format(
+        report['frames'], report['dropped_frames'], report['frame_budget']))
+
+    for name in ('frame',) + STAGES:
+        print('{:<16}p50 {:>9.3f}  p95 {:>9.3f}  p99 {:>9.3f}  '
+              'max {:>9.3f} ms'.format(name, report[name]['p50'],
+                                       report[name]['p95'],
+                                       report[name]['p99'],
+                                       report[name]['max']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Plays scripted game and reports frame times')
+    parser.add_argument('--map-size', type=int, nargs=2, default=[30, 30])
+    parser.add_argument('--hex-percentage', type=int, default=60)
+    parser.add_argument('--players', type=int, default=6)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fight-time', type=int, default=20,
+                        help='milliseconds')
+    parser.add_argument('--budget', type=float, default=1000 / 60,
+                        help='frame budget in milliseconds')
+    parser.add_argument('--script', metavar='PATH',
+                        help='JSON list of [step, argument] pairs')
+    parser.add_argument('--output', metavar='PATH',
+                        help='saves report as JSON')
+    args = parser.parse_args()
+
+    script = DEFAULT_SCRIPT
+    if args.script:
+        with open(args.script) as file_:
+            script = json.load(file_)
+
+    graphics.init_pygame()
+    resolution = pygame.display.Info()
+    window_size = (resolution.current_w, resolution.current_h)
+
+    map_generator = mapgen.MapGenerator(seed=args.seed)
+    atexit.register(map_generator.close)
+
+    map_ = map.Map((5, 5), 10, [game.Player((255, 0, 0))], 4, 32,
+                   window_size, map_generator, args.seed)
+    map_.create_map()
+    gameplay = game.Gameplay(map_, 6, args.fight_time, 8, args.seed)
+    graphics_ = graphics.Graphics(map_, gameplay, window_size)
+    event_handler = events.EventHandler(map_, graphics_, gameplay)
+
+    graphics_.new_game_options.map_size = list(args.map_size)
+    graphics_.new_game_options.hex_number = args.hex_percentage
+    graphics_.new_game_options.players_number = args.players
+    graphics_.set_options_for_new_map()
+    map_.create_map()
+    gameplay.set_fight_time(args.fight_time)
+
+    runner = ScenarioRunner(map_, graphics_, gameplay, event_handler)
+    runner.run(script)
+
+    report = runner.frame_timer.get_report(args.budget)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w') as file_:
+            json.dump(report, file_, indent=4)
@@ -0,0 +1,466 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import argparse
+import asyncio
+import random
+import struct
+import numpy
+
+import ai
+import map
+import protocol
+
+
+DICE_PER_HEX = 4
+DIE_SIDES_NUMBER = 6
+MAX_DICE_ON_SINGLE_HEX = 8
+# seconds between broadcasts of batched deltas
+TICK_TIME = 0.05
+
+
+class ServerGame:
+    '''
+    ServerGame object. Authoritative state of one networked game. Seats
+    from 0 are played by connected clients, the rest and seats of clients
+    which left by ai. Changes are collected until next tick and then sent
+    as one delta with changed hexes only, the same to players and
+    spectators
+    '''
+
+    def __init__(self, game_id, size, hex_number, players_number,
+                 human_seats_number, seed):
+        self.game_id = game_id
+        self.size = tuple(size)
+        self.players_number = players_number
+
+        self.map_ = map.Map(self.size, hex_number, [None] * players_number,
+                            DICE_PER_HEX, 0, (0, 0))
+        self.board = self.map_.generate_board(seed)
+
+        self.rng = random.Random(seed)
+        self.ai_worker = ai.AIWorker()
+        self.additional_dice_list = [0] * players_number
+
+        # seat -> stream writer, free human seats wait for clients
+        self.free_seats = list(range(human_seats_number))
+        self.writers = {}
+        self.spectators = set()
+
+        self.turn = 0
+        self.current_player_index = 0
+        self.winner = None
+
+        # state clients already know
+        self.sent_owner_map = self.board.owner_map.copy()
+        self.sent_dice_map = self.board.dice_map.copy()
+        self.sent_turn = self.turn
+
+    # seats
+    def join(self, writer):
+        '''Gives free human seat to client
+
+        Arguments:
+            writer {asyncio.StreamWriter}
+
+        Returns:
+            int or None -- seat, None if game is full
+        '''
+
+        if not self.free_seats:
+            return None
+
+        seat = self.free_seats.pop(0)
+        self.writers[seat] = writer
+        self.__send_board(writer, seat)
+
+        return seat
+
+    def leave(self, seat):
+        '''Gives client's seat to ai
+
+        Arguments:
+            seat {int}
+        '''
+
+        self.writers.pop(seat, None)
+
+    def spectate(self, writer):
+        '''Adds spectator, it gets whole board once and then same deltas as
+               players
+
+        Arguments:
+            writer {asyncio.StreamWriter}
+        '''
+
+        self.spectators.add(writer)
+        self.__send_board(writer, protocol.SPECTATOR_SEAT)
+
+    def __send_board(self, writer, seat):
+        '''Sends welcome and keyframe with current board
+
+        Arguments:
+            writer {asyncio.StreamWriter}
+            seat {int}
+        '''
+
+        writer.write(protocol.encode(protocol.WELCOME,
+                                     protocol.WELCOME_BODY.pack(
+                                         seat, self.players_number,
+                                         *self.size)))
+        writer.write(protocol.encode_keyframe(
+            self.turn, self.current_player_index, self.board))
+
+    def is_started(self):
+        '''Returns True if all human seats are taken
+
+        Returns:
+            bool
+        '''
+
+        return not self.free_seats
+
+    # intents
+    def attack(self, seat, attacking_coords, defending_coords):
+        '''Plays client's attack
+
+        Arguments:
+            seat {int}
+            attacking_coords {tuple(int, int)}
+            defending_coords {tuple(int, int)}
+
+        Returns:
+            int or None -- error code, None if attack was played
+        '''
+
+        if not self.__is_turn_of(seat):
+            return protocol.NOT_YOUR_TURN
+
+        if not self.board.is_point_on_board(attacking_coords) or \
+           self.board.owner_map[attacking_coords] != seat or \
+           self.board.dice_map[attacking_coords] < 2 or \
+           defending_coords not in self.board.get_enemy_neighbours_coords(
+               attacking_coords, seat):
+            return protocol.ILLEGAL_ATTACK
+
+        self.board.resolve_fight(
+            attacking_coords, defending_coords,
+            self.board.roll_dice(attacking_coords, DIE_SIDES_NUMBER,
+                                 self.rng),
+            self.board.roll_dice(defending_coords, DIE_SIDES_NUMBER,
+                                 self.rng))
+        self.__check_winner()
+
+        return None
+
+    def end_turn(self, seat):
+        '''Adds dice to client's hexes and passes turn
+
+        Arguments:
+            seat {int}
+
+        Returns:
+            int or None -- error code, None if turn was ended
+        '''
+
+        if not self.__is_turn_of(seat):
+            return protocol.NOT_YOUR_TURN
+
+        self.additional_dice_list[seat] = self.board.add_dice(
+            seat, self.additional_dice_list[seat], MAX_DICE_ON_SINGLE_HEX,
+            self.rng)[1]
+        self.__pass_turn()
+
+        return None
+
+    def __is_turn_of(self, seat):
+        '''Returns True if seat may play now
+
+        Arguments:
+            seat {int}
+
+        Returns:
+            bool
+        '''
+
+        return self.winner is None and self.is_started() and \
+            self.current_player_index == seat
+
+    # turns
+    def play_ai_turns(self):
+        '''Plays turns of ai seats until it's client's turn'''
+        while self.winner is None and self.is_started() and \
+                self.current_player_index not in self.writers:
+            for event in self.ai_worker.play_player_turn(
+                    self.board, self.current_player_index,
+                    self.additional_dice_list, DIE_SIDES_NUMBER,
+                    MAX_DICE_ON_SINGLE_HEX, self.rng):
+                pass
+
+            self.__check_winner()
+            self.__pass_turn()
+
+    def __pass_turn(self):
+        '''Moves turn to next player who still has hexes'''
+        if self.winner is not None:
+            return
+
+        self.turn += 1
+        self.current_player_index = (self.current_player_index + 1) % \
+            self.players_number
+
+        while not (self.board.owner_map == self.current_player_index).any():
+            self.current_player_index = (self.current_player_index + 1) % \
+                self.players_number
+
+    def __check_winner(self):
+        '''Finishes game if one player owns all hexes'''
+        owners = numpy.unique(self.board.owner_map[self.board.owner_map >= 0])
+        if len(owners) == 1:
+            self.winner = int(owners[0])
+
+    # sync
+    def get_update(self):
+        '''Returns messages with changes since last update, they are the same
+               for all clients
+
+        Returns:
+            bytes -- empty if nothing changed
+        '''
+
+        changed = numpy.flatnonzero(
+            (self.board.owner_map != self.sent_owner_map) |
+            (self.board.dice_map != self.sent_dice_map))
+
+        if not changed.size and self.turn == self.sent_turn:
+            return b''
+
+        cells = numpy.empty(changed.size, protocol.CELL)
+        cells['index'] = changed
+        cells['owner'] = self.board.owner_map.ravel()[changed]
+        cells['dice'] = self.board.dice_map.ravel()[changed]
+
+        self.sent_owner_map[:] = self.board.owner_map
+        self.sent_dice_map[:] = self.board.dice_map
+        self.sent_turn = self.turn
+
+        update = protocol.encode_delta(self.turn, self.current_player_index,
+                                       cells)
+        if self.winner is not None:
+            update += protocol.encode(protocol.GAME_OVER,
+                                      protocol.GAME_OVER_BODY.pack(
+                                          self.winner))
+
+        return update
+
+
+class GameServer:
+    '''
+    GameServer object. Hosts many games in one asyncio loop. Clients send
+    intents, which are applied right away, and every tick ai seats play and
+    changes of every game are broadcast to its clients as one message
+    '''
+
+    def __init__(self, size=(10, 10), hex_number=60, players_number=2,
+                 human_seats_number=1, seed=None, tick_time=TICK_TIME):
+        if size[0] * size[1] > protocol.MAX_HEXES:
+            raise ValueError('board has more than {} hexes'.format(
+                protocol.MAX_HEXES))
+
+        self.size = tuple(size)
+        self.hex_number = hex_number
+        self.players_number = players_number
+        self.human_seats_number = human_seats_number
+        self.tick_time = tick_time
+
+        self.rng = random.Random(seed)
+        self.games = {}
+
+        self.server = None
+        self.ticker = None
+
+    async def start(self, host='127.0.0.1', port=0):
+        '''Starts listening and ticking
+
+        Arguments:
+            host {str}
+            port {int} -- 0 picks free port
+
+        Returns:
+            int -- port server listens on
+        '''
+
+        self.server = await asyncio.start_server(self.__handle_client, host,
+                                                 port)
+        self.ticker = asyncio.ensure_future(self.__tick_loop())
+
+        return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        '''Stops server'''
+        self.ticker.cancel()
+        self.server.close()
+        await self.server.wait_closed()
+
+    def get_game(self, game_id):
+        '''Returns game with given id, it's created on first join
+
+        Arguments:
+            game_id {int}
+
+        Returns:
+            ServerGame
+        '''
+
+        if game_id not in self.games:
+            self.games[game_id] = ServerGame(
+                game_id, self.size, self.hex_number, self.players_number,
+                self.human_seats_number, self.rng.getrandbits(63))
+
+        return self.games[game_id]
+
+    def tick(self):
+        '''Plays ai turns and broadcasts updates of all games'''
+        for game_id, game in list(self.games.items()):
+            game.play_ai_turns()
+
+            update = game.get_update()
+            if update:
+                for writer in list(game.writers.values()) + \
+                        list(game.spectators):
+                    writer.write(update)
+
+            if game.winner is not None or \
+               game.is_started() and not game.writers:
+                for writer in game.spectators:
+                    writer.close()
+                del self.games[game_id]
+
+    async def __tick_loop(self):
+        while True:
+            await asyncio.sleep(self.tick_time)
+            self.tick()
+
+    async def __handle_client(self, reader, writer):
+        '''Connection's loop, first message has to be JOIN
+
+        Arguments:
+            reader {asyncio.StreamReader}
+            writer {asyncio.StreamWriter}
+        '''
+
+        game = None
+        seat = None
+
+        try:
+            message_type, body = await protocol.read_message(
+                reader, protocol.MAX_CLIENT_MESSAGE_LENGTH)
+            if message_type == protocol.SPECTATE:
+                # spectators only watch games players created
+                game_id = protocol.JOIN_BODY.unpack(body)[0]
+                if game_id in self.games:
+                    await self.__handle_spectator(reader, writer,
+                                                  self.games[game_id])
+                else:
+                    writer.write(self.__encode_error(protocol.UNKNOWN_GAME))
+                return
+
+            if message_type == protocol.JOIN:
+                game = self.get_game(protocol.JOIN_BODY.unpack(body)[0])
+                seat = game.join(writer)
+
+            if seat is None:
+                writer.write(self.__encode_error(
+                    protocol.GAME_FULL if game else
+                    protocol.UNKNOWN_MESSAGE))
+                return
+
+            while True:
+                message_type, body = await protocol.read_message(
+                    reader, protocol.MAX_CLIENT_MESSAGE_LENGTH)
+
+                if message_type == protocol.ATTACK:
+                    coords = protocol.ATTACK_BODY.unpack(body)
+                    error = game.attack(seat, coords[:2], coords[2:])
+                elif message_type == protocol.END_TURN:
+                    error = game.end_turn(seat)
+                else:
+                    error = protocol.UNKNOWN_MESSAGE
+
+                if error:
+                    writer.write(self.__encode_error(error))
+        except (asyncio.IncompleteReadError, ConnectionError,
+                struct.error, protocol.ProtocolError):
+            pass
+        finally:
+            if seat is not None:
+                game.leave(seat)
+            writer.close()
+
+    async def __handle_spectator(self, reader, writer, game):
+        '''Spectator's loop, it can't send anything but closing
+
+        Arguments:
+            reader {asyncio.StreamReader}
+            writer {asyncio.StreamWriter}
+            game {ServerGame}
+        '''
+
+        game.spectate(writer)
+
+        try:
+            while True:
+                await protocol.read_message(
+                    reader, protocol.MAX_CLIENT_MESSAGE_LENGTH)
+                writer.write(self.__encode_error(protocol.UNKNOWN_MESSAGE))
+        finally:
+            game.spectators.discard(writer)
+
+    def __encode_error(self, error):
+        '''Returns error message
+
+        Arguments:
+            error {int} -- error code
+
+        Returns:
+            bytes
+        '''
+
+        return protocol.encode(protocol.ERROR, protocol.ERROR_BODY.pack(error))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Hosts networked games')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5000)
+    parser.add_argument('--map-size', type=int, nargs=2, default=[10, 10])
+    parser.add_argument('--hex-number', type=int, default=60)
+    parser.add_argument('--players', type=int, default=2)
+    parser.add_argument('--human-seats', type=int, default=1,
+                        help='seats taken by clients, game starts when all '
+                             'of them are taken')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    async def serve():
+        game_server = GameServer(args.map_size, args.hex_number,
+                                 args.players, args.human_seats, args.seed)
+        port = await game_server.start(args.host, args.port)
+        print('listening on {}:{}'.format(args.host, port))
+
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
@@ -0,0 +1,301 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import contextlib
+import multiprocessing.shared_memory
+import os
+import time
+import weakref
+import numpy
+
+import board
+
+
+MAGIC = 0x48455842  # 'HEXB'
+# header's int64 fields, arrays follow header in the same block
+HEADER_FIELDS = ('magic', 'version', 'turn', 'rows', 'columns',
+                 'players_number', 'boards_number')
+HEADER_SIZE = len(HEADER_FIELDS) * 8
+VERSION_FIELD = HEADER_FIELDS.index('version')
+TURN_FIELD = HEADER_FIELDS.index('turn')
+
+# shared boards written by this process, made read-only in forked children
+WRITABLE_SHARED_BOARDS = weakref.WeakSet()
+
+
+class SharedBoardError(Exception):
+    '''Raised when shared memory block doesn't hold shared board'''
+
+
+class SharedBoard:
+    '''
+    SharedBoard object. Board's owner and dice maps kept in shared memory
+    block with small header, so other processes can attach to it by name
+    without copying. Block may hold batch of same sized boards, e.g. of
+    all vector environment's games, then maps are (boards number, rows,
+    columns) arrays. Version in header is seqlock: it's odd while boards
+    are written, and every write makes it bigger, so readers can get
+    consistent copy and check cheaply whether what they read is stale.
+
+    Block is created and freed by one process. It writes boards itself or
+    lets one worker attached as writer do it, e.g. map generator's process,
+    other processes attach read-only. Pickled shared board attaches
+    read-only on the other side, so it can be passed to worker processes as
+    argument
+    '''
+
+    def __init__(self, shared_memory, owner=False, writable=False):
+        self.shared_memory = shared_memory
+        # only creating process frees block, only writing one may write
+        self.owner_pid = os.getpid() if owner else None
+        self.writer_pid = os.getpid() if owner or writable else None
+
+        self.header = numpy.ndarray((len(HEADER_FIELDS),), numpy.int64,
+                                    shared_memory.buf)
+        if self.header[0] != MAGIC:
+            raise SharedBoardError('{} isn\'t shared board'.format(
+                shared_memory.name))
+
+        fields = dict(zip(HEADER_FIELDS, self.header.tolist()))
+        self.size = (fields['rows'], fields['columns'])
+        self.players_number = fields['players_number']
+        self.boards_number = fields['boards_number']
+
+        maps_shape = (self.boards_number,) + self.size
+        self.owner_maps, self.dice_maps = [
+            numpy.ndarray(maps_shape, numpy.int16, shared_memory.buf,
+                          HEADER_SIZE + i * int(numpy.prod(maps_shape)) * 2)
+            for i in range(2)]
+
+        self.boards = [board.Board(self.size, self.owner_maps[board_index],
+                                   self.dice_maps[board_index])
+                       for board_index in range(self.boards_number)]
+        self.board = self.boards[0]
+
+        if self.writer_pid:
+            WRITABLE_SHARED_BOARDS.add(self)
+        else:
+            self.make_read_only()
+
+    @classmethod
+    def create(cls, size, players_number, board_=None, boards_number=1):
+        '''Creates new shared memory block, caller owns it and is its writer
+
+        Arguments:
+            size {tuple(int, int)}
+            players_number {int}
+            board_ {board.Board} -- initial state of every board, empty
+                boards if it isn't given
+            boards_number {int}
+
+        Returns:
+            SharedBoard
+        '''
+
+        shared_memory = multiprocessing.shared_memory.SharedMemory(
+            create=True,
+            size=HEADER_SIZE + boards_number * size[0] * size[1] * 2 * 2)
+
+        header = numpy.ndarray((len(HEADER_FIELDS),), numpy.int64,
+                               shared_memory.buf)
+        header[:] = (MAGIC, 0, 0, size[0], size[1], players_number,
+                     boards_number)
+        del header
+
+        shared_board = cls(shared_memory, True)
+        for board_index in range(boards_number):
+            shared_board.write(board_ or board.Board(size),
+                               board_index=board_index)
+
+        return shared_board
+
+    @classmethod
+    def attach(cls, name, writable=False):
+        '''Attaches to existing block
+
+        Arguments:
+            name {str} -- shared memory block's name
+            writable {bool} -- attaches as block's writer, owner mustn't
+                write while it's attached
+
+        Raises:
+            SharedBoardError -- if block doesn't hold shared board
+
+        Returns:
+            SharedBoard
+        '''
+
+        return cls(multiprocessing.shared_memory.SharedMemory(name),
+                   writable=writable)
+
+    def __reduce__(self):
+        return (SharedBoard.attach, (self.name,))
+
+    @property
+    def name(self):
+        return self.shared_memory.name
+
+    def is_owner(self):
+        '''Returns True if block was created by current process
+
+        Returns:
+            bool
+        '''
+
+        return self.owner_pid == os.getpid()
+
+    def is_writer(self):
+        '''Returns True if current process may write
+
+        Returns:
+            bool
+        '''
+
+        return self.writer_pid == os.getpid()
+
+    def make_read_only(self):
+        '''Makes header and board views read-only'''
+        self.writer_pid = None
+
+        self.header.flags.writeable = False
+        self.owner_maps.flags.writeable = False
+        self.dice_maps.flags.writeable = False
+        for board_ in self.boards:
+            board_.owner_map.flags.writeable = False
+            board_.dice_map.flags.writeable = False
+
+    # writing
+    @contextlib.contextmanager
+    def writing(self, turn=None):
+        '''Context in which boards may be changed in place, readers see them
+               as being written until context is left
+
+        Arguments:
+            turn {int} -- turn counter, it's left as it is if not given
+
+        Yields:
+            board.Board -- first shared board, others are in boards
+        '''
+
+        if not self.is_writer():
+            raise SharedBoardError('attached shared board is read-only')
+
+        self.header[VERSION_FIELD] += 1
+        try:
+            if turn is not None:
+                self.header[TURN_FIELD] = turn
+
+            yield self.board
+        finally:
+            self.header[VERSION_FIELD] += 1
+
+    def write(self, board_, turn=None, board_index=0):
+        '''Copies board into shared memory
+
+        Arguments:
+            board_ {board.Board}
+            turn {int} -- turn counter, it's left as it is if not given
+            board_index {int}
+        '''
+
+        with self.writing(turn):
+            self.owner_maps[board_index] = board_.owner_map
+            self.dice_maps[board_index] = board_.dice_map
+
+    # reading
+    def get_version(self):
+        '''Returns current version, odd one means board is being written
+
+        Returns:
+            int
+        '''
+
+        return int(self.header[VERSION_FIELD])
+
+    def get_turn(self):
+        '''Returns turn counter
+
+        Returns:
+            int
+        '''
+
+        return int(self.header[TURN_FIELD])
+
+    def is_stale(self, version):
+        '''Returns True if board was written since given version was read
+
+        Arguments:
+            version {int}
+
+        Returns:
+            bool
+        '''
+
+        return self.header[VERSION_FIELD] != version
+
+    def read(self, board_=None, board_index=0):
+        '''Copies consistent state of board, retrying while it's written
+
+        Arguments:
+            board_ {board.Board} -- board to copy into, new one is created
+                if it isn't given
+            board_index {int}
+
+        Returns:
+            tuple(board.Board, int, int) -- copy, its version and turn
+        '''
+
+        if board_ is None:
+            board_ = board.Board(self.size)
+
+        while True:
+            version = self.get_version()
+            if version % 2:
+                time.sleep(0)
+                continue
+
+            board_.owner_map[:] = self.owner_maps[board_index]
+            board_.dice_map[:] = self.dice_maps[board_index]
+            turn = self.get_turn()
+
+            if not self.is_stale(version):
+                return board_, version, turn
+
+    def close(self):
+        '''Detaches from block, owner frees it too'''
+        WRITABLE_SHARED_BOARDS.discard(self)
+        self.header = None
+        self.owner_maps = None
+        self.dice_maps = None
+        self.boards = []
+        self.board = None
+
+        self.shared_memory.close()
+        if self.is_owner():
+            self.shared_memory.unlink()
+
+
+def make_writable_shared_boards_read_only():
+    '''Forked child gets parent's writable shared boards, but not right to
+           write
+    '''
+    for shared_board in list(WRITABLE_SHARED_BOARDS):
+        if shared_board.header is not None:
+            shared_board.make_read_only()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=make_writable_shared_boards_read_only)
@@ -0,0 +1,510 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import argparse
+import random
+import time
+import numpy
+
+import board
+import map
+
+
+# attacks of single player's turn are played in sweeps, hexes which lost
+# conflict over the same target attack again in next sweep
+MAX_ATTACK_SWEEPS = 8
+# random values added to dice number to break ties between targets
+TIE_BREAKS_NUMBER = 64
+# games whose leader doesn't grow and nobody is eliminated for this many
+# rounds are stopped, they rarely finish before max rounds
+MAX_STALLED_ROUNDS = 50
+
+
+class BatchSimulator:
+    '''
+    BatchSimulator object. Plays many independent games at once, all players
+    are ai. State of all games is kept in (B, H, W) owner and dice arrays
+    and every step of the turn is computed for whole batch with numpy.
+
+    Attacks follow ai worker's rule: every hex of the player with more than
+    one die attacks once per turn, the enemy neighbour with fewest dice,
+    if it hasn't more dice than attacking hex. Unlike in ai worker, attacks
+    are played simultaneously, so when many hexes target the same enemy,
+    only randomly chosen one attacks, the others choose again in next sweep.
+    Games in which hexes only change hands back and forth are stopped
+    without winner
+    '''
+
+    def __init__(self, owner_maps, dice_maps, players_number,
+                 die_sides_number, max_dice_on_single_hex, seed=None):
+        self.owner_maps = numpy.array(owner_maps, dtype=numpy.int16)
+        self.dice_maps = numpy.array(dice_maps, dtype=numpy.int16)
+
+        self.batch_size = self.owner_maps.shape[0]
+        self.players_number = players_number
+        self.die_sides_number = die_sides_number
+        self.max_dice_on_single_hex = max_dice_on_single_hex
+
+        self.rng = numpy.random.default_rng(seed)
+
+        self.additional_dice = numpy.zeros(
+            (self.batch_size, players_number), dtype=numpy.int64)
+        self.hex_numbers = (self.owner_maps >= 0).sum(axis=(1, 2))
+
+        self.winners = numpy.full(self.batch_size, -1)
+        self.rounds = numpy.zeros(self.batch_size, dtype=numpy.int64)
+
+        # progress of games, biggest number of hexes any player had and
+        # number of players who have hexes
+        players_hexes = self.__count_players_hexes(self.owner_maps)
+        self.leader_hex_numbers = players_hexes.max(axis=1)
+        self.players_left = (players_hexes > 0).sum(axis=1)
+        self.stalled_rounds = numpy.zeros(self.batch_size, dtype=numpy.int64)
+        self.stalled = numpy.zeros(self.batch_size, dtype=bool)
+
+    @classmethod
+    def from_boards(cls, boards, players_number, die_sides_number,
+                    max_dice_on_single_hex, seed=None):
+        '''Creates simulator playing games starting from given boards
+
+        Arguments:
+            boards {list(board.Board)} -- boards of the same size
+            players_number {int}
+            die_sides_number {int}
+            max_dice_on_single_hex {int}
+            seed {int}
+
+        Returns:
+            BatchSimulator
+        '''
+
+        return cls([board_.owner_map for board_ in boards],
+                   [board_.dice_map for board_ in boards], players_number,
+                   die_sides_number, max_dice_on_single_hex, seed)
+
+    def get_board(self, game_index):
+        '''Returns copy of game's board
+
+        Arguments:
+            game_index {int}
+
+        Returns:
+            board.Board
+        '''
+
+        return board.Board(self.owner_maps.shape[1:],
+                           self.owner_maps[game_index].copy(),
+                           self.dice_maps[game_index].copy())
+
+    def get_active_games(self):
+        '''Returns mask of games without winner which weren't stopped as
+               stalled
+
+        Returns:
+            numpy.ndarray -- (B,) bool array
+        '''
+
+        return (self.winners < 0) & ~self.stalled
+
+    def __count_players_hexes(self, owner_maps):
+        '''Returns number of every player's hexes in every game
+
+        Arguments:
+            owner_maps {numpy.ndarray} -- (B, H, W) array
+
+        Returns:
+            numpy.ndarray -- (B, players number) array
+        '''
+
+        return numpy.stack([(owner_maps == player_index).sum(axis=(1, 2))
+                            for player_index in range(self.players_number)],
+                           axis=1)
+
+    # neighbourhood
+    def __get_neighbours(self, array, fill_value):
+        '''Yields values of neighbours of every hex, one (B, H, W) view per
+               neighbour, in board.NEIGHBOUR_SHIFTS order
+
+        Arguments:
+            array {numpy.ndarray} -- (B, H, W) array
+            fill_value -- value of neighbours outside of the board
+        '''
+
+        height, width = array.shape[1:]
+        padded = numpy.pad(array, ((0, 0), (1, 1), (1, 1)),
+                           constant_values=fill_value)
+
+        for shift in board.NEIGHBOUR_SHIFTS:
+            yield padded[:, 1 + shift[0]:1 + shift[0] + height,
+                         1 + shift[1]:1 + shift[1] + width]
+
+    def count_connected_hexes(self, player_index):
+        '''Returns size of player's biggest group of connected hexes in
+               every game
+
+        Arguments:
+            player_index {int}
+
+        Returns:
+            numpy.ndarray -- (B,) array
+        '''
+
+        return self.__count_connected_hexes(self.owner_maps, player_index)
+
+    def __count_connected_hexes(self, owner_maps, player_index):
+        '''Returns size of player's biggest group of connected hexes in
+               every game of given owner maps. Every hex is labelled with
+               smallest index of hex in its group, by taking neighbours
+               labels and jumping to label's own label until labels don't
+               change
+
+        Arguments:
+            owner_maps {numpy.ndarray} -- (B, H, W) array
+            player_index {int}
+
+        Returns:
+            numpy.ndarray -- (B,) array
+        '''
+
+        games, i, j = numpy.nonzero(owner_maps == player_index)
+
+        hex_indices = numpy.full(owner_maps.shape, -1, dtype=numpy.int32)
+        hex_indices[games, i, j] = numpy.arange(games.size)
+
+        # (7, N) indices of hex itself and its neighbours of the same player
+        neighbours = numpy.stack(
+            [hex_indices[games, i, j]] +
+            [neighbours_indices[games, i, j] for neighbours_indices in
+             self.__get_neighbours(hex_indices, -1)])
+        neighbours = numpy.where(neighbours >= 0, neighbours, neighbours[0])
+
+        labels = neighbours[0]
+        while True:
+            new_labels = labels[neighbours].min(axis=0)
+            new_labels = new_labels[new_labels]
+
+            if numpy.array_equal(new_labels, labels):
+                break
+            labels = new_labels
+
+        connected_hexes = numpy.zeros(owner_maps.shape[0], dtype=numpy.int64)
+        group_labels, group_sizes = numpy.unique(labels, return_counts=True)
+        numpy.maximum.at(connected_hexes, games[group_labels], group_sizes)
+
+        return connected_hexes
+
+    # turn
+    def play_player_turn(self, player_index):
+        '''Plays player's attacks and then adds dice, in all active games.
+               Turn is played on copies of active games, so finished games
+               cost nothing
+
+        Arguments:
+            player_index {int}
+        '''
+
+        active_games = numpy.nonzero(self.get_active_games())[0]
+
+        owner_maps = self.owner_maps[active_games]
+        dice_maps = self.dice_maps[active_games]
+        additional_dice = self.additional_dice[active_games, player_index]
+
+        self.__play_attacks(owner_maps, dice_maps, player_index)
+        additional_dice = self.__add_dice(owner_maps, dice_maps,
+                                          additional_dice, player_index)
+
+        self.owner_maps[active_games] = owner_maps
+        self.dice_maps[active_games] = dice_maps
+        self.additional_dice[active_games, player_index] = additional_dice
+
+        won = (owner_maps == player_index).sum(axis=(1, 2)) == \
+            self.hex_numbers[active_games]
+        self.winners[active_games[won]] = player_index
+
+    def play_round(self):
+        '''Plays turns of all players in all active games, then counts
+               rounds in which games didn't progress
+        '''
+
+        active_games = numpy.nonzero(self.get_active_games())[0]
+        self.rounds[active_games] += 1
+
+        for player_index in range(self.players_number):
+            self.play_player_turn(player_index)
+
+        players_hexes = self.__count_players_hexes(
+            self.owner_maps[active_games])
+        leader_hex_numbers = players_hexes.max(axis=1)
+        players_left = (players_hexes > 0).sum(axis=1)
+
+        progressed = \
+            (leader_hex_numbers > self.leader_hex_numbers[active_games]) | \
+            (players_left < self.players_left[active_games])
+        self.stalled_rounds[active_games] = numpy.where(
+            progressed, 0, self.stalled_rounds[active_games] + 1)
+
+        self.leader_hex_numbers[active_games] = numpy.maximum(
+            leader_hex_numbers, self.leader_hex_numbers[active_games])
+        self.players_left[active_games] = players_left
+
+    def run(self, max_rounds, max_stalled_rounds=MAX_STALLED_ROUNDS):
+        '''Plays rounds until all games have winner or are stalled, or max
+               rounds passed
+
+        Arguments:
+            max_rounds {int}
+            max_stalled_rounds {int} -- game is stopped after this many
+                rounds without progress, None never stops it
+
+        Returns:
+            numpy.ndarray -- (B,) winners, -1 if game wasn't finished
+        '''
+
+        for round_ in range(max_rounds):
+            if not self.get_active_games().any():
+                break
+
+            self.play_round()
+
+            if max_stalled_rounds is not None:
+                self.stalled |= (self.winners < 0) & \
+                    (self.stalled_rounds >= max_stalled_rounds)
+
+        return self.winners
+
+    def __play_attacks(self, owner_maps, dice_maps, player_index):
+        '''Plays attacks of player's hexes
+
+        Arguments:
+            owner_maps {numpy.ndarray} -- (B, H, W) array, changed in place
+            dice_maps {numpy.ndarray} -- (B, H, W) array, changed in place
+            player_index {int}
+        '''
+
+        height, width = owner_maps.shape[1:]
+        shifts = numpy.array(board.NEIGHBOUR_SHIFTS)
+        padding = ((0, 0), (1, 1), (1, 1))
+
+        games, i, j = numpy.nonzero((owner_maps == player_index) &
+                                    (dice_maps > 1))
+
+        for sweep in range(MAX_ATTACK_SWEEPS):
+            if not games.size:
+                break
+
+            padded_owners = numpy.pad(owner_maps, padding,
+                                      constant_values=-1)
+            padded_dice = numpy.pad(dice_maps, padding)
+
+            # (6, N) neighbours of all attacking hexes
+            neighbours_i = i + 1 + shifts[:, 0, None]
+            neighbours_j = j + 1 + shifts[:, 1, None]
+            neighbours_owners = padded_owners[games, neighbours_i,
+                                              neighbours_j]
+            neighbours_dice = padded_dice[games, neighbours_i, neighbours_j]
+
+            # fewest dice first, ties are broken randomly
+            keys = numpy.where(
+                (neighbours_owners >= 0) &
+                (neighbours_owners != player_index),
+                neighbours_dice.astype(numpy.int32) * TIE_BREAKS_NUMBER +
+                self.rng.integers(0, TIE_BREAKS_NUMBER,
+                                  neighbours_dice.shape),
+                numpy.iinfo(numpy.int32).max)
+            directions = keys.argmin(axis=0)
+            min_keys = keys[directions, numpy.arange(games.size)]
+
+            able = min_keys // TIE_BREAKS_NUMBER <= dice_maps[games, i, j]
+            games, i, j, directions = \
+                games[able], i[able], j[able], directions[able]
+            if not games.size:
+                break
+
+            target_i = i + shifts[directions, 0]
+            target_j = j + shifts[directions, 1]
+
+            # one randomly chosen attacker per target, others wait
+            targets = (games * height + target_i) * width + target_j
+            order = numpy.lexsort((self.rng.random(targets.size), targets))
+            first = numpy.ones(order.size, dtype=bool)
+            first[1:] = targets[order][1:] != targets[order][:-1]
+            chosen = numpy.zeros(order.size, dtype=bool)
+            chosen[order[first]] = True
+
+            self.__fight(owner_maps, dice_maps, player_index,
+                         (games[chosen], i[chosen], j[chosen]),
+                         (games[chosen], target_i[chosen],
+                          target_j[chosen]))
+
+            waiting = ~chosen
+            games, i, j = games[waiting], i[waiting], j[waiting]
+
+    def __fight(self, owner_maps, dice_maps, player_index, attacking_hexes,
+                defending_hexes):
+        '''Rolls dice of attacking and defending hexes and moves dice and
+               ownership according to fights results
+
+        Arguments:
+            owner_maps {numpy.ndarray} -- (B, H, W) array, changed in place
+            dice_maps {numpy.ndarray} -- (B, H, W) array, changed in place
+            player_index {int}
+            attacking_hexes {tuple(numpy.ndarray)} -- games, i and j indices
+            defending_hexes {tuple(numpy.ndarray)} -- games, i and j indices
+        '''
+
+        attacking_dice = dice_maps[attacking_hexes]
+        defending_dice = dice_maps[defending_hexes]
+
+        won = self.__roll_dice(attacking_dice) > \
+            self.__roll_dice(defending_dice)
+        captured_hexes = tuple(indices[won] for indices in defending_hexes)
+
+        owner_maps[captured_hexes] = player_index
+        dice_maps[captured_hexes] = attacking_dice[won] - 1
+        dice_maps[attacking_hexes] = 1
+
+    def __roll_dice(self, dice_numbers):
+        '''Returns sums of rolls of given numbers of dice
+
+        Arguments:
+            dice_numbers {numpy.ndarray} -- (N,) array
+
+        Returns:
+            numpy.ndarray -- (N,) array
+        '''
+
+        max_dice_number = int(dice_numbers.max())
+        rolls = self.rng.integers(1, self.die_sides_number + 1,
+                                  (dice_numbers.size, max_dice_number))
+
+        return (rolls * (numpy.arange(max_dice_number) <
+                         dice_numbers[:, None])).sum(axis=1)
+
+    def __add_dice(self, owner_maps, dice_maps, additional_dice,
+                   player_index):
+        '''Adds dice to player's hexes, as board.Board.add_dice does. Dice
+               are placed in rounds, every round puts at most one die on
+               randomly chosen hexes which aren't full
+
+        Arguments:
+            owner_maps {numpy.ndarray} -- (B, H, W) array
+            dice_maps {numpy.ndarray} -- (B, H, W) array, changed in place
+            additional_dice {numpy.ndarray} -- (B,) dice player couldn't
+                place before
+            player_index {int}
+
+        Returns:
+            numpy.ndarray -- (B,) dice which didn't fit on player's hexes
+        '''
+
+        players_hexes = owner_maps == player_index
+
+        capacity = numpy.where(
+            players_hexes, self.max_dice_on_single_hex - dice_maps,
+            0).clip(0).sum(axis=(1, 2))
+
+        dice_to_add = self.__count_connected_hexes(
+            owner_maps, player_index) + additional_dice
+        dice_left = numpy.minimum(dice_to_add, capacity)
+
+        while dice_left.any():
+            not_full = (players_hexes &
+                        (dice_maps < self.max_dice_on_single_hex) &
+                        (dice_left > 0)[:, None, None]).reshape(
+                            dice_maps.shape[0], -1)
+
+            keys = numpy.where(not_full, self.rng.random(not_full.shape), 2)
+            ranks = keys.argsort(axis=1).argsort(axis=1)
+
+            added = not_full & (ranks < dice_left[:, None])
+            dice_maps += added.reshape(dice_maps.shape).astype(
+                dice_maps.dtype)
+            dice_left -= added.sum(axis=1)
+
+        return (dice_to_add - capacity).clip(
+            0, 4 * self.max_dice_on_single_hex)
+
+
+def generate_boards(batch_size, size, hex_number, players_number,
+                    dice_per_hex, seed=None):
+    '''Generates boards with map's generator
+
+    Arguments:
+        batch_size {int}
+        size {tuple(int, int)}
+        hex_number {int}
+        players_number {int}
+        dice_per_hex {int}
+        seed {int}
+
+    Returns:
+        list(board.Board)
+    '''
+
+    map_ = map.Map(size, hex_number, [None] * players_number, dice_per_hex,
+                   0, (0, 0), None, seed)
+
+    return [map_.generate_board() for game_index in range(batch_size)]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Plays many ai games at once and prints win rates')
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--map-size', type=int, nargs=2, default=[20, 20])
+    parser.add_argument('--hex-percentage', type=int, default=60)
+    parser.add_argument('--players', type=int, default=4)
+    parser.add_argument('--dice-per-hex', type=int, default=4)
+    parser.add_argument('--die-sides-number', type=int, default=6)
+    parser.add_argument('--max-dice-on-single-hex', type=int, default=8)
+    parser.add_argument('--max-rounds', type=int, default=500)
+    parser.add_argument('--max-stalled-rounds', type=int,
+                        default=MAX_STALLED_ROUNDS,
+                        help='0 never stops stalled games')
+    parser.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    seed = args.seed if args.seed is not None else random.getrandbits(63)
+    hex_number = args.map_size[0] * args.map_size[1] * \
+        args.hex_percentage // 100
+
+    start_time = time.perf_counter()
+    boards = generate_boards(args.games, tuple(args.map_size), hex_number,
+                             args.players, args.dice_per_hex, seed)
+    generation_time = time.perf_counter() - start_time
+
+    simulator = BatchSimulator.from_boards(
+        boards, args.players, args.die_sides_number,
+        args.max_dice_on_single_hex, seed)
+
+    start_time = time.perf_counter()
+    winners = simulator.run(args.max_rounds, args.max_stalled_rounds or None)
+    simulation_time = time.perf_counter() - start_time
+
+    finished = winners >= 0
+    print('seed {}, {} games finished of {}, {:.1f} rounds on average, {} '
+          'stopped as stalled'.format(
+              seed, finished.sum(), args.games,
+              simulator.rounds[finished].mean() if finished.any() else 0,
+              simulator.stalled.sum()))
+
+    for player_index in range(args.players):
+        print('player {}: {:.1%} wins'.format(
+            player_index, (winners == player_index).sum() / args.games))
+
+    print('generation {:.2f} s, simulation {:.2f} s, {:.0f} games per '
+          'hour'.format(generation_time, simulation_time,
+                        args.games / simulation_time * 3600))
@@ -0,0 +1,407 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import os
+# snapshots never open window
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import argparse
+import concurrent.futures
+import random
+import sys
+import pygame
+
+import fonts
+import game
+import graphics
+import map
+import rasterizer
+import replay
+import savegame
+import spectator
+
+
+DEFAULT_SIDE_LENGTH = 16
+# smallest side length hexes still have area with
+MIN_SIDE_LENGTH = 2
+
+# renderer of worker process, its caches are reused by all worker's jobs
+worker_renderer = None
+
+
+class SnapshotRenderer:
+    '''
+    SnapshotRenderer object. Renders boards to images without window: hexes
+    are drawn by board rasterizer and dice numbers from glyphs rendered once.
+    Layout of every board's size, i.e. side length fitting max width and
+    rasterizer with its pixel to hex lookups, is kept, so many snapshots of
+    the same game or of same sized games are cheap
+    '''
+
+    def __init__(self, side_length=DEFAULT_SIDE_LENGTH, max_width=None):
+        graphics.init_pygame()
+
+        self.side_length = max(MIN_SIDE_LENGTH, side_length)
+        self.max_width = max_width
+
+        self.font_cache = fonts.get_font_cache()
+
+        # board's size -> map used for hexes layout and its rasterizer
+        self.layouts = {}
+        # (dice number, font size) -> pygame.Surface
+        self.glyphs = {}
+
+    def render(self, board_, colors=None):
+        '''Renders board
+
+        Arguments:
+            board_ {board.Board}
+            colors {list(tuple(int, int, int))} -- players colors, default
+                ones if they are missing
+
+        Returns:
+            pygame.Surface
+        '''
+
+        players_number = max(1, int(board_.owner_map.max()) + 1)
+        if not colors or len(colors) < players_number:
+            colors = get_default_colors(players_number)
+
+        map_, board_rasterizer = self.__get_layout(tuple(board_.size))
+        map_.board = board_
+        map_.players = [game.Player(tuple(color)) for color in colors]
+
+        surface = pygame.Surface(board_rasterizer.view_size)
+        board_rasterizer.render(surface)
+
+        if map_.side_length >= graphics.LOD_DICE_NUMBER_SIDE_LENGTH:
+            self.__draw_dice_numbers(map_, surface)
+
+        # even smallest hexes don't fit
+        if self.max_width and surface.get_width() > self.max_width:
+            surface = pygame.transform.smoothscale(surface, (
+                self.max_width, max(1, surface.get_height() *
+                                    self.max_width // surface.get_width())))
+
+        return surface
+
+    def save(self, board_, path, colors=None):
+        '''Renders board to image file, format is chosen by extension
+
+        Arguments:
+            board_ {board.Board}
+            path {str}
+            colors {list(tuple(int, int, int))}
+        '''
+
+        pygame.image.save(self.render(board_, colors), path)
+
+    def __get_layout(self, size):
+        '''Returns map and rasterizer of board's size, side length is the
+               biggest one, up to renderer's one, board fits max width with
+
+        Arguments:
+            size {tuple(int, int)}
+
+        Returns:
+            tuple(map.Map, rasterizer.BoardRasterizer)
+        '''
+
+        if size not in self.layouts:
+            side_length = self.side_length
+            while True:
+                map_ = map.Map(size, 0, [], 0, side_length, (0, 0))
+                view_size = self.__get_view_size(map_)
+
+                if not self.max_width or view_size[0] <= self.max_width or \
+                   side_length <= MIN_SIDE_LENGTH:
+                    break
+                side_length -= 1
+
+            self.layouts[size] = (map_, rasterizer.BoardRasterizer(
+                map_, view_size))
+
+        return self.layouts[size]
+
+    def __get_view_size(self, map_):
+        '''Returns size of image whole board fits in
+
+        Arguments:
+            map_ {map.Map}
+
+        Returns:
+            tuple(int, int)
+        '''
+
+        last_middle = map_.get_hex_middle((map_.size[0] - 1,
+                                           map_.size[1] - 1))
+
+        return (last_middle[0] + map_.half_side_length_root3 + 1,
+                last_middle[1] + map_.side_length + 1)
+
+    def __draw_dice_numbers(self, map_, surface):
+        '''Draws dice number on every hex, like graphics.Graphics does
+
+        Arguments:
+            map_ {map.Map}
+            surface {pygame.Surface}
+        '''
+
+        font_size = int(map_.side_length)
+
+        blit_sequence = []
+        for coords in zip(*(map_.board.owner_map >= 0).nonzero()):
+            middle = map_.get_hex_middle(coords)
+            blit_sequence.append((
+                self.__get_glyph(int(map_.board.dice_map[coords]),
+                                 font_size),
+                (middle[0] - font_size / 4, middle[1] - font_size / 2)))
+
+        surface.blits(blit_sequence, False)
+
+    def __get_glyph(self, dice_number, font_size):
+        '''Returns rendered dice number
+
+        Arguments:
+            dice_number {int}
+            font_size {int}
+
+        Returns:
+            pygame.Surface
+        '''
+
+        key = (dice_number, font_size)
+        if key not in self.glyphs:
+            self.glyphs[key] = self.font_cache.get_font(
+                'timesnewroman', font_size, bold=True).render(
+                    str(dice_number), True, (255, 255, 255))
+
+        return self.glyphs[key]
+
+
+def get_default_colors(players_number):
+    '''Returns colors of players for sources which don't keep them, e.g.
+           spectator stream. First player is red as human in game
+
+    Arguments:
+        players_number {int}
+
+    Returns:
+        list(tuple(int, int, int))
+    '''
+
+    rng = random.Random(0)
+
+    return [(255, 0, 0)] + [
+        (rng.randrange(40, 215), rng.randrange(40, 215),
+         rng.randrange(40, 215)) for player in range(players_number - 1)]
+
+
+# sources
+def get_source_type(path):
+    '''Returns type of recorded game by file's magic
+
+    Arguments:
+        path {str}
+
+    Returns:
+        str -- 'save', 'replay' or 'stream'
+    '''
+
+    with open(path, 'rb') as file_:
+        magic = file_.read(4)
+
+    if magic == savegame.MAGIC:
+        return 'save'
+    if magic == replay.MAGIC:
+        return 'replay'
+
+    return 'stream'
+
+
+def load_stream(path):
+    '''Returns spectator stream of replay or stream file and players colors.
+           Replay is played headlessly and recorded, colors are those of its
+           last map
+
+    Arguments:
+        path {str}
+
+    Returns:
+        tuple(spectator.SpectatorStream, list(tuple(int, int, int)) or None)
+    '''
+
+    if get_source_type(path) == 'stream':
+        return spectator.SpectatorStream.load(path), None
+
+    replay_ = replay.Replay(path)
+
+    map_ = map.Map((5, 5), 10, [game.Player((255, 0, 0))], 4, 32, (0, 0))
+    gameplay = game.Gameplay(map_, 6, 0, 8, replay_.seed)
+
+    stream = spectator.SpectatorStream()
+    map_.spectator_stream = stream
+    gameplay.spectator_stream = stream
+
+    replay_.run_headless(map_, gameplay)
+    gameplay.ai_worker.stop()
+
+    return stream, [player.color for player in map_.players]
+
+
+def export(path, output_dir, every=None, renderer=None):
+    '''Exports snapshots of recorded game: save file as one image, replay
+           and stream as image of last step and, if every is given, of
+           every every-th step
+
+    Arguments:
+        path {str} -- save, replay or spectator stream file
+        output_dir {str}
+        every {int}
+        renderer {SnapshotRenderer} -- worker's renderer by default
+
+    Returns:
+        list(str) -- paths of written images
+    '''
+
+    renderer = renderer or worker_renderer
+    name = os.path.basename(path)
+    os.makedirs(output_dir, exist_ok=True)
+
+    if get_source_type(path) == 'save':
+        save_file = savegame.SaveFile(path)
+        image_path = os.path.join(output_dir, '{}.png'.format(name))
+
+        renderer.save(save_file.load_board(), image_path,
+                      [player.color for player in save_file.read_players()])
+
+        return [image_path]
+
+    stream, colors = load_stream(path)
+
+    steps = list(range(0, stream.actions, every)) if every else []
+    steps.append(stream.actions)
+
+    image_paths = []
+    for step in steps:
+        spectator_ = spectator.watch(stream, step)
+        if not spectator_:
+            continue
+
+        image_path = os.path.join(output_dir,
+                                  '{}_{:06d}.png'.format(name, step))
+        renderer.save(spectator_.board, image_path, colors)
+        image_paths.append(image_path)
+
+    return image_paths
+
+
+def init_worker(side_length, max_width):
+    '''Creates renderer of worker process
+
+    Arguments:
+        side_length {int}
+        max_width {int}
+    '''
+
+    global worker_renderer
+    worker_renderer = SnapshotRenderer(side_length, max_width)
+
+
+def export_from_args(args):
+    '''Unpacks export's arguments, executor maps over tuples. Error of one
+           file doesn't stop batch, it's returned instead
+
+    Returns:
+        tuple(list(str), str or None) -- paths of written images and error
+    '''
+
+    # any file of batch may be broken in its own way
+    try:
+        return export(*args), None
+    except Exception as error:
+        return [], '{}: {}'.format(type(error).__name__, error)
+
+
+def export_batch(paths, output_dir, every=None,
+                 side_length=DEFAULT_SIDE_LENGTH, max_width=None,
+                 processes_number=None):
+    '''Exports snapshots of many recorded games in parallel processes
+
+    Arguments:
+        paths {list(str)}
+        output_dir {str}
+        every {int}
+        side_length {int}
+        max_width {int}
+        processes_number {int} -- number of cpus by default
+
+    Returns:
+        tuple(list(str), list(tuple(str, str))) -- paths of written images
+            and path and error of every file which couldn't be exported
+    '''
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    image_paths = []
+    failures = []
+    with concurrent.futures.ProcessPoolExecutor(
+            processes_number, initializer=init_worker,
+            initargs=(side_length, max_width)) as executor:
+        results = executor.map(
+            export_from_args, [(path, output_dir, every) for path in paths],
+            chunksize=max(1, len(paths) // (4 * (processes_number or 1))))
+
+        for path, (path_image_paths, error) in zip(paths, results):
+            image_paths.extend(path_image_paths)
+            if error:
+                failures.append((path, error))
+
+    return image_paths, failures
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Exports recorded games as PNG images')
+    parser.add_argument('paths', nargs='+',
+                        help='save, replay or spectator stream files')
+    parser.add_argument('--output', default='snapshots',
+                        help='directory of images')
+    parser.add_argument('--every', type=int,
+                        help='exports also every N-th step of replays')
+    parser.add_argument('--side-length', type=int,
+                        default=DEFAULT_SIDE_LENGTH,
+                        help='hex\'s side length in pixels, dice numbers are '
+                             'drawn from {}'.format(
+                                 graphics.LOD_DICE_NUMBER_SIDE_LENGTH))
+    parser.add_argument('--max-width', type=int,
+                        help='fits images in this width with smaller hexes, '
+                             'scales them down if even smallest don\'t fit')
+    parser.add_argument('--processes', type=int,
+                        help='number of cpus by default')
+    args = parser.parse_args()
+
+    image_paths, failures = export_batch(args.paths, args.output,
+                                         args.every, args.side_length,
+                                         args.max_width, args.processes)
+
+    for path, error in failures:
+        print('{}: {}'.format(path, error), file=sys.stderr)
+    print('{} images written to {}, {} of {} files failed'.format(
+        len(image_paths), args.output, len(failures), len(args.paths)))
+
+    if failures:
+        sys.exit(1)
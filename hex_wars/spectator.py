@@ -0,0 +1,354 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import argparse
+import bisect
+import hashlib
+import os
+import numpy
+
+import client
+import protocol
+
+
+class SpectatorStream:
+    '''
+    SpectatorStream object. Read-only stream of game made of protocol's
+    messages: keyframe with whole board and delta with hexes changed by
+    every action, i.e. fight or adding dice. Turn field of keyframes and
+    deltas holds number of actions played up to them. New keyframe is
+    written when deltas since last one are as big as it, so keyframes
+    never take more than half of stream and spectator joining late reads
+    at most two keyframes worth of bytes, whatever board's size is.
+    Stream can also be written to file and loaded again to be replayed,
+    then only offsets of entries are kept and entries are read from file
+    '''
+
+    def __init__(self, path=None):
+        self.path = path
+
+        # entries are bytes of keyframe, preceded by welcome, or of delta,
+        # they are kept in memory only if stream has no file
+        self.entries = []
+        # offsets of entries in file and file's size
+        self.offsets = []
+        self.end_offset = 0
+
+        # numbers of actions and indices of entries of all keyframes
+        self.keyframe_actions = []
+        self.keyframe_indices = []
+
+        self.actions = 0
+        self.size = None
+        self.players_number = 0
+
+        self.keyframe_bytes = 0
+        self.delta_bytes = 0
+
+        self.file_ = open(path, 'wb') if path else None
+
+    @classmethod
+    def load(cls, path):
+        '''Loads stream written to file, only messages' headers are read
+
+        Arguments:
+            path {str}
+
+        Raises:
+            protocol.ProtocolError -- if file ends inside message
+
+        Returns:
+            SpectatorStream
+        '''
+
+        stream = cls()
+        stream.path = path
+
+        with open(path, 'rb') as file_:
+            file_size = os.fstat(file_.fileno()).st_size
+
+            welcome_offset = None
+            while stream.end_offset < file_size:
+                offset = stream.end_offset
+                # keyframe's and delta's bodies start with number of actions
+                header = file_.read(protocol.FRAME_HEADER.size +
+                                    protocol.KEYFRAME_BODY.size)
+                if len(header) < protocol.FRAME_HEADER.size:
+                    raise protocol.ProtocolError(
+                        'file ends inside frame header')
+
+                length, message_type = protocol.FRAME_HEADER.unpack_from(
+                    header)
+                stream.end_offset += protocol.FRAME_HEADER.size + length
+                if stream.end_offset > file_size:
+                    raise protocol.ProtocolError(
+                        'file ends inside message body')
+                file_.seek(stream.end_offset)
+
+                if message_type == protocol.WELCOME:
+                    welcome_offset = offset
+                elif message_type == protocol.KEYFRAME:
+                    stream.__add_keyframe(
+                        stream.end_offset - welcome_offset,
+                        protocol.KEYFRAME_BODY.unpack_from(
+                            header, protocol.FRAME_HEADER.size)[0])
+                    stream.offsets.append(welcome_offset)
+                elif message_type == protocol.DELTA:
+                    stream.actions = protocol.DELTA_BODY.unpack_from(
+                        header, protocol.FRAME_HEADER.size)[0]
+                    stream.__add_delta(stream.end_offset - offset)
+                    stream.offsets.append(offset)
+
+        return stream
+
+    # recording
+    def record_new_map(self, map_):
+        '''Starts stream of new map with keyframe
+
+        Arguments:
+            map_ {map.Map}
+        '''
+
+        self.size = tuple(map_.size)
+        self.players_number = len(map_.players)
+
+        self.record_keyframe(map_.board, 0)
+
+    def record_keyframe(self, board_, current_player_index):
+        '''Writes whole board
+
+        Arguments:
+            board_ {board.Board}
+            current_player_index {int}
+        '''
+
+        entry = protocol.encode(
+            protocol.WELCOME, protocol.WELCOME_BODY.pack(
+                protocol.SPECTATOR_SEAT, self.players_number, *self.size)) + \
+            protocol.encode_keyframe(self.actions, current_player_index,
+                                     board_)
+
+        self.__add_keyframe(len(entry), self.actions)
+        self.__store(entry)
+
+    def record_action(self, board_, coords_list, current_player_index):
+        '''Writes delta with hexes changed by action, they are read from
+               board, so it has to be called after action was applied
+
+        Arguments:
+            board_ {board.Board}
+            coords_list {list(tuple(int, int))} -- changed hexes, they can
+                repeat
+            current_player_index {int}
+        '''
+
+        if self.size is None:
+            return
+
+        self.actions += 1
+
+        indices = numpy.unique(numpy.ravel_multi_index(
+            tuple(numpy.array(coords_list, dtype=numpy.intp).reshape(
+                -1, 2).T), self.size))
+
+        cells = numpy.empty(indices.size, protocol.CELL)
+        cells['index'] = indices
+        cells['owner'] = board_.owner_map.ravel()[indices]
+        cells['dice'] = board_.dice_map.ravel()[indices]
+
+        entry = protocol.encode_delta(self.actions, current_player_index,
+                                      cells)
+
+        self.__add_delta(len(entry))
+        self.__store(entry)
+
+        if self.delta_bytes >= self.keyframe_bytes:
+            self.record_keyframe(board_, current_player_index)
+
+    def close(self):
+        '''Closes stream's file for writing, it can be still read'''
+        if self.file_:
+            self.file_.close()
+            self.file_ = None
+
+    def __add_keyframe(self, entry_size, actions):
+        '''Counts keyframe entry, it has to be called before entry is stored
+
+        Arguments:
+            entry_size {int}
+            actions {int} -- actions played before keyframe
+        '''
+
+        self.keyframe_actions.append(actions)
+        self.keyframe_indices.append(self.get_entries_number())
+        self.actions = actions
+
+        self.keyframe_bytes = entry_size
+        self.delta_bytes = 0
+
+    def __add_delta(self, entry_size):
+        '''Counts delta entry
+
+        Arguments:
+            entry_size {int}
+        '''
+
+        self.delta_bytes += entry_size
+
+    def __store(self, entry):
+        '''Writes entry to file if stream has one, otherwise keeps it in
+               memory
+
+        Arguments:
+            entry {bytes}
+        '''
+
+        if not self.path:
+            self.entries.append(entry)
+            return
+
+        self.offsets.append(self.end_offset)
+        self.end_offset += len(entry)
+
+        self.file_.write(entry)
+        self.file_.flush()
+
+    # reading
+    def get_entries_number(self):
+        '''Returns number of entries
+
+        Returns:
+            int
+        '''
+
+        return len(self.offsets) if self.path else len(self.entries)
+
+    def seek(self, actions=None):
+        '''Returns range of entries spectator reads to see board after given
+               number of actions: from last keyframe before it to delta of
+               that action
+
+        Arguments:
+            actions {int} -- last action by default
+
+        Returns:
+            tuple(int, int) or None -- None if stream has no keyframe yet
+        '''
+
+        if actions is None:
+            actions = self.actions
+
+        keyframe = bisect.bisect_right(self.keyframe_actions, actions) - 1
+        if keyframe < 0:
+            return None
+
+        # entries after keyframe are deltas of next actions
+        start = self.keyframe_indices[keyframe]
+        end = min(self.get_entries_number(),
+                  start + 1 + actions - self.keyframe_actions[keyframe])
+
+        return start, end
+
+    def read(self, start, end=None):
+        '''Returns entries joined in one buffer and index of next entry,
+               live spectator reads again from it
+
+        Arguments:
+            start {int}
+            end {int} -- all entries by default
+
+        Returns:
+            tuple(bytes, int)
+        '''
+
+        if end is None:
+            end = self.get_entries_number()
+
+        if not self.path:
+            return b''.join(self.entries[start:end]), max(start, end)
+
+        start_offset = self.__get_offset(start)
+        with open(self.path, 'rb') as file_:
+            file_.seek(start_offset)
+            data = file_.read(max(0, self.__get_offset(end) - start_offset))
+
+        return data, max(start, end)
+
+    def __get_offset(self, index):
+        '''Returns offset of entry in file, file's size for entries after
+               last one
+
+        Arguments:
+            index {int}
+
+        Returns:
+            int
+        '''
+
+        if index < len(self.offsets):
+            return self.offsets[index]
+
+        return self.end_offset
+
+
+def watch(stream, actions=None):
+    '''Returns client which sees board after given number of actions, it
+           starts from nearest keyframe
+
+    Arguments:
+        stream {SpectatorStream}
+        actions {int} -- last action by default
+
+    Returns:
+        client.GameClient or None -- None if stream has no keyframe
+    '''
+
+    entries_range = stream.seek(actions)
+    if entries_range is None:
+        return None
+
+    spectator = client.GameClient()
+    for message_type, body in protocol.iter_messages(
+            stream.read(*entries_range)[0]):
+        spectator.apply(message_type, body)
+
+    return spectator
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Shows board from spectator stream file')
+    parser.add_argument('path', help='spectator stream file')
+    parser.add_argument('--actions', type=int,
+                        help='shows board after this number of actions, '
+                             'last one by default')
+    args = parser.parse_args()
+
+    stream = SpectatorStream.load(args.path)
+    spectator = watch(stream, args.actions)
+
+    if spectator:
+        print('actions: {} of {}, keyframes: {}'.format(
+            spectator.turn, stream.actions, len(stream.keyframe_actions)))
+
+        for player_index in range(spectator.players_number):
+            print('player {}: {} hexes'.format(
+                player_index,
+                (spectator.board.owner_map == player_index).sum()))
+
+        digest = hashlib.sha1(spectator.board.owner_map.tobytes())
+        digest.update(spectator.board.dice_map.tobytes())
+        print('board: {}'.format(digest.hexdigest()))
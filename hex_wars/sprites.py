@@ -0,0 +1,108 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import pygame
+
+
+class HexSpriteCache:
+    '''
+    HexSpriteCache object. Keeps pre-rendered filled and outlined hex
+    surfaces per color for current side length
+    '''
+
+    def __init__(self, map_):
+        self.map_ = map_
+
+        self.side_length = None
+        self.filled_sprites = {}
+        self.outlined_sprites = {}
+
+    def invalidate(self):
+        '''Removes all cached sprites, e.g. after players recoloring'''
+        self.filled_sprites = {}
+        self.outlined_sprites = {}
+
+    def get_sprite_shift(self):
+        '''Returns shift between hex's middle and sprite's top left corner
+
+        Returns:
+            tuple(int, int)
+        '''
+
+        return (self.map_.half_side_length_root3, self.map_.side_length)
+
+    def get_filled_sprite(self, color):
+        '''Returns filled hex sprite of given color
+
+        Arguments:
+            color {tuple(int, int, int)}
+
+        Returns:
+            pygame.Surface
+        '''
+
+        self.__check_side_length()
+
+        if color not in self.filled_sprites:
+            self.filled_sprites[color] = self.__create_sprite(color, 0)
+
+        return self.filled_sprites[color]
+
+    def get_outlined_sprite(self, color):
+        '''Returns outlined hex sprite of given color
+
+        Arguments:
+            color {tuple(int, int, int)}
+
+        Returns:
+            pygame.Surface
+        '''
+
+        self.__check_side_length()
+
+        if color not in self.outlined_sprites:
+            self.outlined_sprites[color] = self.__create_sprite(color, 1)
+
+        return self.outlined_sprites[color]
+
+    def __check_side_length(self):
+        '''Invalidates cache if map was zoomed since sprites were created'''
+        if self.side_length != self.map_.side_length:
+            self.side_length = self.map_.side_length
+            self.invalidate()
+
+    def __create_sprite(self, color, width):
+        '''Renders hex sprite
+
+        Arguments:
+            color {tuple(int, int, int)}
+            width {int} -- outline width, 0 fills polygon
+
+        Returns:
+            pygame.Surface
+        '''
+
+        shift = self.get_sprite_shift()
+        sprite = pygame.Surface((2 * shift[0] + 1, 2 * shift[1] + 1),
+                                pygame.SRCALPHA)
+
+        polygon = self.map_.calculate_hex_polygon(shift)
+        if width:
+            pygame.draw.lines(sprite, color, True, polygon, width)
+        else:
+            pygame.draw.polygon(sprite, color, polygon)
+
+        return sprite
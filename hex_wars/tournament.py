@@ -0,0 +1,376 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import math
+import random
+import time
+import numpy
+
+import ai
+import map
+
+
+HEX_PERCENTAGE = 60
+DICE_PER_HEX = 4
+DIE_SIDES_NUMBER = 6
+MAX_DICE_ON_SINGLE_HEX = 8
+ELO_BASE = 1500
+BOOTSTRAP_SAMPLES = 200
+# iterations of Bradley-Terry model fitting
+FIT_ITERATIONS = 100
+
+
+class TimedStrategy(ai.Strategy):
+    '''
+    TimedStrategy object. Plays wrapped strategy and measures time it spends
+    on every decision, deciding to end turn included
+    '''
+
+    def __init__(self, strategy):
+        self.strategy = strategy
+
+        self.decisions = 0
+        self.decision_time = 0.0
+
+    def get_attacks(self, board, player_index, rng):
+        attacks = self.strategy.get_attacks(board, player_index, rng)
+
+        while True:
+            start_time = time.perf_counter()
+            attack = next(attacks, None)
+            self.decision_time += time.perf_counter() - start_time
+            self.decisions += 1
+
+            if attack is None:
+                return
+
+            yield attack
+
+
+def play_game(strategy_names, size, seed, max_rounds):
+    '''Plays game between strategies, i-th strategy plays i-th player
+
+    Arguments:
+        strategy_names {tuple(str)} -- keys of ai.STRATEGIES
+        size {tuple(int, int)}
+        seed {int} -- seed of board and all fights
+        max_rounds {int} -- players still alive after it are ranked by
+            their hexes number
+
+    Returns:
+        dict -- game's result, places start with 0 for winner
+    '''
+
+    players_number = len(strategy_names)
+
+    map_ = map.Map(size, max(players_number,
+                             size[0] * size[1] * HEX_PERCENTAGE // 100),
+                   [None] * players_number, DICE_PER_HEX, 0, (0, 0))
+    board_ = map_.generate_board(seed)
+
+    strategies = {player_index: TimedStrategy(ai.STRATEGIES[name]())
+                  for player_index, name in enumerate(strategy_names)}
+    ai_worker = ai.AIWorker(strategies)
+
+    rng = random.Random(seed)
+    additional_dice_list = [0] * players_number
+    # player's index -> number of turns played before player was eliminated
+    eliminations = {}
+
+    turns = 0
+    while turns < max_rounds * players_number and \
+            len(eliminations) < players_number - 1:
+        player_index = turns % players_number
+        turns += 1
+
+        if player_index in eliminations:
+            continue
+
+        for event in ai_worker.play_player_turn(
+                board_, player_index, additional_dice_list,
+                DIE_SIDES_NUMBER, MAX_DICE_ON_SINGLE_HEX, rng):
+            pass
+
+        for enemy_index in range(players_number):
+            if enemy_index not in eliminations and \
+               not (board_.owner_map == enemy_index).any():
+                eliminations[enemy_index] = turns
+
+    # alive players by hexes number, then eliminated ones from the last
+    scores = [(1, int((board_.owner_map == player_index).sum()))
+              if player_index not in eliminations else
+              (0, eliminations[player_index])
+              for player_index in range(players_number)]
+    places = [sum(other_score > score for other_score in scores)
+              for score in scores]
+
+    return {
+        'strategies': list(strategy_names),
+        'seed': seed,
+        'places': places,
+        'rounds': math.ceil(turns / players_number),
+        'decisions': [strategies[player_index].decisions
+                      for player_index in range(players_number)],
+        'decision_time': [strategies[player_index].decision_time
+                          for player_index in range(players_number)],
+    }
+
+
+def play_game_from_args(args):
+    '''Unpacks play_game's arguments, executor maps over tuples'''
+    return play_game(*args)
+
+
+def create_games(strategy_names, players_number, games_number, seed):
+    '''Returns arguments of all tournament's games. Every group of strategies
+           plays every map in every seats rotation, so no strategy is
+           favoured by map or by playing first
+
+    Arguments:
+        strategy_names {list(str)}
+        players_number {int} -- strategies in every game
+        games_number {int} -- maps every group plays
+        seed {int}
+
+    Returns:
+        list(tuple(tuple(str), int)) -- strategies in seats order and seed
+    '''
+
+    games = []
+    for group in itertools.combinations(strategy_names, players_number):
+        for game_index in range(games_number):
+            for rotation in range(players_number):
+                games.append((group[rotation:] + group[:rotation],
+                              seed + game_index))
+
+    return games
+
+
+# ratings
+def get_pairwise_scores(results, strategy_names):
+    '''Splits every game into pairwise matches of its players
+
+    Arguments:
+        results {list(dict)} -- play_game's results
+        strategy_names {list(str)}
+
+    Returns:
+        tuple(numpy.ndarray, numpy.ndarray) -- scores of row strategy
+            against column one and numbers of matches, draw scores half
+    '''
+
+    indices = {name: i for i, name in enumerate(strategy_names)}
+    scores = numpy.zeros((len(strategy_names), len(strategy_names)))
+    matches = numpy.zeros_like(scores)
+
+    for result in results:
+        for (name1, place1), (name2, place2) in itertools.combinations(
+                zip(result['strategies'], result['places']), 2):
+            index1, index2 = indices[name1], indices[name2]
+            score = 1.0 if place1 < place2 else 0.5 if place1 == place2 \
+                else 0.0
+
+            scores[index1, index2] += score
+            scores[index2, index1] += 1.0 - score
+            matches[index1, index2] += 1
+            matches[index2, index1] += 1
+
+    return scores, matches
+
+
+def fit_ratings(scores, matches):
+    '''Fits Bradley-Terry model to pairwise scores and returns it as Elo
+           ratings, averaging ELO_BASE. Every pair gets one virtual draw, so
+           strategy which never scored still gets finite rating
+
+    Arguments:
+        scores {numpy.ndarray}
+        matches {numpy.ndarray}
+
+    Returns:
+        numpy.ndarray
+    '''
+
+    played = matches > 0
+    scores = scores + 0.5 * played
+    matches = matches + played
+
+    strengths = numpy.ones(len(scores))
+    for iteration in range(FIT_ITERATIONS):
+        strengths = scores.sum(axis=1) / (
+            matches / (strengths[:, None] + strengths[None, :])).sum(axis=1)
+        strengths /= numpy.exp(numpy.log(strengths).mean())
+
+    return ELO_BASE + 400 * numpy.log10(strengths)
+
+
+def get_blocks(results):
+    '''Groups results by group of strategies and map. Games of one block are
+           the same map in every seats rotation, so they aren't independent
+           and they're resampled together
+
+    Arguments:
+        results {list(dict)} -- play_game's results
+
+    Returns:
+        list(list(dict)) -- blocks in order of their first games
+    '''
+
+    blocks = {}
+    for result in results:
+        blocks.setdefault((tuple(sorted(result['strategies'])),
+                           result['seed']), []).append(result)
+
+    return list(blocks.values())
+
+
+def rate(results, strategy_names, seed):
+    '''Returns Elo ratings with 95% confidence intervals from bootstrap over
+           blocks of games, see get_blocks, win rates and mean decision times
+
+    Arguments:
+        results {list(dict)} -- play_game's results
+        strategy_names {list(str)}
+        seed {int} -- seed of bootstrap's resampling
+
+    Returns:
+        list(dict) -- one entry per strategy, best first
+    '''
+
+    ratings = fit_ratings(*get_pairwise_scores(results, strategy_names))
+
+    # pairwise scores are sums over games, so every block's ones are counted
+    # once and samples only sum them
+    blocks_scores, blocks_matches = (numpy.array(arrays) for arrays in zip(*(
+        get_pairwise_scores(block, strategy_names)
+        for block in get_blocks(results))))
+
+    rng = numpy.random.default_rng(seed)
+    bootstrap_ratings = []
+    for sample in range(BOOTSTRAP_SAMPLES):
+        indices = rng.integers(len(blocks_scores), size=len(blocks_scores))
+        bootstrap_ratings.append(fit_ratings(
+            blocks_scores[indices].sum(axis=0),
+            blocks_matches[indices].sum(axis=0)))
+    low, high = numpy.percentile(bootstrap_ratings, (2.5, 97.5), axis=0)
+
+    table = []
+    for i, name in enumerate(strategy_names):
+        seats = [(result, seat) for result in results
+                 for seat, seat_name in enumerate(result['strategies'])
+                 if seat_name == name]
+        decisions = sum(result['decisions'][seat] for result, seat in seats)
+
+        table.append({
+            'strategy': name,
+            'elo': float(ratings[i]),
+            'elo_low': float(low[i]),
+            'elo_high': float(high[i]),
+            'games': len(seats),
+            'win_rate': sum(result['places'][seat] == 0
+                            for result, seat in seats) / max(1, len(seats)),
+            'decisions': decisions,
+            'decision_time': sum(result['decision_time'][seat]
+                                 for result, seat in seats) /
+            max(1, decisions),
+        })
+
+    return sorted(table, key=lambda entry: -entry['elo'])
+
+
+def run(strategy_names, players_number, games_number, size, seed,
+        max_rounds, processes_number=None):
+    '''Plays tournament in parallel processes and rates strategies
+
+    Arguments:
+        strategy_names {list(str)} -- keys of ai.STRATEGIES
+        players_number {int}
+        games_number {int}
+        size {tuple(int, int)}
+        seed {int}
+        max_rounds {int}
+        processes_number {int} -- number of cpus by default
+
+    Returns:
+        tuple(list(dict), list(dict)) -- ratings table and games results
+    '''
+
+    games = [(group, tuple(size), game_seed, max_rounds)
+             for group, game_seed in create_games(
+                 strategy_names, players_number, games_number, seed)]
+
+    with concurrent.futures.ProcessPoolExecutor(processes_number) as \
+            executor:
+        results = list(executor.map(
+            play_game_from_args, games,
+            chunksize=max(1, len(games) // (4 * (processes_number or 1)))))
+
+    return rate(results, strategy_names, seed), results
+
+
+def print_table(table):
+    '''Prints ratings table
+
+    Arguments:
+        table {list(dict)} -- see rate
+    '''
+
+    print('{:<12}{:>8}{:>18}{:>8}{:>10}{:>16}'.format(
+        'strategy', 'elo', '95% ci', 'games', 'win rate', 'decision [us]'))
+
+    for entry in table:
+        print('{:<12}{:>8.0f}{:>18}{:>8}{:>10.2f}{:>16.1f}'.format(
+            entry['strategy'], entry['elo'],
+            '[{:.0f}, {:.0f}]'.format(entry['elo_low'], entry['elo_high']),
+            entry['games'], entry['win_rate'],
+            entry['decision_time'] * 1e6))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description='Plays ai strategies against each other and rates them')
+    parser.add_argument('--strategies', nargs='+',
+                        choices=list(ai.STRATEGIES),
+                        default=list(ai.STRATEGIES))
+    parser.add_argument('--players', type=int, default=2,
+                        help='strategies in every game')
+    parser.add_argument('--games', type=int, default=20,
+                        help='maps every group of strategies plays')
+    parser.add_argument('--map-size', type=int, nargs=2, default=[10, 10])
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-rounds', type=int, default=200)
+    parser.add_argument('--processes', type=int,
+                        help='number of cpus by default')
+    parser.add_argument('--output', metavar='PATH',
+                        help='saves ratings and games results as JSON')
+    args = parser.parse_args()
+
+    if not 2 <= args.players <= len(args.strategies):
+        parser.error('--players has to be between 2 and number of '
+                     'strategies')
+
+    table, results = run(args.strategies, args.players, args.games,
+                         args.map_size, args.seed, args.max_rounds,
+                         args.processes)
+    print_table(table)
+
+    if args.output:
+        with open(args.output, 'w') as file_:
+            json.dump({'ratings': table, 'games': results}, file_, indent=4)
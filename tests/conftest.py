@@ -0,0 +1,54 @@
+'''
+    Copyright 2019 Łukasz Zalewski.
+
+    Licensed under the Apache License, Version 2.0 (the "License");
+    you may not use this file except in compliance with the License.
+    You may obtain a copy of the License at
+
+        http://www.apache.org/licenses/LICENSE-2.0
+
+    Unless required by applicable law or agreed to in writing, software
+    distributed under the License is distributed on an "AS IS" BASIS,
+    WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+    See the License for the specific language governing permissions and
+    limitations under the License.
+'''
+
+import os
+import sys
+
+# game's modules import each other by flat names, as when run from hex_wars
+HEX_WARS_DIR = os.path.join(os.path.dirname(os.path.dirname(
+    os.path.abspath(__file__))), 'hex_wars')
+sys.path.insert(0, HEX_WARS_DIR)
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pytest
+
+import game
+import map
+
+
+@pytest.fixture
+def new_game():
+    '''Returns function creating small generated map and its gameplay, ai
+           workers are stopped after test
+    '''
+
+    gameplays = []
+
+    def create(seed=1, players_number=2, size=(10, 10), hex_number=40):
+        players = [game.Player((255, 0, 0))] + [
+            game.Player((0, 0, 40 * player_index))
+            for player_index in range(1, players_number)]
+
+        map_ = map.Map(size, hex_number, players, 4, 32, (0, 0), None, seed)
+        gameplay = game.Gameplay(map_, 6, 0, 8, seed)
+        gameplays.append(gameplay)
+
+        return map_, gameplay
+
+    yield create
+
+    for gameplay in gameplays:
+        gameplay.ai_worker.stop()
@@ -0,0 +1,151 @@
+import asyncio
+import socket
+import threading
+import types
+
+import pygame
+import pytest
+
+import client
+import events
+import protocol
+import server
+
+
+@pytest.fixture
+def game_server():
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    game_server = server.GameServer((10, 10), 40, 2, 1, seed=1,
+                                    tick_time=0.01)
+    port = asyncio.run_coroutine_threadsafe(game_server.start(),
+                                            loop).result(10)
+
+    yield game_server, port, loop
+
+    async def stop():
+        await game_server.stop()
+
+        # connections outlive server's socket, their handlers are cancelled
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(10)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(10)
+    loop.close()
+
+
+def start_client(port, game_id=0, spectate=False):
+    game_client = client.GameClient()
+    connected = threading.Event()
+
+    threading.Thread(target=client.run_connection, daemon=True, args=(
+        game_client, asyncio.new_event_loop(), '127.0.0.1', port, game_id,
+        connected, spectate)).start()
+    assert connected.wait(10)
+
+    return game_client
+
+
+def get_free_port():
+    with socket.socket() as socket_:
+        socket_.bind(('127.0.0.1', 0))
+        return socket_.getsockname()[1]
+
+
+def test_refused_connection_is_reported():
+    game_client = start_client(get_free_port())
+
+    assert isinstance(game_client.connection_error, OSError)
+    assert game_client.board is None
+
+
+def test_full_game_is_reported(game_server):
+    game_server, port, loop = game_server
+
+    player = start_client(port)
+    refused = start_client(port)
+
+    assert player.connection_error is None
+    assert player.seat == 0 and player.board is not None
+    assert isinstance(refused.connection_error, protocol.ProtocolError)
+
+
+def test_lost_connection_is_reported(game_server):
+    game_server, port, loop = game_server
+    player = start_client(port)
+
+    def close_players():
+        for writer in game_server.games[0].writers.values():
+            writer.close()
+
+    loop.call_soon_threadsafe(close_players)
+    for attempt in range(100):
+        if player.connection_error:
+            break
+        threading.Event().wait(0.05)
+
+    assert isinstance(player.connection_error, ConnectionError)
+
+
+def test_spectating_unknown_game_doesnt_create_it(game_server):
+    game_server, port, loop = game_server
+
+    spectator = start_client(port, 5, spectate=True)
+
+    assert isinstance(spectator.connection_error, protocol.ProtocolError)
+    assert spectator.errors == [protocol.UNKNOWN_GAME]
+    assert game_server.games == {}
+
+
+def test_spectator_watches_existing_game(game_server):
+    game_server, port, loop = game_server
+
+    player = start_client(port, 5)
+    spectator = start_client(port, 5, spectate=True)
+
+    assert spectator.connection_error is None
+    assert spectator.is_spectator()
+    # ai may play between joins, hexes stay where they are
+    assert ((spectator.board.owner_map >= 0) ==
+            (player.board.owner_map >= 0)).all()
+
+
+def test_too_long_message_closes_connection(game_server):
+    game_server, port, loop = game_server
+
+    with socket.create_connection(('127.0.0.1', port), 10) as socket_:
+        socket_.settimeout(10)
+        socket_.sendall(protocol.FRAME_HEADER.pack(2 ** 32 - 1,
+                                                   protocol.JOIN))
+
+        # server closes connection instead of waiting for the body
+        assert socket_.recv(1) == b''
+
+    assert game_server.games == {}
+
+
+def test_undo_key_is_ignored_in_remote_game(new_game):
+    pygame.display.init()
+    map_, gameplay = new_game()
+    map_.create_map()
+    board_ = map_.board.copy()
+
+    remote_gameplay = client.RemoteGameplay(map_, client.GameClient(), None)
+    remote_gameplay.current_player_index = 0
+    event_handler = events.EventHandler(
+        map_, types.SimpleNamespace(overlay=None), remote_gameplay,
+        remote=True)
+
+    pygame.event.clear()
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_u,
+                                         mod=0, unicode='u', scancode=0))
+    event_handler.handle_events()
+
+    assert (map_.board.owner_map == board_.owner_map).all()
+    assert (map_.board.dice_map == board_.dice_map).all()
@@ -0,0 +1,21 @@
+import pygame
+
+import controls
+
+
+def test_slider_title_doesnt_build_up():
+    pygame.font.init()
+    surface = pygame.Surface((200, 100))
+    surface.fill((40, 40, 40))
+
+    slider = controls.Slider(
+        [10, 50, 180, 20], [0, -30], 'slider', pygame.font.Font(None, 24),
+        0, 100, 50, 1, (0, 0, 0), (255, 150, 0), (40, 40, 40))
+
+    slider.render(surface)
+    rendered = pygame.image.tobytes(surface, 'RGB')
+
+    for render in range(10):
+        slider.render(surface)
+
+    assert pygame.image.tobytes(surface, 'RGB') == rendered
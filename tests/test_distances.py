@@ -0,0 +1,113 @@
+import collections
+
+import numpy
+
+import board
+import distances
+
+
+def get_reference_distances(board_, sources, passable):
+    '''Breadth-first search hex by hex with board's own neighbours'''
+    field = numpy.full(board_.size, distances.UNREACHABLE, dtype=numpy.int32)
+    queue = collections.deque()
+    for coords in numpy.argwhere(sources).tolist():
+        field[tuple(coords)] = 0
+        queue.append(tuple(coords))
+
+    while queue:
+        coords = queue.popleft()
+        for neighbour in board_.get_neighbours_coords(coords):
+            if passable[neighbour] and \
+               field[neighbour] == distances.UNREACHABLE:
+                field[neighbour] = field[coords] + 1
+                queue.append(neighbour)
+
+    return field
+
+
+def get_reference_regions(board_, mask):
+    '''Flood fill labelling regions with their smallest flat index'''
+    regions = numpy.full(board_.size, -1, dtype=numpy.intp)
+
+    for coords in numpy.argwhere(mask).tolist():
+        if regions[tuple(coords)] >= 0:
+            continue
+
+        label = numpy.ravel_multi_index(coords, board_.size)
+        regions[tuple(coords)] = label
+        stack = [tuple(coords)]
+        while stack:
+            for neighbour in board_.get_neighbours_coords(stack.pop()):
+                if mask[neighbour] and regions[neighbour] < 0:
+                    regions[neighbour] = label
+                    stack.append(neighbour)
+
+    return regions
+
+
+def create_random_board(seed, size=(9, 13)):
+    rng = numpy.random.default_rng(seed)
+    owner_map = rng.integers(-1, 3, size).astype(numpy.int16)
+    dice_map = numpy.where(owner_map >= 0, rng.integers(1, 9, size), 0)
+
+    return board.Board(size, owner_map, dice_map.astype(numpy.int16))
+
+
+def test_distances_match_breadth_first_search():
+    for seed in range(10):
+        board_ = create_random_board(seed)
+        neighbours_indices = board.get_neighbours_indices(board_.size)
+        passable = board_.owner_map >= 0
+        sources = board_.owner_map == 0
+
+        field = distances.get_distances(neighbours_indices, sources.ravel(),
+                                        passable.ravel())
+
+        assert (field.reshape(board_.size) ==
+                get_reference_distances(board_, sources, passable)).all()
+
+
+def test_regions_match_flood_fill():
+    for seed in range(10):
+        board_ = create_random_board(seed)
+        mask = board_.owner_map == 1
+
+        regions = distances.label_regions(
+            board.get_neighbours_indices(board_.size), mask.ravel())
+
+        assert (regions.reshape(board_.size) ==
+                get_reference_regions(board_, mask)).all()
+
+
+def test_distance_fields_of_player():
+    board_ = create_random_board(0)
+    fields = distances.DistanceFields(board_, 0)
+
+    own = board_.owner_map == 0
+    enemy = (board_.owner_map >= 0) & ~own
+    regions = get_reference_regions(board_, own)
+    labels, sizes = numpy.unique(regions[own], return_counts=True)
+    largest_region = regions == labels[sizes.argmax()]
+
+    assert fields.largest_region_size == sizes.max()
+    assert (fields.largest_region == get_reference_distances(
+        board_, largest_region, board_.owner_map >= 0)).all()
+    assert (fields.other_regions == get_reference_distances(
+        board_, own & ~largest_region, board_.owner_map >= 0)).all()
+    # frontier is made of own hexes next to enemies
+    assert ((fields.frontier == 0) == (own & numpy.array([
+        [any(enemy[neighbour] for neighbour in
+             board_.get_neighbours_coords((row, column)))
+         for column in range(board_.size[1])]
+        for row in range(board_.size[0])]))).all()
+    assert (fields.joining == (enemy & (fields.largest_region == 1) &
+                               (fields.other_regions == 1))).all()
+
+
+def test_player_without_hexes_has_no_fields():
+    board_ = create_random_board(0)
+    fields = distances.DistanceFields(board_, 5)
+
+    assert fields.largest_region_size == 0
+    assert (fields.largest_region == distances.UNREACHABLE).all()
+    assert (fields.frontier == distances.UNREACHABLE).all()
@@ -0,0 +1,54 @@
+import json
+
+import pygame
+
+import fonts
+
+
+def test_unresolved_font_isnt_saved(tmp_path, monkeypatch):
+    path = str(tmp_path / 'fonts.json')
+    font_file = str(tmp_path / 'font.ttf')
+    open(font_file, 'w').close()
+
+    monkeypatch.setattr(pygame.font, 'match_font', lambda *args: None)
+    font_cache = fonts.FontCache(path)
+    assert font_cache.get_font_file('missing') == (None, False)
+
+    with open(path) as file_:
+        assert 'missing:0' not in json.load(file_)
+
+    # font installed before next start is found
+    monkeypatch.setattr(pygame.font, 'match_font', lambda *args: font_file)
+    font_cache = fonts.FontCache(path)
+    assert font_cache.get_font_file('missing') == (font_file, False)
+
+    with open(path) as file_:
+        assert json.load(file_)['missing:0'] == [font_file, False]
+
+
+def test_unresolved_font_from_old_cache_file_is_retried(tmp_path,
+                                                        monkeypatch):
+    path = str(tmp_path / 'fonts.json')
+    font_file = str(tmp_path / 'font.ttf')
+    open(font_file, 'w').close()
+
+    with open(path, 'w') as file_:
+        json.dump({'missing:0': [None, False]}, file_)
+
+    monkeypatch.setattr(pygame.font, 'match_font', lambda *args: font_file)
+    font_cache = fonts.FontCache(path)
+    assert font_cache.get_font_file('missing') == (font_file, False)
+
+
+def test_unresolved_font_is_resolved_once_per_cache(tmp_path, monkeypatch):
+    calls = []
+
+    def match_font(*args):
+        calls.append(args)
+
+    monkeypatch.setattr(pygame.font, 'match_font', match_font)
+    font_cache = fonts.FontCache(str(tmp_path / 'fonts.json'))
+    font_cache.get_font_file('missing')
+    font_cache.get_font_file('missing')
+
+    assert len(calls) == 1
@@ -0,0 +1,35 @@
+import numpy
+import pygame
+
+import graphics
+
+
+def get_whole_board_pixel_image(owner_map, palette):
+    image_array = numpy.zeros(
+        (2 * owner_map.shape[0] + owner_map.shape[1], owner_map.shape[1], 3),
+        dtype=numpy.uint8)
+
+    x_indices, y_indices = numpy.indices(owner_map.shape)
+    x_indices = 2 * x_indices + y_indices
+    image_array[x_indices, y_indices] = palette[owner_map + 1]
+    image_array[x_indices + 1, y_indices] = palette[owner_map + 1]
+
+    return image_array
+
+
+def test_board_pixel_image_part_matches_whole_image():
+    rng = numpy.random.default_rng(0)
+    owner_map = rng.integers(-1, 4, (23, 17))
+    palette = rng.integers(1, 256, (5, 3)).astype(numpy.uint8)
+    palette[0] = 0
+
+    whole_image = get_whole_board_pixel_image(owner_map, palette)
+    image_rect = pygame.Rect((0, 0) + whole_image.shape[:2])
+
+    for rect in ((0, 0, 63, 17), (5, 3, 20, 9), (40, 10, 40, 40),
+                 (0, 16, 1, 1), (62, 0, 1, 17), (-10, -10, 30, 30)):
+        rect = pygame.Rect(rect).clip(image_rect)
+
+        assert (graphics.get_board_pixel_image(owner_map, palette, rect) ==
+                whole_image[rect.left:rect.right,
+                            rect.top:rect.bottom]).all()
@@ -0,0 +1,128 @@
+import numpy
+
+import history
+
+
+def create_history_game(new_game, checkpoint_interval=4, **kwargs):
+    map_, gameplay = new_game(**kwargs)
+
+    game_history = history.GameHistory(checkpoint_interval)
+    map_.history = game_history
+    gameplay.history = game_history
+    map_.create_map()
+
+    return map_, gameplay, game_history
+
+
+def play_turns(map_, gameplay, game_history, turns_number):
+    '''Plays turns and returns number of events and board after every one'''
+    states = [(len(game_history.events), map_.board.copy())]
+
+    for turn in range(turns_number):
+        gameplay.play_turn_now()
+        states.append((len(game_history.events), map_.board.copy()))
+
+    return states
+
+
+def assert_boards_equal(board1, board2):
+    assert (board1.owner_map == board2.owner_map).all()
+    assert (board1.dice_map == board2.dice_map).all()
+
+
+def find_human_attack(map_):
+    board_ = map_.board
+
+    for coords in numpy.argwhere((board_.owner_map == 0) &
+                                 (board_.dice_map > 1)).tolist():
+        for defending_coords in board_.get_enemy_neighbours_coords(
+                tuple(coords), 0):
+            return map_.hex_map[tuple(coords)], map_.hex_map[defending_coords]
+
+    return None
+
+
+def test_state_matches_played_game(new_game):
+    map_, gameplay, game_history = create_history_game(new_game,
+                                                       players_number=3)
+    states = play_turns(map_, gameplay, game_history, 6)
+
+    # every turn has some events and spans several checkpoints
+    assert states[-1][0] > 3 * game_history.checkpoint_interval
+
+    for turn, (position, board_) in enumerate(states):
+        assert game_history.get_turn_position(turn) == position
+        assert game_history.get_turn(position) == turn
+        assert_boards_equal(game_history.get_state(position)[0], board_)
+
+    board_, additional_dice_list, current_player_index = \
+        game_history.get_state()
+    assert_boards_equal(board_, map_.board)
+    assert additional_dice_list == [player.additional_dice
+                                    for player in map_.players]
+    assert current_player_index == 0
+
+
+def test_rewind_to_turn(new_game):
+    map_, gameplay, game_history = create_history_game(new_game)
+    states = play_turns(map_, gameplay, game_history, 4)
+    board_object = map_.board
+    generation = map_.generation
+
+    game_history.rewind(map_, gameplay, game_history.get_turn_position(2))
+
+    assert_boards_equal(map_.board, states[2][1])
+    # hexes keep referring to the same board
+    assert map_.board is board_object
+    assert map_.generation == generation + 1
+    assert len(game_history.events) == states[2][0]
+    assert game_history.turn_positions == [position for position, board_
+                                           in states[:3]]
+
+    # game goes on from rewound state
+    gameplay.play_turn_now()
+    assert_boards_equal(game_history.get_state()[0], map_.board)
+
+
+def test_undo_human_fight(new_game):
+    map_, gameplay, game_history = create_history_game(new_game)
+    play_turns(map_, gameplay, game_history, 2)
+    board_ = map_.board.copy()
+    position = len(game_history.events)
+
+    gameplay.attacking_hex, gameplay.defending_hex = find_human_attack(map_)
+    gameplay.fight()
+    gameplay.fight_finish()
+
+    assert len(game_history.events) == position + 1
+    assert game_history.undo(map_, gameplay)
+    assert_boards_equal(map_.board, board_)
+    assert len(game_history.events) == position
+
+
+def test_undo_without_human_events(new_game):
+    map_, gameplay, game_history = create_history_game(new_game)
+
+    assert not game_history.undo(map_, gameplay)
+
+
+def test_bisect_finds_first_state(new_game):
+    map_, gameplay, game_history = create_history_game(new_game,
+                                                       players_number=3)
+    play_turns(map_, gameplay, game_history, 4)
+
+    # human doesn't attack in turns played by play_turn_now, so its hexes
+    # number only decreases
+    human_hexes = [(game_history.get_state(position)[0].owner_map == 0).sum()
+                   for position in range(len(game_history.events) + 1)]
+    threshold = (human_hexes[0] + human_hexes[-1]) // 2
+    assert human_hexes[-1] < human_hexes[0]
+
+    position = game_history.bisect(
+        lambda board_, additional_dice_list, current_player_index:
+            (board_.owner_map == 0).sum() <= threshold)
+
+    assert position == next(position for position, hexes_number
+                            in enumerate(human_hexes)
+                            if hexes_number <= threshold)
+    assert game_history.bisect(lambda *state: False) is None
@@ -0,0 +1,50 @@
+import pygame
+
+import minimap
+
+
+def create_minimap(map_):
+    minimap_ = minimap.Minimap([0, 0, 173, 61], map_, (800, 600), (0, 0, 0))
+    minimap_.needs_render()
+
+    return minimap_
+
+
+def assert_same_images(minimap1, minimap2):
+    for name in ('image', 'image_scaled'):
+        assert pygame.image.tobytes(getattr(minimap1, name), 'RGB') == \
+            pygame.image.tobytes(getattr(minimap2, name), 'RGB')
+
+
+def test_fights_update_only_reported_hexes(new_game):
+    map_, gameplay = new_game(players_number=3, size=(14, 11), hex_number=90)
+    map_.create_map()
+    minimap_ = create_minimap(map_)
+    image = minimap_.image
+
+    minimap_.is_dirty = False
+    assert not minimap_.needs_render()
+
+    owner_map = map_.board.owner_map.copy()
+    for turn in range(3):
+        gameplay.play_turn_now()
+    assert (owner_map != map_.board.owner_map).any()
+
+    assert minimap_.needs_render()
+    # image was updated, not created again
+    assert minimap_.image is image
+    assert_same_images(minimap_, create_minimap(map_))
+
+
+def test_new_generation_creates_image(new_game):
+    map_, gameplay = new_game()
+    map_.create_map()
+    minimap_ = create_minimap(map_)
+    image = minimap_.image
+
+    map_.board.owner_map[map_.board.owner_map == 1] = 0
+    map_.generation += 1
+
+    assert minimap_.needs_render()
+    assert minimap_.image is not image
+    assert_same_images(minimap_, create_minimap(map_))
@@ -0,0 +1,46 @@
+import time
+import types
+
+import pygame
+
+import events
+import profiler
+
+
+def create_event_handler(new_game):
+    pygame.display.init()
+    pygame.event.clear()
+
+    map_, gameplay = new_game()
+    graphics = types.SimpleNamespace(overlay=None)
+
+    return events.EventHandler(map_, graphics, gameplay, None,
+                               profiler.Profiler())
+
+
+def test_toggling_profiler_in_the_middle_of_frame(new_game):
+    event_handler = create_event_handler(new_game)
+
+    # F3 is handled after frame has started
+    pygame.event.post(pygame.event.Event(pygame.KEYDOWN, key=pygame.K_F3))
+    event_handler.handle_events()
+    event_handler.frame_timer.finish_frame()
+
+    assert event_handler.graphics.overlay is event_handler.profiler
+    assert event_handler.profiler.metrics['handle_events'].calls == 1
+    assert event_handler.profiler.metrics['frame'].calls == 1
+
+
+def test_enabling_profiler_again_doesnt_time_pause(new_game):
+    event_handler = create_event_handler(new_game)
+
+    event_handler.toggle_profiler()
+    event_handler.handle_events()
+    event_handler.toggle_profiler()
+    assert event_handler.frame_timer is None
+
+    time.sleep(0.2)
+    event_handler.toggle_profiler()
+    event_handler.handle_events()
+
+    assert event_handler.profiler.metrics['handle_events'].max_time < 100
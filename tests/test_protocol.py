@@ -0,0 +1,91 @@
+import asyncio
+
+import numpy
+import pytest
+
+import board
+import protocol
+
+
+def create_board():
+    owner_map = numpy.array([[0, 1, -1], [2, 1, 0]], dtype=numpy.int16)
+    dice_map = numpy.array([[3, 8, 0], [1, 2, 5]], dtype=numpy.int16)
+
+    return board.Board((2, 3), owner_map, dice_map)
+
+
+def test_messages_are_split_from_buffer():
+    data = protocol.encode(protocol.JOIN, protocol.JOIN_BODY.pack(7)) + \
+        protocol.encode(protocol.END_TURN) + \
+        protocol.encode(protocol.ERROR,
+                        protocol.ERROR_BODY.pack(protocol.GAME_FULL))
+
+    assert list(protocol.iter_messages(data)) == [
+        (protocol.JOIN, protocol.JOIN_BODY.pack(7)),
+        (protocol.END_TURN, b''),
+        (protocol.ERROR, protocol.ERROR_BODY.pack(protocol.GAME_FULL))]
+
+
+@pytest.mark.parametrize('cut', [1, protocol.FRAME_HEADER.size + 1])
+def test_truncated_buffer_is_rejected(cut):
+    data = protocol.encode(protocol.JOIN, protocol.JOIN_BODY.pack(7))
+
+    with pytest.raises(protocol.ProtocolError):
+        list(protocol.iter_messages(data[:cut]))
+
+
+def test_keyframe_round_trip():
+    board_ = create_board()
+
+    [(message_type, body)] = protocol.iter_messages(
+        protocol.encode_keyframe(12, 2, board_))
+    turn, current_player_index, owner_map, dice_map = \
+        protocol.decode_keyframe(body, board_.size)
+
+    assert message_type == protocol.KEYFRAME
+    assert (turn, current_player_index) == (12, 2)
+    assert (owner_map == board_.owner_map).all()
+    assert (dice_map == board_.dice_map).all()
+
+
+def test_keyframe_of_other_size_is_rejected():
+    [(message_type, body)] = protocol.iter_messages(
+        protocol.encode_keyframe(0, 0, create_board()))
+
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode_keyframe(body, (3, 3))
+
+
+def test_delta_round_trip():
+    cells = numpy.zeros(2, protocol.CELL)
+    cells['index'] = (1, 5)
+    cells['owner'] = (-1, 3)
+    cells['dice'] = (0, 8)
+
+    [(message_type, body)] = protocol.iter_messages(
+        protocol.encode_delta(40, 1, cells))
+    turn, current_player_index, decoded_cells = protocol.decode_delta(body)
+
+    assert message_type == protocol.DELTA
+    assert (turn, current_player_index) == (40, 1)
+    assert (decoded_cells == cells).all()
+
+    with pytest.raises(protocol.ProtocolError):
+        protocol.decode_delta(body[:-1])
+
+
+def test_too_long_message_is_rejected():
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(protocol.FRAME_HEADER.pack(
+            protocol.MAX_MESSAGE_LENGTH + 1, protocol.KEYFRAME))
+
+        with pytest.raises(protocol.ProtocolError):
+            await protocol.read_message(reader)
+
+    asyncio.run(read())
+
+
+def test_keyframe_of_biggest_board_fits_message():
+    assert protocol.MAX_MESSAGE_LENGTH >= (protocol.KEYFRAME_BODY.size +
+                                           protocol.MAX_HEXES * 2)
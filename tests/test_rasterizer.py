@@ -0,0 +1,51 @@
+import numpy
+import pygame
+
+import rasterizer
+
+
+VIEW_SIZE = (160, 120)
+
+
+def get_pixel_owners(map_, board_rasterizer):
+    '''Owner of hex under every view pixel, looked up pixel by pixel'''
+    x, y = numpy.indices(VIEW_SIZE)
+    i, j = board_rasterizer.get_hexes_indices(x, y)
+
+    is_on_map = (i >= 0) & (i < map_.size[0]) & (j >= 0) & \
+        (j < map_.size[1])
+    owners = numpy.full(VIEW_SIZE, -1)
+    owners[is_on_map] = map_.board.owner_map[i[is_on_map], j[is_on_map]]
+
+    return owners
+
+
+def test_moved_view_matches_pixel_lookup(new_game):
+    pygame.display.init()
+    map_, gameplay = new_game(size=(12, 12), hex_number=90, players_number=3)
+    map_.create_map()
+    board_rasterizer = rasterizer.BoardRasterizer(map_, VIEW_SIZE)
+    surface = pygame.Surface(VIEW_SIZE)
+
+    palette = [surface.map_rgb((0, 0, 0))] + [
+        surface.map_rgb(player.color) for player in map_.players]
+
+    for side_length in (10, 16):
+        map_.resize_polygons(side_length)
+
+        for pos_shift in ((0, 0), (-7, 3), (-130, -95), (41, -260),
+                          (250, 300), (-3000, 15)):
+            map_.pos_shift = list(pos_shift)
+
+            board_rasterizer.render(surface)
+            owners = get_pixel_owners(map_, board_rasterizer)
+
+            assert (pygame.surfarray.array2d(surface) ==
+                    numpy.array(palette)[owners + 1]).all()
+
+            x, y = numpy.indices(VIEW_SIZE)
+            i, j = board_rasterizer.get_hexes_indices(x, y)
+            visible = {(int(i[point]), int(j[point]))
+                       for point in zip(*numpy.nonzero(owners >= 0))}
+            assert set(board_rasterizer.get_visible_hexes_coords()) == \
+                visible
@@ -0,0 +1,77 @@
+import numpy
+import pytest
+
+import savegame
+
+
+def test_save_and_load_restore_game(new_game, tmp_path):
+    map_, gameplay = new_game(seed=3)
+    map_.create_map()
+    map_.players[1].additional_dice = 5
+    gameplay.current_player_index = 0
+
+    save_file = savegame.SaveFile(str(tmp_path / 'game.save'))
+    save_file.save(map_, gameplay)
+
+    loaded_map, loaded_gameplay = new_game(seed=4)
+    save_file.load(loaded_map, loaded_gameplay)
+
+    assert tuple(loaded_map.size) == tuple(map_.size)
+    assert (loaded_map.board.owner_map == map_.board.owner_map).all()
+    assert (loaded_map.board.dice_map == map_.board.dice_map).all()
+    assert [player.color for player in loaded_map.players] == \
+        [tuple(player.color) for player in map_.players]
+    assert loaded_map.players[1].additional_dice == 5
+    assert loaded_gameplay.rng.getstate() == gameplay.rng.getstate()
+
+
+def test_save_over_loaded_save(new_game, tmp_path):
+    path = str(tmp_path / 'game.save')
+    map_, gameplay = new_game(seed=3)
+    map_.create_map()
+    savegame.SaveFile(path).save(map_, gameplay)
+
+    # loaded board mustn't depend on file which is then written again
+    savegame.SaveFile(path).load(map_, gameplay)
+    coords = tuple(numpy.argwhere(map_.board.owner_map >= 0)[0])
+    map_.board.dice_map[coords] = 7
+    savegame.SaveFile(path).save(map_, gameplay)
+
+    board_ = savegame.SaveFile(path).load_board()
+    assert board_.dice_map[coords] == 7
+    assert (board_.owner_map == map_.board.owner_map).all()
+    assert list(tmp_path.iterdir()) == [tmp_path / 'game.save']
+
+
+def test_load_maps_board_without_creating_hexes(new_game, tmp_path):
+    path = str(tmp_path / 'game.save')
+    map_, gameplay = new_game(seed=3)
+    map_.create_map()
+    savegame.SaveFile(path).save(map_, gameplay)
+
+    loaded_map, loaded_gameplay = new_game(seed=4)
+    savegame.SaveFile(path).load(loaded_map, loaded_gameplay)
+
+    assert isinstance(loaded_map.board.owner_map, numpy.memmap)
+    assert isinstance(loaded_map.board.dice_map, numpy.memmap)
+    assert not loaded_map.hex_map.hexes
+
+    coords = tuple(numpy.argwhere(map_.board.owner_map >= 0)[0])
+    hex_ = loaded_map.hex_map[coords]
+    assert hex_ is loaded_map.hex_map[coords]
+    assert hex_.dice_number == map_.board.dice_map[coords]
+    assert loaded_map.hex_map[numpy.argwhere(
+        map_.board.owner_map < 0)[0]] == 0
+
+    # changes stay in memory, file isn't changed
+    hex_.dice_number = 7
+    assert savegame.SaveFile(path).load_board().dice_map[coords] == \
+        map_.board.dice_map[coords]
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / 'game.save'
+    path.write_bytes(b'HEXR' + bytes(60))
+
+    with pytest.raises(savegame.SaveFileError):
+        savegame.SaveFile(str(path)).read_header()
@@ -0,0 +1,159 @@
+import collections
+import concurrent.futures
+import concurrent.futures.process
+import multiprocessing
+import time
+
+import numpy
+import pytest
+
+import board
+import env
+import map
+import mapgen
+import sharedboard
+
+
+SIZE = (6, 7)
+
+
+def create_board(fill):
+    board_ = board.Board(SIZE)
+    board_.owner_map[:] = fill % 3
+    board_.dice_map[:] = fill
+
+    return board_
+
+
+def read_until_turn(name, turn, results):
+    shared_board = sharedboard.SharedBoard.attach(name)
+
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        board_, version, read_turn = shared_board.read()
+        torn = not (board_.dice_map == board_.dice_map.flat[0]).all()
+        if torn or read_turn >= turn:
+            break
+
+    results.put((read_turn, version % 2, torn,
+                 board_.dice_map.tolist(), board_.owner_map.tolist()))
+    shared_board.close()
+
+
+def write_in_worker(name, fill):
+    shared_board = sharedboard.SharedBoard.attach(name, writable=True)
+    shared_board.write(create_board(fill), turn=fill, board_index=1)
+    shared_board.close()
+
+
+def test_spawned_reader_sees_writers_updates():
+    shared_board = sharedboard.SharedBoard.create(SIZE, 3)
+    context = multiprocessing.get_context('spawn')
+    results = context.Queue()
+
+    reader = context.Process(target=read_until_turn,
+                             args=(shared_board.name, 500, results))
+    reader.start()
+    for turn in range(1, 501):
+        shared_board.write(create_board(turn), turn)
+
+    read_turn, odd_version, torn, dice_map, owner_map = results.get(
+        timeout=60)
+    reader.join()
+    shared_board.close()
+
+    assert (read_turn, odd_version, torn) == (500, 0, False)
+    assert dice_map == create_board(500).dice_map.tolist()
+    assert owner_map == create_board(500).owner_map.tolist()
+
+
+def test_attached_writer_writes_batch_board():
+    shared_board = sharedboard.SharedBoard.create(SIZE, 3, boards_number=2)
+    version = shared_board.get_version()
+
+    worker = multiprocessing.get_context('spawn').Process(
+        target=write_in_worker, args=(shared_board.name, 5))
+    worker.start()
+    worker.join()
+
+    assert shared_board.is_stale(version)
+    assert shared_board.get_turn() == 5
+    assert (shared_board.read(board_index=1)[0].dice_map == 5).all()
+    assert (shared_board.boards[0].dice_map == 0).all()
+    shared_board.close()
+
+
+def test_read_only_attach_cant_write():
+    shared_board = sharedboard.SharedBoard.create(SIZE, 3)
+    attached = sharedboard.SharedBoard.attach(shared_board.name)
+
+    with pytest.raises(sharedboard.SharedBoardError):
+        attached.write(create_board(1))
+    with pytest.raises(ValueError):
+        attached.board.dice_map[0, 0] = 1
+
+    attached.close()
+    shared_board.close()
+
+
+def test_map_generator_returns_shared_boards():
+    params = ((20, 20), 30, 3, 4)
+    map_generator = mapgen.MapGenerator(queue_size=1, seed=2)
+    map_generator.prepare(params)
+
+    future = map_generator.pending_boards[params][0][0]
+    future.result(timeout=60)
+    board_ = map_generator.get_board(params)
+    map_generator.close()
+    map_generator.executor.shutdown()
+
+    expected = map.Map(params[0], params[1], [None] * params[2], params[3],
+                       0, (0, 0)).generate_board(board_.seed)
+    assert (board_.owner_map == expected.owner_map).all()
+    assert (board_.dice_map == expected.dice_map).all()
+
+
+@pytest.mark.parametrize('error', [
+    ValueError('worker failed'),
+    concurrent.futures.process.BrokenProcessPool('worker died')])
+def test_map_generator_falls_back_when_preparing_fails(error):
+    params = ((20, 20), 30, 3, 4)
+    map_generator = mapgen.MapGenerator(queue_size=1, seed=2)
+    executor = map_generator.executor
+
+    future = concurrent.futures.Future()
+    future.set_exception(error)
+    shared_board = sharedboard.SharedBoard.create(params[0], params[2])
+    map_generator.pending_boards[params] = collections.deque(
+        [(future, shared_board, 5)])
+
+    board_ = map_generator.get_board(params)
+    restarted = map_generator.executor is not executor
+    map_generator.close()
+    map_generator.executor.shutdown()
+    executor.shutdown()
+
+    expected = map.Map(params[0], params[1], [None] * params[2], params[3],
+                       0, (0, 0)).generate_board(5)
+    assert board_.seed == 5
+    assert (board_.owner_map == expected.owner_map).all()
+    assert restarted == isinstance(error, concurrent.futures.BrokenExecutor)
+    with pytest.raises(FileNotFoundError):
+        sharedboard.SharedBoard.attach(shared_board.name)
+
+
+def test_vector_env_boards_are_shared_board():
+    vector_env = env.VectorEnv(3, 1, size=(8, 8), hex_number=30)
+    observation, infos = vector_env.reset(7)
+    vector_env.step(env.choose_random_actions(
+        observation['action_mask'], numpy.random.default_rng(0)))
+
+    attached = sharedboard.SharedBoard.attach(vector_env.shared_board.name)
+    for env_index in range(3):
+        board_, version, turn = attached.read(board_index=env_index)
+        assert (board_.owner_map == observation['owner'][env_index]).all()
+        assert (board_.dice_map == observation['dice'][env_index]).all()
+    assert turn == 1
+
+    attached.close()
+    vector_env.close()
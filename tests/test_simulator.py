@@ -0,0 +1,43 @@
+import numpy
+
+import simulator
+
+
+def test_game_without_attacks_is_stopped_as_stalled():
+    # hexes of both players aren't neighbours, nobody can attack
+    owner_maps = numpy.full((1, 3, 3), -1)
+    owner_maps[0, 0, 0] = 0
+    owner_maps[0, 2, 2] = 1
+
+    batch_simulator = simulator.BatchSimulator(
+        owner_maps, numpy.ones((1, 3, 3)), 2, 6, 8, seed=1)
+    winners = batch_simulator.run(500, max_stalled_rounds=5)
+
+    assert winners.tolist() == [-1]
+    assert batch_simulator.stalled.tolist() == [True]
+    assert batch_simulator.rounds.tolist() == [5]
+
+
+def test_stalled_game_isnt_stopped_without_limit():
+    owner_maps = numpy.full((1, 3, 3), -1)
+    owner_maps[0, 0, 0] = 0
+    owner_maps[0, 2, 2] = 1
+
+    batch_simulator = simulator.BatchSimulator(
+        owner_maps, numpy.ones((1, 3, 3)), 2, 6, 8, seed=1)
+    batch_simulator.run(20, max_stalled_rounds=None)
+
+    assert not batch_simulator.stalled.any()
+    assert batch_simulator.rounds.tolist() == [20]
+
+
+def test_batch_games_finish_with_winner():
+    boards = simulator.generate_boards(16, (8, 8), 30, 2, 3, seed=4)
+    batch_simulator = simulator.BatchSimulator.from_boards(
+        boards, 2, 6, 8, seed=4)
+    winners = batch_simulator.run(500)
+
+    for game_index in numpy.nonzero(winners >= 0)[0]:
+        owner_map = batch_simulator.owner_maps[game_index]
+        assert (owner_map[owner_map >= 0] == winners[game_index]).all()
+    assert ((winners >= 0) | batch_simulator.stalled).all()
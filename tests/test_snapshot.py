@@ -0,0 +1,38 @@
+import os
+
+import savegame
+import snapshot
+
+
+def write_save(new_game, path, seed):
+    map_, gameplay = new_game(seed=seed)
+    map_.create_map()
+    savegame.SaveFile(str(path)).save(map_, gameplay)
+
+
+def test_export_creates_output_directory(new_game, tmp_path):
+    write_save(new_game, tmp_path / 'game.save', 1)
+    output_dir = tmp_path / 'images' / 'nested'
+
+    image_paths = snapshot.export(str(tmp_path / 'game.save'),
+                                  str(output_dir),
+                                  renderer=snapshot.SnapshotRenderer())
+
+    assert image_paths == [str(output_dir / 'game.save.png')]
+    assert os.path.getsize(image_paths[0]) > 0
+
+
+def test_broken_file_doesnt_stop_batch(new_game, tmp_path):
+    paths = [tmp_path / 'first.save', tmp_path / 'broken.save',
+             tmp_path / 'second.save']
+    write_save(new_game, paths[0], 1)
+    paths[1].write_bytes(b'\x07garbage' * 3)
+    write_save(new_game, paths[2], 2)
+
+    image_paths, failures = snapshot.export_batch(
+        [str(path) for path in paths], str(tmp_path / 'images'),
+        processes_number=1)
+
+    assert sorted(os.path.basename(path) for path in image_paths) == \
+        ['first.save.png', 'second.save.png']
+    assert [path for path, error in failures] == [str(paths[1])]
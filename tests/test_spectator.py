@@ -0,0 +1,95 @@
+import pytest
+
+import spectator
+
+
+def create_streamed_game(new_game, path=None):
+    map_, gameplay = new_game(players_number=3)
+
+    stream = spectator.SpectatorStream(path)
+    map_.spectator_stream = stream
+    gameplay.spectator_stream = stream
+    map_.create_map()
+
+    # number of actions -> board after them
+    boards = {0: map_.board.copy()}
+    for turn in range(4):
+        gameplay.play_turn_now()
+        boards[stream.actions] = map_.board.copy()
+
+    return map_, stream, boards
+
+
+def assert_spectator_sees(spectator_, board_):
+    assert (spectator_.board.owner_map == board_.owner_map).all()
+    assert (spectator_.board.dice_map == board_.dice_map).all()
+
+
+@pytest.mark.parametrize('with_file', [False, True])
+def test_spectator_sees_board_after_any_action(new_game, tmp_path,
+                                               with_file):
+    path = str(tmp_path / 'game.stream') if with_file else None
+    map_, stream, boards = create_streamed_game(new_game, path)
+
+    assert len(stream.keyframe_indices) > 1
+    for actions, board_ in boards.items():
+        spectator_ = spectator.watch(stream, actions)
+
+        assert spectator_.turn == actions
+        assert tuple(spectator_.size) == tuple(map_.size)
+        assert_spectator_sees(spectator_, board_)
+
+    assert_spectator_sees(spectator.watch(stream), map_.board)
+
+
+def test_late_spectator_reads_at_most_two_keyframes(new_game):
+    map_, stream, boards = create_streamed_game(new_game)
+    keyframe_bytes = max(len(stream.entries[index])
+                         for index in stream.keyframe_indices)
+
+    for actions in range(stream.actions + 1):
+        data, next_entry = stream.read(*stream.seek(actions))
+        assert len(data) < 2 * keyframe_bytes
+
+
+def test_live_spectator_reads_new_entries(new_game):
+    map_, stream, boards = create_streamed_game(new_game)
+    data, next_entry = stream.read(*stream.seek())
+
+    assert stream.read(next_entry) == (b'', next_entry)
+
+
+def test_loaded_stream_replays_game(new_game, tmp_path):
+    path = str(tmp_path / 'game.stream')
+    map_, stream, boards = create_streamed_game(new_game, path)
+    stream.close()
+
+    loaded_stream = spectator.SpectatorStream.load(path)
+
+    with open(path, 'rb') as file_:
+        assert loaded_stream.read(0) == (file_.read(),
+                                         stream.get_entries_number())
+    assert loaded_stream.offsets == stream.offsets
+    assert loaded_stream.keyframe_indices == stream.keyframe_indices
+    assert loaded_stream.keyframe_actions == stream.keyframe_actions
+    assert loaded_stream.actions == stream.actions
+    for actions, board_ in boards.items():
+        assert_spectator_sees(spectator.watch(loaded_stream, actions),
+                              board_)
+
+
+def test_stream_with_file_doesnt_keep_entries(new_game, tmp_path):
+    path = str(tmp_path / 'game.stream')
+    map_, stream, boards = create_streamed_game(new_game, path)
+    memory_stream = create_streamed_game(new_game)[1]
+
+    assert stream.entries == []
+    assert stream.get_entries_number() == memory_stream.get_entries_number()
+    for start in range(stream.get_entries_number() + 1):
+        assert stream.read(start) == memory_stream.read(start)
+        assert (stream.read(*stream.seek(start)) ==
+                memory_stream.read(*memory_stream.seek(start)))
+
+
+def test_empty_stream_has_nothing_to_watch():
+    assert spectator.watch(spectator.SpectatorStream()) is None
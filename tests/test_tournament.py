@@ -0,0 +1,44 @@
+import tournament
+
+
+def create_result(strategies, seed, places):
+    return {
+        'strategies': list(strategies),
+        'seed': seed,
+        'places': places,
+        'rounds': 1,
+        'decisions': [1] * len(strategies),
+        'decision_time': [0.0] * len(strategies),
+    }
+
+
+def test_blocks_are_rotations_of_one_map():
+    results = [create_result(group, seed, [0, 1])
+               for group, seed in tournament.create_games(
+                   ['a', 'b', 'c'], 2, 3, 10)]
+
+    blocks = tournament.get_blocks(results)
+
+    assert len(blocks) == 3 * 3
+    for block in blocks:
+        assert len(block) == 2
+        assert len({result['seed'] for result in block}) == 1
+        assert len({tuple(sorted(result['strategies']))
+                    for result in block}) == 1
+
+
+def test_bootstrap_resamples_whole_blocks():
+    # first seat always wins, so every map's rotations are a draw and
+    # resampling blocks can't change ratings, resampling games could
+    results = [create_result(group, seed, [0, 1])
+               for group, seed in tournament.create_games(
+                   ['a', 'b'], 2, 20, 0)]
+
+    table = tournament.rate(results, ['a', 'b'], 0)
+
+    for entry in table:
+        assert round(entry['elo']) == tournament.ELO_BASE
+        assert round(entry['elo_low']) == round(entry['elo_high']) == \
+            tournament.ELO_BASE
+        assert entry['games'] == 40
+        assert entry['win_rate'] == 0.5